@@ -0,0 +1,115 @@
+# =============================================================================
+# Control de admisión frente a Ollama
+# Ollama atiende pocas llamadas a la vez: si se le mandan todas, las demás
+# quedan en cola sin límite y los clientes de bot.js cortan por timeout.
+# - Como máximo MODELO_MAX_CONCURRENTES llamadas al modelo en curso; el resto
+#   espera su lugar (invocar, invocar_con_streaming y los resúmenes pasan por
+#   llamada_modelo()).
+# - Cada turno tiene un plazo (TURNO_PLAZO_SEG desde que llega el mensaje)
+#   que viaja en una ContextVar hasta el hilo del turno. Si no queda al menos
+#   MODELO_MIN_RESTANTE_SEG para una llamada, no se hace: se corta el turno
+#   con PlazoVencido y el endpoint responde RESPUESTA_SATURADO (sin modelo).
+# - PlazoVencido y TurnoRechazado derivan de BaseException: get_response
+#   tiene muchos "except Exception" con respuestas de respaldo ("no tenemos
+#   X") y el corte tiene que pasar por todos ellos hasta el endpoint.
+# - Los topes de cola por sesión y globales están en app/despacho.py.
+# =============================================================================
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from app import metricas
+
+load_dotenv()
+
+MODELO_MAX_CONCURRENTES = int(os.getenv("MODELO_MAX_CONCURRENTES", "2"))
+TURNO_PLAZO_SEG = float(os.getenv("TURNO_PLAZO_SEG", "60"))
+MODELO_MIN_RESTANTE_SEG = float(os.getenv("MODELO_MIN_RESTANTE_SEG", "3"))
+
+RESPUESTA_SATURADO = (
+    "Estamos recibiendo muchos mensajes en este momento 🙏. "
+    "Escribime de nuevo en un ratito y te respondo. Tu pedido sigue guardado 🛒"
+)
+
+
+turnos_atendidos = metricas.contador("admision_turnos_atendidos", "Turnos que terminaron con respuesta")
+turnos_rechazados_cola_sesion = metricas.contador("admision_rechazados_cola_sesion", "Mensajes rechazados por tener demasiados turnos pendientes en la sesión")
+turnos_rechazados_cola_global = metricas.contador("admision_rechazados_cola_global", "Mensajes rechazados por la cola global llena")
+turnos_rechazados_plazo = metricas.contador("admision_rechazados_plazo", "Turnos cortados porque no llegaban a responder dentro del plazo")
+llamadas_esperando = metricas.medidor("admision_llamadas_modelo_esperando", "Llamadas al modelo esperando un lugar")
+llamadas_en_curso = metricas.medidor("admision_llamadas_modelo_en_curso", "Llamadas al modelo en curso")
+espera_modelo = metricas.histograma("admision_espera_modelo_segundos", "Tiempo esperando un lugar para llamar al modelo")
+
+
+class TurnoRechazado(BaseException):
+    """El mensaje no entra en la cola (se responde RESPUESTA_SATURADO sin ejecutar el turno)."""
+
+    def __init__(self, motivo: str):
+        super().__init__(f"turno rechazado: {motivo}")
+        self.motivo = motivo
+
+
+class PlazoVencido(BaseException):
+    """El turno ya no llega a responder a tiempo (no lo atrapan los except Exception del turno)."""
+
+
+# Momento (time.monotonic) en que vence el turno actual; None = sin plazo (tareas en segundo plano)
+_plazo = contextvars.ContextVar("plazo_turno", default=None)
+
+
+@contextmanager
+def con_plazo(segundos: float = TURNO_PLAZO_SEG):
+    """Fija el plazo del turno. Las tareas creadas dentro del bloque lo heredan."""
+    token = _plazo.set(time.monotonic() + segundos if segundos and segundos > 0 else None)
+    try:
+        yield
+    finally:
+        _plazo.reset(token)
+
+
+def tiempo_restante():
+    """Segundos que le quedan al turno actual, o None si no tiene plazo."""
+    plazo = _plazo.get()
+    return None if plazo is None else plazo - time.monotonic()
+
+
+def verificar_plazo(minimo: float = 0.0):
+    restante = tiempo_restante()
+    if restante is not None and restante < minimo:
+        raise PlazoVencido(f"quedan {max(restante, 0):.1f}s del plazo del turno")
+
+
+class ControlAdmision:
+    def __init__(self, max_concurrentes: int = MODELO_MAX_CONCURRENTES, min_restante: float = MODELO_MIN_RESTANTE_SEG):
+        self.max_concurrentes = max_concurrentes
+        self.min_restante = min_restante
+        self._lugares = threading.BoundedSemaphore(max_concurrentes)
+
+    @contextmanager
+    def llamada_modelo(self):
+        """Ocupa un lugar para llamar al modelo respetando el plazo del turno."""
+        verificar_plazo(self.min_restante)
+        restante = tiempo_restante()
+        inicio = time.perf_counter()
+        llamadas_esperando.inc()
+        try:
+            obtenido = self._lugares.acquire(timeout=None if restante is None else max(0.0, restante - self.min_restante))
+        finally:
+            llamadas_esperando.dec()
+        espera_modelo.observar(time.perf_counter() - inicio)
+        if not obtenido:
+            raise PlazoVencido("no se liberó un lugar para el modelo dentro del plazo")
+        llamadas_en_curso.inc()
+        try:
+            yield
+        finally:
+            llamadas_en_curso.dec()
+            self._lugares.release()
+
+
+# Instancia compartida por todas las llamadas al modelo
+admision = ControlAdmision()
@@ -0,0 +1,108 @@
+# =============================================================================
+# Agrupado de mensajes en ráfaga
+# En WhatsApp es común escribir "hola" / "quiero" / "2 leches" en mensajes
+# separados, y cada uno disparaba un turno completo con varias llamadas a
+# Ollama y tres respuestas que se pisaban. Cada mensaje que llega espera
+# AGRUPAR_VENTANA_SEG; si en ese tiempo llega otro del mismo número, el
+# anterior queda "agrupado" (no responde) y el último responde por todos,
+# con los textos unidos en un solo turno. Para que una ráfaga larga no deje
+# al cliente sin respuesta, nunca se espera más de AGRUPAR_MAX_ESPERA_SEG
+# desde el primer mensaje ni se juntan más de AGRUPAR_MAX_MENSAJES.
+# AGRUPAR_VENTANA_SEG=0 desactiva el agrupado.
+#
+# Costo: todo mensaje, aunque venga solo, espera la ventana antes de empezar
+# su turno (la mayoría de los mensajes vienen solos). Por eso la ventana por
+# defecto es corta (300ms): alcanza para los mensajes que llegan casi juntos
+# (el cliente corta una frase en varios envíos) y suma poco a cada respuesta.
+# Con una ventana más larga se juntan más mensajes y se ahorran más turnos,
+# pero cada respuesta tarda eso más. Lo que llega después de la ventana,
+# mientras el turno anterior sigue en curso, lo ordena la cola por sesión de
+# app/despacho.py.
+# =============================================================================
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from app import metricas
+
+load_dotenv()
+
+AGRUPAR_VENTANA_SEG = float(os.getenv("AGRUPAR_VENTANA_SEG", "0.3"))
+AGRUPAR_MAX_ESPERA_SEG = float(os.getenv("AGRUPAR_MAX_ESPERA_SEG", "5"))
+AGRUPAR_MAX_MENSAJES = int(os.getenv("AGRUPAR_MAX_MENSAJES", "8"))
+
+
+mensajes_agrupados = metricas.contador("agrupador_mensajes_agrupados", "Mensajes respondidos junto con uno posterior (turnos ahorrados)")
+mensajes_por_turno = metricas.histograma(
+    "agrupador_mensajes_por_turno", "Mensajes del cliente unidos en cada turno",
+    buckets=(1, 2, 3, 4, 6, 8, 12),
+)
+
+
+class _Rafaga:
+    __slots__ = ("textos", "version", "inicio", "relevo")
+
+    def __init__(self, inicio: float):
+        self.textos = []
+        self.version = 0       # sube con cada mensaje: solo responde el que ve su versión al despertar
+        self.inicio = inicio
+        self.relevo = None     # evento del mensaje que está esperando; se activa cuando llega otro
+
+
+class AgrupadorMensajes:
+    """Se usa desde el event loop (los endpoints), así que no necesita locks."""
+
+    def __init__(self, ventana_seg: float = AGRUPAR_VENTANA_SEG, max_espera_seg: float = AGRUPAR_MAX_ESPERA_SEG,
+                 max_mensajes: int = AGRUPAR_MAX_MENSAJES, reloj=time.monotonic):
+        self.ventana_seg = ventana_seg
+        self.max_espera_seg = max_espera_seg
+        self.max_mensajes = max_mensajes
+        self._reloj = reloj
+        self._rafagas = {}     # session_id -> _Rafaga abierta
+
+    async def agrupar(self, session_id: str, texto: str):
+        """
+        Devuelve el texto del turno (los mensajes de la ráfaga unidos por salto
+        de línea) o None si un mensaje posterior va a responder por este.
+        """
+        if self.ventana_seg <= 0:
+            return texto
+
+        rafaga = self._rafagas.get(session_id)
+        if rafaga is None:
+            rafaga = self._rafagas[session_id] = _Rafaga(self._reloj())
+        rafaga.textos.append(texto)
+        rafaga.version += 1
+        mi_version = rafaga.version
+        # El mensaje anterior ya no va a responder: que devuelva "agrupado" sin esperar
+        if rafaga.relevo is not None:
+            rafaga.relevo.set()
+        relevo = rafaga.relevo = asyncio.Event()
+
+        if len(rafaga.textos) < self.max_mensajes:
+            restante = rafaga.inicio + self.max_espera_seg - self._reloj()
+            espera = min(self.ventana_seg, restante)
+            if espera > 0:
+                # Si el request se cancela, los textos quedan y los responde el próximo mensaje
+                try:
+                    await asyncio.wait_for(relevo.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+
+        if self._rafagas.get(session_id) is not rafaga or rafaga.version != mi_version:
+            mensajes_agrupados.inc()
+            return None
+
+        del self._rafagas[session_id]
+        mensajes_por_turno.observar(len(rafaga.textos))
+        return "\n".join(rafaga.textos)
+
+    def pendientes(self, session_id: str) -> int:
+        rafaga = self._rafagas.get(session_id)
+        return len(rafaga.textos) if rafaga else 0
+
+
+# Instancia compartida por los endpoints
+agrupador = AgrupadorMensajes()
@@ -0,0 +1,306 @@
+# =============================================================================
+# Backend compartido para el estado de las sesiones
+# Con el backend "memoria" (por defecto) todo sigue viviendo en el proceso.
+# Con "sqlite" o "redis" el estado de cada sesión (carrito, productos mostrados,
+# datos de contexto e historial de chat) se carga al empezar el turno y se
+# guarda al terminarlo, con un bloqueo por sesión entre procesos, así se puede
+# correr uvicorn con varios workers o más de un nodo.
+# =============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+from dotenv import load_dotenv
+
+from app import metricas
+from app.carrito import Carrito, a_centavos
+from app.productos_mostrados import ProductosMostrados
+from app.sesiones import sesiones, HistorialChatAcotado, SESIONES_TTL_SEG
+
+load_dotenv()
+
+SESIONES_BACKEND = os.getenv("SESIONES_BACKEND", "memoria").lower()
+SESIONES_SQLITE_RUTA = os.getenv("SESIONES_SQLITE_RUTA", "sesiones.db")
+SESIONES_REDIS_URL = os.getenv("SESIONES_REDIS_URL", "redis://localhost:6379/0")
+# Un turno nunca debería tardar más que esto; si un worker muere, el bloqueo vence solo
+SESIONES_BLOQUEO_SEG = float(os.getenv("SESIONES_BLOQUEO_SEG", "120"))
+
+# Nombres de los espacios que se persisten (definidos en crud.py y pedidos.py)
+ESPACIO_HISTORIAL = "historial_chat"
+ESPACIO_DATOS = "datos_traidos_desde_bd"
+ESPACIO_PEDIDOS = "pedidos_por_cliente"
+
+
+carga_sesion = metricas.histograma("sesion_backend_carga_segundos", "Tiempo de cargar una sesión del backend")
+guardado_sesion = metricas.histograma("sesion_backend_guardado_segundos", "Tiempo de guardar una sesión en el backend")
+espera_bloqueo = metricas.histograma("sesion_backend_bloqueo_segundos", "Espera por el bloqueo de una sesión")
+bytes_sesion = metricas.histograma(
+    "sesion_backend_bytes", "Tamaño serializado de una sesión",
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+
+
+# =============================================================================
+# SERIALIZACIÓN COMPACTA
+# =============================================================================
+
+def _a_json(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def _compactar_productos(productos_mostrados: ProductosMostrados) -> dict:
+    # Solo se guarda lo que usa el bot de cada producto: id, nombre y precio
+    return {
+        clave: [[p.get("id"), p["producto"], p["precio_venta"]] for p in lista]
+        for clave, lista in productos_mostrados.por_consulta().items()
+    }
+
+
+def _expandir_productos(compactos: dict) -> ProductosMostrados:
+    return ProductosMostrados.desde_consultas({
+        clave: [{"id": i, "producto": nombre, "precio_venta": precio} for i, nombre, precio in lista]
+        for clave, lista in compactos.items()
+    })
+
+
+def _expandir_pedido(estado: dict) -> Carrito:
+    lineas = estado.get("p", [])
+    if estado.get("v", 1) < 2:
+        # v1: [producto, cantidad, precio_unitario, subtotal] con importes en float y sin id
+        lineas = [[None, p, c, a_centavos(u)] for p, c, u, _ in lineas]
+    return Carrito.desde_compacto(lineas)
+
+
+def serializar_sesion(session_id: str) -> bytes:
+    historial = sesiones.espacio(ESPACIO_HISTORIAL)._datos.get(session_id)
+    datos = dict(sesiones.espacio(ESPACIO_DATOS)._datos.get(session_id) or {})
+    pedido = sesiones.espacio(ESPACIO_PEDIDOS)._datos.get(session_id)
+
+    if "productos_mostrados" in datos:
+        datos["productos_mostrados"] = _compactar_productos(datos["productos_mostrados"])
+    datos.pop("productos_textuales", None)   # clave de versiones anteriores, ya no se usa
+
+    estado = {
+        "v": 2,
+        "d": datos,
+        "p": pedido.a_compacto() if pedido else [],
+        "h": [["h" if m.type == "human" else "a", m.content] for m in historial.messages] if historial else [],
+    }
+    crudo = json.dumps(estado, separators=(",", ":"), ensure_ascii=False, default=_a_json).encode("utf-8")
+    return zlib.compress(crudo, 6)
+
+
+def restaurar_sesion(session_id: str, blob):
+    """Reemplaza el estado local de la sesión por el guardado (o lo limpia si no hay nada)."""
+    if blob is None:
+        sesiones.olvidar(session_id)
+        return
+
+    estado = json.loads(zlib.decompress(blob).decode("utf-8"))
+    datos = estado.get("d", {})
+    if "productos_mostrados" in datos:
+        datos["productos_mostrados"] = _expandir_productos(datos["productos_mostrados"])
+
+    historial = HistorialChatAcotado()
+    for rol, contenido in estado.get("h", []):
+        if rol == "h":
+            historial.add_user_message(contenido)
+        else:
+            historial.add_ai_message(contenido)
+
+    sesiones.espacio(ESPACIO_DATOS)[session_id] = datos
+    sesiones.espacio(ESPACIO_HISTORIAL)[session_id] = historial
+    sesiones.espacio(ESPACIO_PEDIDOS)[session_id] = _expandir_pedido(estado)
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class BackendMemoria:
+    """El estado queda en el proceso (un solo worker). No hace falta cargar ni guardar."""
+    compartido = False
+
+    def cargar(self, session_id: str):
+        return None
+
+    def guardar(self, session_id: str, blob: bytes):
+        pass
+
+    def borrar(self, session_id: str):
+        pass
+
+    @contextmanager
+    def bloquear(self, session_id: str):
+        yield
+
+
+class BackendSQLite:
+    """Archivo SQLite compartido por todos los workers de la misma máquina."""
+    compartido = True
+
+    def __init__(self, ruta: str = SESIONES_SQLITE_RUTA, ttl_seg: float = SESIONES_TTL_SEG,
+                 bloqueo_seg: float = SESIONES_BLOQUEO_SEG):
+        self.ruta = ruta
+        self.ttl_seg = ttl_seg
+        self.bloqueo_seg = bloqueo_seg
+        self._local = threading.local()
+        self._ultima_limpieza = 0.0
+        with self._conexion() as conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("CREATE TABLE IF NOT EXISTS sesiones (session_id TEXT PRIMARY KEY, estado BLOB NOT NULL, actualizado REAL NOT NULL)")
+            conexion.execute("CREATE TABLE IF NOT EXISTS bloqueos (session_id TEXT PRIMARY KEY, duenio TEXT NOT NULL, vence REAL NOT NULL)")
+
+    def _conexion(self):
+        # sqlite3 no permite compartir conexiones entre hilos: una por hilo
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = sqlite3.connect(self.ruta, timeout=30)
+        return conexion
+
+    def cargar(self, session_id: str):
+        fila = self._conexion().execute("SELECT estado, actualizado FROM sesiones WHERE session_id = ?", (session_id,)).fetchone()
+        if fila is None or time.time() - fila[1] > self.ttl_seg:
+            return None
+        return fila[0]
+
+    def guardar(self, session_id: str, blob: bytes):
+        ahora = time.time()
+        with self._conexion() as conexion:
+            conexion.execute(
+                "INSERT INTO sesiones VALUES (?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET estado = excluded.estado, actualizado = excluded.actualizado",
+                (session_id, blob, ahora),
+            )
+            # Cada tanto se borran las sesiones vencidas
+            if ahora - self._ultima_limpieza > 600:
+                self._ultima_limpieza = ahora
+                conexion.execute("DELETE FROM sesiones WHERE actualizado < ?", (ahora - self.ttl_seg,))
+
+    def borrar(self, session_id: str):
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM sesiones WHERE session_id = ?", (session_id,))
+
+    @contextmanager
+    def bloquear(self, session_id: str):
+        duenio = uuid.uuid4().hex
+        conexion = self._conexion()
+        while True:
+            ahora = time.time()
+            with conexion:
+                conexion.execute(
+                    "INSERT INTO bloqueos VALUES (?, ?, ?) ON CONFLICT(session_id) DO UPDATE "
+                    "SET duenio = excluded.duenio, vence = excluded.vence WHERE bloqueos.vence < ?",
+                    (session_id, duenio, ahora + self.bloqueo_seg, ahora),
+                )
+            fila = conexion.execute("SELECT duenio FROM bloqueos WHERE session_id = ?", (session_id,)).fetchone()
+            if fila and fila[0] == duenio:
+                break
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            with conexion:
+                conexion.execute("DELETE FROM bloqueos WHERE session_id = ? AND duenio = ?", (session_id, duenio))
+
+
+class BackendRedis:
+    """Cualquier servidor que hable el protocolo de Redis (Redis, Valkey, KeyDB...)."""
+    compartido = True
+
+    def __init__(self, url: str = SESIONES_REDIS_URL, ttl_seg: float = SESIONES_TTL_SEG,
+                 bloqueo_seg: float = SESIONES_BLOQUEO_SEG):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESIONES_BACKEND=redis requiere instalar el paquete 'redis'") from e
+        self._redis = redis.Redis.from_url(url)
+        self.ttl_seg = int(ttl_seg)
+        self.bloqueo_ms = int(bloqueo_seg * 1000)
+
+    def cargar(self, session_id: str):
+        return self._redis.get(f"sesion:{session_id}")
+
+    def guardar(self, session_id: str, blob: bytes):
+        self._redis.set(f"sesion:{session_id}", blob, ex=self.ttl_seg)
+
+    def borrar(self, session_id: str):
+        self._redis.delete(f"sesion:{session_id}")
+
+    @contextmanager
+    def bloquear(self, session_id: str):
+        clave = f"bloqueo:{session_id}"
+        duenio = uuid.uuid4().hex
+        while not self._redis.set(clave, duenio, nx=True, px=self.bloqueo_ms):
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            # Solo se libera si el bloqueo sigue siendo nuestro
+            self._redis.eval(
+                "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+                1, clave, duenio,
+            )
+
+
+def crear_backend(nombre: str = SESIONES_BACKEND):
+    if nombre == "sqlite":
+        return BackendSQLite()
+    if nombre == "redis":
+        return BackendRedis()
+    if nombre != "memoria":
+        raise ValueError(f"SESIONES_BACKEND desconocido: {nombre} (usar memoria, sqlite o redis)")
+    return BackendMemoria()
+
+
+backend = crear_backend()
+
+
+# =============================================================================
+# TURNO CON ESTADO COMPARTIDO
+# =============================================================================
+
+_turnos_activos = threading.local()
+
+
+@contextmanager
+def turno_sesion(session_id: str):
+    """
+    Bloquea la sesión entre procesos, trae su estado del backend al empezar y lo
+    guarda al terminar. Con el backend en memoria no hace nada.
+    """
+    activos = getattr(_turnos_activos, "sesiones", None)
+    if activos is None:
+        activos = _turnos_activos.sesiones = set()
+    if not backend.compartido or session_id in activos:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    with backend.bloquear(session_id):
+        espera_bloqueo.observar(time.perf_counter() - inicio)
+        activos.add(session_id)
+        restaurada = False
+        try:
+            inicio = time.perf_counter()
+            restaurar_sesion(session_id, backend.cargar(session_id))
+            carga_sesion.observar(time.perf_counter() - inicio)
+            restaurada = True
+
+            yield
+        finally:
+            activos.discard(session_id)
+            # Se guarda aunque el turno falle: lo que ya cambió (por ejemplo el carrito) no se pierde
+            if restaurada:
+                inicio = time.perf_counter()
+                blob = serializar_sesion(session_id)
+                backend.guardar(session_id, blob)
+                bytes_sesion.observar(len(blob))
+                guardado_sesion.observar(time.perf_counter() - inicio)
@@ -0,0 +1,111 @@
+# =============================================================================
+# Caché de respuestas de los modelos de IA
+# Muchas llamadas a Ollama dependen solo del prompt (ingredientes de "pizza",
+# detectar la intención de "hola" sin contexto, etc.). Cada punto de llamada
+# decide si usa la caché pasando un nombre de "sitio" habilitado en
+# LLM_CACHE_SITIOS. La clave es modelo + opciones + prompt normalizado.
+# =============================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
+
+from app import metricas
+from app.admision import admision
+
+load_dotenv()
+
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "2000"))
+# Si se define, la caché sobrevive reinicios (archivo SQLite)
+LLM_CACHE_RUTA = os.getenv("LLM_CACHE_RUTA", "")
+LLM_CACHE_SITIOS = {s.strip() for s in os.getenv("LLM_CACHE_SITIOS", "deteccion,deteccion_json,ingredientes").split(",") if s.strip()}
+
+# Atributos del modelo que cambian la respuesta y por eso forman parte de la clave
+OPCIONES_MODELO = ("format", "temperature", "top_p", "top_k", "num_ctx", "num_predict", "seed", "stop")
+
+
+def normalizar_prompt(prompt: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+
+def opciones_de(modelo) -> dict:
+    return {o: getattr(modelo, o) for o in OPCIONES_MODELO if getattr(modelo, o, None) is not None}
+
+
+def clave_cache(nombre_modelo: str, prompt: str, opciones: dict) -> str:
+    material = json.dumps([nombre_modelo, normalizar_prompt(prompt), opciones], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CacheLLM:
+    def __init__(self, max_entradas: int = LLM_CACHE_MAX, ruta: str = LLM_CACHE_RUTA):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._disco = None
+        if ruta:
+            self._disco = sqlite3.connect(ruta, check_same_thread=False)
+            self._disco.execute("CREATE TABLE IF NOT EXISTS respuestas (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+            # Se precargan las más recientes (rowid más alto) hasta el tope de memoria
+            filas = self._disco.execute("SELECT clave, valor FROM respuestas ORDER BY rowid DESC LIMIT ?", (max_entradas,)).fetchall()
+            for clave, valor in reversed(filas):
+                self._entradas[clave] = valor
+
+    def obtener(self, clave: str):
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: str):
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                vieja, _ = self._entradas.popitem(last=False)
+                if self._disco is not None:
+                    self._disco.execute("DELETE FROM respuestas WHERE clave = ?", (vieja,))
+            if self._disco is not None:
+                self._disco.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?)", (clave, valor))
+                self._disco.commit()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+cache = CacheLLM()
+
+
+def invocar(modelo, prompt: str, sitio: str = None, validar=None, **kwargs):
+    """
+    modelo.invoke(prompt) pasando por la caché si el sitio está habilitado.
+    Devuelve lo mismo que el modelo: str para OllamaLLM y AIMessage para ChatOllama.
+    validar(texto) -> bool evita guardar respuestas que el llamador no pudo usar.
+    """
+    if sitio is None or sitio not in LLM_CACHE_SITIOS or not isinstance(prompt, str):
+        with admision.llamada_modelo():
+            return modelo.invoke(prompt, **kwargs)
+
+    nombre_modelo = getattr(modelo, "model", type(modelo).__name__)
+    clave = clave_cache(nombre_modelo, prompt, opciones_de(modelo))
+
+    valor = cache.obtener(clave)
+    es_chat = hasattr(modelo, "bind_tools")    # ChatOllama devuelve mensajes, OllamaLLM texto
+    if valor is not None:
+        metricas.contador(f"llm_cache_aciertos_{sitio}", f"Respuestas de '{sitio}' servidas desde la caché").inc()
+        return AIMessage(content=valor) if es_chat else valor
+
+    metricas.contador(f"llm_cache_fallos_{sitio}", f"Llamadas de '{sitio}' que fueron al modelo").inc()
+    with admision.llamada_modelo():
+        respuesta = modelo.invoke(prompt, **kwargs)
+    contenido = respuesta.content if hasattr(respuesta, "content") else respuesta
+    if isinstance(contenido, str) and contenido.strip() and (validar is None or validar(contenido)):
+        cache.guardar(clave, contenido)
+    return respuesta
@@ -0,0 +1,174 @@
+# =============================================================================
+# Precarga y keep-alive de los modelos de Ollama
+# Los modelos se construyen al importar crud.py, pero Ollama recién los carga
+# en memoria con la primera llamada: el primer cliente después de un reinicio
+# (o de un rato sin mensajes, cuando Ollama los descarga) pagaba la carga.
+# - Al arrancar, calentar() carga cada modelo y le hace una llamada corta para
+#   que procese el SYSTEM de su Modelfile; una segunda llamada igual mide la
+#   latencia ya en caliente.
+# - Todas las llamadas piden MODELO_KEEP_ALIVE (formato de Ollama: "30m",
+#   "2h", segundos, -1 = siempre cargado).
+# - Un hilo hace un ping cada MODELO_PING_SEG (una carga sin generar texto)
+#   según MODELO_KEEP_ALIVE_POLITICA: "siempre", "horario" (solo dentro de
+#   MODELO_HORARIO, por ejemplo "8-22": fuera de hora Ollama libera la
+#   memoria y el primer ping del horario los vuelve a cargar antes de que
+#   escriba el primer cliente) o "nunca".
+# =============================================================================
+
+import os
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+import httpx
+
+from app import metricas
+from app.trazas import debug
+
+load_dotenv()
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+MODELO_CALENTAR = os.getenv("MODELO_CALENTAR", "1") == "1"
+MODELO_CALENTAR_TIMEOUT_SEG = float(os.getenv("MODELO_CALENTAR_TIMEOUT_SEG", "180"))
+MODELO_KEEP_ALIVE = os.getenv("MODELO_KEEP_ALIVE", "30m")
+MODELO_KEEP_ALIVE_POLITICA = os.getenv("MODELO_KEEP_ALIVE_POLITICA", "siempre").lower()
+MODELO_HORARIO = os.getenv("MODELO_HORARIO", "8-22")
+MODELO_PING_SEG = float(os.getenv("MODELO_PING_SEG", "240"))
+
+# Un ping que tarda más que esto tuvo que volver a cargar el modelo
+_UMBRAL_RECARGA_SEG = 0.5
+
+
+pings_modelo = metricas.histograma("modelo_ping_segundos", "Duración de los pings de keep-alive a Ollama")
+recargas_modelo = metricas.contador("modelo_recargas_detectadas", "Pings que encontraron el modelo descargado y lo volvieron a cargar")
+errores_ping = metricas.contador("modelo_ping_errores", "Pings o precargas que fallaron")
+
+
+def valor_keep_alive(texto: str = MODELO_KEEP_ALIVE):
+    """'30m' queda como texto; '-1' o '600' pasan a número (así los espera Ollama)."""
+    texto = str(texto).strip()
+    try:
+        return int(texto)
+    except ValueError:
+        return texto
+
+
+def url_ollama(host: str = OLLAMA_HOST) -> str:
+    # OLLAMA_HOST suele venir sin esquema ("localhost:11434"), como lo acepta el cliente de Ollama
+    return (host if "://" in host else f"http://{host}").rstrip("/")
+
+
+def en_horario(hora: int, horario: str = MODELO_HORARIO) -> bool:
+    """'8-22' = de 8 a 21:59; '22-6' cruza la medianoche."""
+    desde, hasta = (int(h) for h in horario.split("-"))
+    if desde <= hasta:
+        return desde <= hora < hasta
+    return hora >= desde or hora < hasta
+
+
+class Calentador:
+    def __init__(self, modelos: dict, url: str = None, keep_alive=MODELO_KEEP_ALIVE,
+                 politica: str = MODELO_KEEP_ALIVE_POLITICA, horario: str = MODELO_HORARIO,
+                 intervalo_ping: float = MODELO_PING_SEG, timeout: float = MODELO_CALENTAR_TIMEOUT_SEG,
+                 transporte=None, hora_actual=lambda: datetime.now().hour):
+        if politica not in ("siempre", "horario", "nunca"):
+            raise ValueError(f"MODELO_KEEP_ALIVE_POLITICA desconocida: {politica} (usar siempre, horario o nunca)")
+        self.modelos = dict(modelos)          # rol ("input", "output") -> nombre del modelo en Ollama
+        self.url = url_ollama(url or OLLAMA_HOST)
+        self.keep_alive = valor_keep_alive(keep_alive)
+        self.politica = politica
+        self.horario = horario
+        self.intervalo_ping = intervalo_ping
+        self.timeout = timeout
+        self._transporte = transporte         # solo para tests (httpx.MockTransport)
+        self._hora_actual = hora_actual
+        self._cliente = None
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def _http(self) -> httpx.Client:
+        if self._cliente is None:
+            self._cliente = httpx.Client(base_url=self.url, timeout=self.timeout, transport=self._transporte)
+        return self._cliente
+
+    def _generar(self, modelo: str, **extra) -> dict:
+        respuesta = self._http().post("/api/generate", json={
+            "model": modelo, "stream": False, "keep_alive": self.keep_alive, **extra,
+        })
+        respuesta.raise_for_status()
+        return respuesta.json()
+
+    # =========================================================================
+    # PRECARGA
+    # =========================================================================
+
+    def _cebar(self, modelo: str):
+        """Llamada mínima que pasa por el SYSTEM del Modelfile. Devuelve (segundos, segundos de carga)."""
+        inicio = time.perf_counter()
+        datos = self._generar(modelo, prompt="hola", options={"num_predict": 1})
+        return time.perf_counter() - inicio, datos.get("load_duration", 0) / 1e9
+
+    def calentar(self) -> dict:
+        """Carga y ceba cada modelo. Devuelve {rol: {"frio", "carga", "caliente"}} en segundos."""
+        resultados = {}
+        for rol, modelo in self.modelos.items():
+            try:
+                frio, carga = self._cebar(modelo)
+                caliente, _ = self._cebar(modelo)
+            except Exception as e:
+                errores_ping.inc()
+                print(f"⚠️ No se pudo precargar el modelo {modelo}: {e}")
+                continue
+            metricas.medidor(f"modelo_{rol}_frio_segundos", f"Primera llamada a {modelo} al arrancar (incluye la carga)").set(frio)
+            metricas.medidor(f"modelo_{rol}_carga_segundos", f"Carga de {modelo} en memoria según Ollama").set(carga)
+            metricas.medidor(f"modelo_{rol}_caliente_segundos", f"Misma llamada a {modelo} con el modelo ya cargado").set(caliente)
+            resultados[rol] = {"frio": frio, "carga": carga, "caliente": caliente}
+            debug(f"🔥 Modelo {modelo} listo: en frío {frio:.2f}s (carga {carga:.2f}s), en caliente {caliente:.2f}s")
+        return resultados
+
+    # =========================================================================
+    # KEEP-ALIVE
+    # =========================================================================
+
+    def toca_ping(self) -> bool:
+        if self.politica == "nunca":
+            return False
+        if self.politica == "horario":
+            return en_horario(self._hora_actual(), self.horario)
+        return True
+
+    def ping(self):
+        """Carga sin generar texto: renueva el keep_alive (o recarga el modelo si Ollama lo había liberado)."""
+        for modelo in self.modelos.values():
+            inicio = time.perf_counter()
+            try:
+                self._generar(modelo)
+            except Exception as e:
+                errores_ping.inc()
+                print(f"⚠️ Falló el keep-alive de {modelo}: {e}")
+                continue
+            duracion = time.perf_counter() - inicio
+            pings_modelo.observar(duracion)
+            if duracion > _UMBRAL_RECARGA_SEG:
+                recargas_modelo.inc()
+                debug(f"♻️ {modelo} estaba descargado: se volvió a cargar en {duracion:.2f}s")
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo_ping):
+            if self.toca_ping():
+                self.ping()
+
+    def iniciar(self):
+        if self._hilo is None and self.politica != "nunca" and self.intervalo_ping > 0:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="keep-alive-modelos", daemon=True)
+            self._hilo.start()
+
+    def cerrar(self, timeout: float = 5.0):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+        if self._cliente is not None:
+            self._cliente.close()
+            self._cliente = None
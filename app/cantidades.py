@@ -0,0 +1,123 @@
+# =============================================================================
+# Cantidades pedidas por el cliente ("agregame dos leches", "una docena de
+# huevos", "media docena", "3 yerbas de medio kilo")
+# El texto se parte en palabras y cifras con una sola regex precompilada y se
+# recorre una vez con una tabla de palabras numéricas. Se toma siempre la
+# expresión más larga ("un par" = 2, "una docena" = 12, "treinta y dos" = 32),
+# y los números seguidos de una unidad de medida ("1kg", "medio kilo",
+# "500 g") se saltean: describen la presentación del producto, no cuántos
+# quiere el cliente.
+# =============================================================================
+
+import re
+
+_TOKENS = re.compile(r"\d+(?:[.,]\d+)?|[^\W\d_]+")
+
+_NUMEROS = {
+    "un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11,
+    "doce": 12, "trece": 13, "catorce": 14, "quince": 15,
+    "dieciseis": 16, "dieciséis": 16, "diecisiete": 17, "dieciocho": 18, "diecinueve": 19,
+    "veinte": 20, "veintiun": 21, "veintiuno": 21, "veintiuna": 21, "veintidos": 22, "veintidós": 22,
+    "veintitres": 23, "veintitrés": 23, "veinticuatro": 24, "veinticinco": 25,
+    "veintiseis": 26, "veintiséis": 26, "veintisiete": 27, "veintiocho": 28, "veintinueve": 29,
+    "treinta": 30, "cuarenta": 40, "cincuenta": 50, "sesenta": 60,
+    "setenta": 70, "ochenta": 80, "noventa": 90,
+    "cien": 100, "ciento": 100, "doscientos": 200, "doscientas": 200, "trescientos": 300,
+    "trescientas": 300, "cuatrocientos": 400, "cuatrocientas": 400, "quinientos": 500,
+    "quinientas": 500, "seiscientos": 600, "seiscientas": 600, "setecientos": 700,
+    "setecientas": 700, "ochocientos": 800, "ochocientas": 800, "novecientos": 900, "novecientas": 900,
+}
+_MULTIPLICADORES = {"docena": 12, "docenas": 12, "par": 2, "pares": 2, "mil": 1000}
+_FRACCIONES = {"medio": 0.5, "media": 0.5, "cuarto": 0.25}
+# Unidades de la presentación del producto
+_UNIDADES = {
+    "kg", "kgs", "kilo", "kilos", "kilogramo", "kilogramos", "g", "gr", "grs", "gramo", "gramos",
+    "l", "lt", "lts", "litro", "litros", "ml", "cc", "mililitro", "mililitros", "cm", "w", "kcal",
+}
+
+
+def _orden(valor: int) -> int:
+    return 100 if valor >= 100 else 10 if valor >= 10 else 1
+
+
+def _expresion(tokens: list, i: int):
+    """Lee la expresión numérica más larga desde tokens[i]: (valor, fin, solo_fraccion) o None."""
+    valor = None
+    escala = 1                 # último multiplicador, para "docena y media"
+    orden_anterior = 1000      # una palabra numérica solo suma si es de un orden menor
+    solo_fraccion = False
+    j = i
+    while j < len(tokens):
+        t = tokens[j]
+        if t[0].isdigit():
+            if valor is not None:
+                break
+            valor = float(t.replace(",", "."))
+            orden_anterior = 0
+        elif t in _NUMEROS:
+            numero = _NUMEROS[t]
+            if _orden(numero) >= orden_anterior:
+                break
+            valor = (valor or 0) + numero
+            orden_anterior = _orden(numero)
+        elif t in _MULTIPLICADORES:
+            escala = _MULTIPLICADORES[t]
+            valor = (1 if valor is None else valor) * escala
+            orden_anterior = 0
+            solo_fraccion = False
+        elif t in _FRACCIONES:
+            if valor is not None and tokens[j - 1] not in ("un", "una"):
+                break
+            # "un cuarto de kilo" es una fracción, no "un" + "cuarto"
+            valor = _FRACCIONES[t]
+            orden_anterior = 0
+            solo_fraccion = True
+        elif t == "y" and valor is not None and j + 1 < len(tokens):
+            siguiente = tokens[j + 1]
+            if siguiente in _FRACCIONES:
+                # "docena y media" = 18, "uno y medio" = 1.5
+                valor += _FRACCIONES[siguiente] * escala
+            elif orden_anterior == 10 and _NUMEROS.get(siguiente, 10) < 10:
+                # "treinta y dos"
+                valor += _NUMEROS[siguiente]
+            else:
+                break
+            orden_anterior = 0
+            j += 1
+        else:
+            break
+        j += 1
+    if valor is None:
+        return None
+    return valor, j, solo_fraccion
+
+
+def _es_unidad(tokens: list, j: int) -> int:
+    """Cuántos tokens ocupa la unidad que sigue en tokens[j] ("kg", "de kilo"); 0 si no hay."""
+    if j < len(tokens) and tokens[j] in _UNIDADES:
+        return 1
+    if j + 1 < len(tokens) and tokens[j] == "de" and tokens[j + 1] in _UNIDADES:
+        return 2
+    return 0
+
+
+def extraer_cantidad(texto: str):
+    """Primera cantidad del mensaje que no sea parte de la presentación del producto, o None."""
+    tokens = _TOKENS.findall(texto.lower())
+    i = 0
+    while i < len(tokens):
+        leido = _expresion(tokens, i)
+        if leido is None:
+            i += 1
+            continue
+        valor, fin, solo_fraccion = leido
+        unidad = _es_unidad(tokens, fin)
+        if unidad:
+            # "1kg", "medio kilo", "500 de gramos": es el tamaño, no la cantidad
+            i = fin + unidad
+            continue
+        if not solo_fraccion and valor > 0:
+            return max(1, round(valor))
+        i = fin
+    return None
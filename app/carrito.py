@@ -0,0 +1,96 @@
+# =============================================================================
+# Carrito de una sesión
+# Cada línea es un objeto con __slots__ guardado por id de producto (o por
+# nombre si no hay id), así agregar un producto que ya está en el carrito es
+# una búsqueda en un dict y no un recorrido de toda la lista. Los importes se
+# guardan en centavos enteros y el total se mantiene al agregar, sin volver a
+# sumar todas las líneas.
+# =============================================================================
+
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def a_centavos(precio) -> int:
+    if not isinstance(precio, Decimal):
+        # str() evita arrastrar el error binario del float (2300.1 -> 2300.0999...)
+        precio = Decimal(str(precio))
+    return int((precio * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def formatear_centavos(centavos: int) -> str:
+    """Mismo formato que f"{importe:.2f}"."""
+    signo = "-" if centavos < 0 else ""
+    centavos = abs(centavos)
+    return f"{signo}{centavos // 100}.{centavos % 100:02d}"
+
+
+class LineaCarrito:
+    __slots__ = ("producto_id", "producto", "cantidad", "precio_centavos")
+
+    def __init__(self, producto_id, producto: str, cantidad: int, precio_centavos: int):
+        self.producto_id = producto_id
+        self.producto = producto
+        self.cantidad = cantidad
+        self.precio_centavos = precio_centavos
+
+    @property
+    def subtotal_centavos(self) -> int:
+        return self.precio_centavos * self.cantidad
+
+
+class Carrito:
+    __slots__ = ("_lineas", "_por_nombre", "total_centavos")
+
+    def __init__(self):
+        self._lineas = {}           # clave (id o nombre) -> LineaCarrito, en orden de alta
+        self._por_nombre = {}       # nombre en minúsculas -> clave
+        self.total_centavos = 0
+
+    def agregar(self, producto: str, cantidad: int, precio, producto_id=None):
+        """Suma 'cantidad' unidades. Devuelve (línea, True si la línea es nueva)."""
+        nombre = producto.lower()
+        clave = self._por_nombre.get(nombre) if producto_id is None else producto_id
+        linea = self._lineas.get(clave) if clave is not None else None
+        if linea is None and producto_id is not None:
+            # El mismo producto pudo haberse agregado antes solo por nombre
+            linea = self._lineas.get(self._por_nombre.get(nombre))
+        nueva = linea is None
+        if nueva:
+            clave = producto_id if producto_id is not None else nombre
+            linea = self._lineas[clave] = LineaCarrito(producto_id, producto, 0, a_centavos(precio))
+            self._por_nombre[nombre] = clave
+        linea.cantidad += cantidad
+        self.total_centavos += linea.precio_centavos * cantidad
+        return linea, nueva
+
+    def fijar(self, producto: str, cantidad: int, precio_centavos: int, producto_id=None):
+        """Deja la línea con exactamente 'cantidad' unidades (al recuperar el diario de carritos)."""
+        linea, _ = self.agregar(producto, 0, Decimal(precio_centavos) / 100, producto_id)
+        self.total_centavos += linea.precio_centavos * (cantidad - linea.cantidad)
+        linea.cantidad = cantidad
+        return linea
+
+    def vaciar(self):
+        self._lineas.clear()
+        self._por_nombre.clear()
+        self.total_centavos = 0
+
+    def __iter__(self):
+        return iter(self._lineas.values())
+
+    def __len__(self):
+        return len(self._lineas)
+
+    # =========================================================================
+    # SERIALIZACIÓN (backend_sesiones)
+    # =========================================================================
+
+    def a_compacto(self) -> list:
+        return [[l.producto_id, l.producto, l.cantidad, l.precio_centavos] for l in self._lineas.values()]
+
+    @classmethod
+    def desde_compacto(cls, lineas: list):
+        carrito = cls()
+        for producto_id, producto, cantidad, precio_centavos in lineas:
+            carrito.fijar(producto, cantidad, precio_centavos, producto_id)
+        return carrito
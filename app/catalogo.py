@@ -0,0 +1,246 @@
+# =============================================================================
+# Índice del catálogo en memoria
+# Carga una sola vez productos + marcas + categorías y responde las mismas
+# búsquedas que hacían los LIKE de get_product_info (categoría exacta, prefijo
+# y "contiene") sin ir a MySQL. Se refresca solo cuando cambia la versión de la
+# tabla productos (cantidad, fecha_alta, precios y stock).
+# =============================================================================
+
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from dotenv import load_dotenv
+
+from app.database import consultar
+from app import metricas
+
+load_dotenv()
+
+# Cada cuántos segundos, como máximo, se consulta la versión del catálogo en la BD
+CATALOGO_VERIFICAR_SEG = float(os.getenv("CATALOGO_VERIFICAR_SEG", "30"))
+
+
+recargas_catalogo = metricas.contador("catalogo_recargas", "Veces que se recargó el índice del catálogo")
+productos_en_indice = metricas.medidor("catalogo_productos", "Productos cargados en el índice")
+busquedas_catalogo = metricas.histograma(
+    "catalogo_busqueda_segundos", "Duración de una búsqueda en el índice",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01),
+)
+
+
+QUERY_CATALOGO = """SELECT
+    p.id,
+    p.nombre AS producto,
+    p.descripcion,
+    p.precio_costo,
+    p.precio_venta,
+    p.stock,
+    m.nombre AS marca,
+    c.nombre AS categoria,
+    c.id AS categoria_id
+    FROM productos p
+    INNER JOIN marcas m ON p.marca_id = m.id
+    INNER JOIN categorias c ON p.categoria_id = c.id
+    ORDER BY p.nombre ASC;"""
+
+QUERY_CATEGORIAS = "SELECT id, nombre FROM categorias;"
+
+# Huella barata de la tabla: cambia si se agregan/borran productos o se tocan precios y stock
+QUERY_VERSION = """SELECT
+    COUNT(*) AS cantidad,
+    MAX(fecha_alta) AS ultima_alta,
+    SUM(precio_venta) AS suma_precios,
+    SUM(stock) AS suma_stock,
+    (SELECT COUNT(*) FROM categorias) AS categorias,
+    (SELECT COUNT(*) FROM marcas) AS marcas
+    FROM productos;"""
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios simples (igual que la collation _ci de MySQL)."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.split())
+
+
+def _rango_prefijo(lista_ordenada, prefijo: str):
+    """Devuelve los elementos (clave, valor) cuya clave empieza con el prefijo."""
+    inicio = bisect_left(lista_ordenada, (prefijo,))
+    for i in range(inicio, len(lista_ordenada)):
+        clave, valor = lista_ordenada[i]
+        if not clave.startswith(prefijo):
+            break
+        yield valor
+
+
+# =============================================================================
+# ÍNDICE INMUTABLE (se reemplaza entero en cada recarga)
+# =============================================================================
+
+class IndiceCatalogo:
+    def __init__(self, filas: list, categorias: list):
+        # filas en el mismo formato que devolvía get_product_info (ordenadas por nombre)
+        self.filas = sorted(filas, key=lambda f: (normalizar(f["producto"]), f["producto"]))
+        self.posicion = {f["id"]: i for i, f in enumerate(self.filas)}
+
+        self.nombres = {}          # id -> nombre normalizado
+        nombres_producto = []      # (nombre normalizado, id)
+        por_marca = {}             # marca normalizada -> [ids]
+        por_categoria = {}         # categoría normalizada -> [ids]
+        por_token = {}             # token -> {ids}
+
+        for f in self.filas:
+            nombre = normalizar(f["producto"])
+            self.nombres[f["id"]] = nombre
+            nombres_producto.append((nombre, f["id"]))
+            por_marca.setdefault(normalizar(f["marca"] or ""), []).append(f["id"])
+            por_categoria.setdefault(normalizar(f["categoria"] or ""), []).append(f["id"])
+            for token in nombre.split():
+                por_token.setdefault(token, set()).add(f["id"])
+
+        # Categorías existentes aunque no tengan productos (para el match exacto)
+        self.categorias = {normalizar(c["nombre"]): por_categoria.get(normalizar(c["nombre"]), []) for c in categorias}
+
+        self._nombres_producto = sorted(nombres_producto)
+        self._marcas = sorted(por_marca.items())
+        self._categorias = sorted(por_categoria.items())
+        self._por_token = por_token
+        # Palabras que, solas, identifican algo del catálogo (para el clasificador por reglas)
+        self._terminos = set(self.categorias) | {m for m in por_marca if m} | {t for t in por_token if len(t) >= 3}
+        # Sufijos de cada token distinto: permite buscar subcadenas con bisect
+        self._sufijos = sorted({(token[i:], token) for token in por_token for i in range(len(token))})
+
+    def __len__(self):
+        return len(self.filas)
+
+    def _ordenar(self, ids) -> list:
+        return [self.filas[i] for i in sorted(self.posicion[pid] for pid in ids)]
+
+    def existe_termino(self, texto: str) -> bool:
+        """True si el texto es una categoría, una marca o una palabra de algún nombre de producto."""
+        return normalizar(texto) in self._terminos
+
+    def por_categoria(self, nombre: str):
+        ids = self.categorias.get(normalizar(nombre))
+        return None if ids is None else self._ordenar(ids)
+
+    def por_prefijo(self, prefijo: str) -> list:
+        """Equivale a: nombre LIKE 'prefijo%' OR marca LIKE 'prefijo%' OR categoría LIKE 'prefijo%'."""
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+        ids = set(_rango_prefijo(self._nombres_producto, prefijo))
+        for lista in _rango_prefijo(self._marcas, prefijo):
+            ids.update(lista)
+        for lista in _rango_prefijo(self._categorias, prefijo):
+            ids.update(lista)
+        return self._ordenar(ids)
+
+    def por_contenido(self, texto: str) -> list:
+        """Equivale a: nombre LIKE '%texto%' AND NOT nombre LIKE 'texto%'."""
+        texto = normalizar(texto)
+        if not texto:
+            return []
+        primer_token = texto.split()[0]
+        candidatos = set()
+        for token in _rango_prefijo(self._sufijos, primer_token):
+            candidatos.update(self._por_token[token])
+        ids = [pid for pid in candidatos if texto in self.nombres[pid] and not self.nombres[pid].startswith(texto)]
+        return self._ordenar(ids)
+
+    def buscar(self, product_name: str):
+        """
+        Mismo orden de búsqueda que get_product_info:
+        1. categoría con nombre exacto
+        2. productos/marcas/categorías que empiezan con la primera palabra
+        3. productos cuyo nombre contiene el texto completo
+        Devuelve None si no hubo ninguna coincidencia.
+        """
+        inicio = time.perf_counter()
+        try:
+            texto = normalizar(product_name)
+            categoria = self.por_categoria(texto)
+            if categoria is not None:
+                return categoria
+
+            palabras = texto.split()
+            primera_palabra = palabras[0] if palabras else texto
+            resultados = self.por_prefijo(primera_palabra) or self.por_contenido(texto)
+            return resultados or None
+        finally:
+            busquedas_catalogo.observar(time.perf_counter() - inicio)
+
+    def buscar_varios(self, nombres) -> list:
+        """
+        Busca varios nombres de una sola pasada (por ejemplo, los ingredientes de un plato).
+        Devuelve los productos encontrados sin repetir, en el orden en que aparecen.
+        """
+        vistos = set()
+        encontrados = []
+        for nombre in dict.fromkeys(normalizar(n) for n in nombres if n and n.strip()):
+            for fila in self.buscar(nombre) or []:
+                if fila["id"] not in vistos:
+                    vistos.add(fila["id"])
+                    encontrados.append(fila)
+        return encontrados
+
+
+# =============================================================================
+# CARGA Y REFRESCO DESDE LA BASE DE DATOS
+# =============================================================================
+
+def _leer_catalogo_bd():
+    return consultar(QUERY_CATALOGO), consultar(QUERY_CATEGORIAS)
+
+
+def _leer_version_bd():
+    return tuple(str(v) for v in consultar(QUERY_VERSION)[0].values())
+
+
+class Catalogo:
+    def __init__(self, leer_catalogo=_leer_catalogo_bd, leer_version=_leer_version_bd,
+                 intervalo_verificacion: float = CATALOGO_VERIFICAR_SEG):
+        self._leer_catalogo = leer_catalogo
+        self._leer_version = leer_version
+        self.intervalo_verificacion = intervalo_verificacion
+        self._indice = None
+        self._version = None
+        self._ultima_verificacion = None
+        self._lock = threading.Lock()
+
+    def refrescar(self, forzar: bool = False):
+        """Recarga el índice si cambió la versión del catálogo (o si se fuerza)."""
+        with self._lock:
+            # Antes de consultar: si la base no responde, el próximo intento también espera el intervalo
+            self._ultima_verificacion = time.monotonic()
+            try:
+                version = self._leer_version()
+                if not forzar and self._indice is not None and version == self._version:
+                    return self._indice
+
+                datos = self._leer_catalogo()
+                if datos is None:
+                    return self._indice
+                filas, categorias = datos
+                self._indice = IndiceCatalogo(filas, categorias)
+                self._version = version
+                recargas_catalogo.inc()
+                productos_en_indice.set(len(self._indice))
+                print(f"🗂️  Catálogo cargado en memoria: {len(self._indice)} productos")
+            except Exception as e:
+                print(f"⚠️ Error cargando el catálogo en memoria: {e}")
+            return self._indice
+
+    def obtener_indice(self):
+        """Devuelve el índice vigente (None si todavía no se pudo cargar); cada tanto verifica si hay que refrescarlo."""
+        if self._ultima_verificacion is None or time.monotonic() - self._ultima_verificacion >= self.intervalo_verificacion:
+            # Si otro hilo ya está refrescando, se sigue usando el índice actual
+            if self._indice is None or not self._lock.locked():
+                return self.refrescar()
+        return self._indice
+
+
+# Instancia compartida
+catalogo = Catalogo()
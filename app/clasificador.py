@@ -0,0 +1,117 @@
+# =============================================================================
+# Clasificador de intenciones por reglas (antes de la IA input)
+# Mensajes como "hola", "gracias", "mostrame el pedido" o "¿tienen yerba?" no
+# necesitan al modelo: se resuelven con expresiones regulares y con los
+# nombres del catálogo en memoria. Si el mensaje no calza de forma clara con
+# ninguna regla, se devuelve None y sigue la detección con IA.
+# =============================================================================
+
+import re
+import time
+
+from app import metricas
+from app.catalogo import catalogo, normalizar
+from app.trazas import debug
+
+
+resueltos_por_reglas = metricas.contador("clasificador_resueltos", "Mensajes clasificados sin llamar al modelo input")
+derivados_a_ia = metricas.contador("clasificador_derivados_ia", "Mensajes que el clasificador dejó para la IA")
+fraccion_resuelta = metricas.medidor("clasificador_fraccion_resuelta", "Proporción de mensajes resueltos sin el modelo input")
+duracion_clasificador = metricas.histograma(
+    "clasificador_segundos", "Duración de la clasificación por reglas",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005),
+)
+
+
+# =============================================================================
+# REGLAS (sobre el texto normalizado: minúsculas, sin tildes ni signos)
+# Las reglas exigen que el mensaje completo calce: "mostrame el pedido" sí,
+# "mostrame el pedido y agregá leche" no (eso lo resuelve la IA).
+# =============================================================================
+
+_CORTESIA = r"(?: (?:por favor|porfa|porfi|gracias))?"
+_PEDIDO = r"(?:el |mi |todo el )?(?:pedido|carrito|changuito|compra)"
+
+REGLAS = [
+    ("MOSTRAR_PEDIDO", 98, re.compile(
+        rf"^(?:(?:me )?(?:mostras|mostrame|mostrar|mostra|muestrame|pasame|ver|quiero ver|puedo ver|como va|que tengo en)"
+        rf" {_PEDIDO}|{_PEDIDO}){_CORTESIA}$")),
+    ("VACIAR_PEDIDO", 97, re.compile(
+        rf"^(?:vacia|vaciame|vaciar|borra|borrame|borrar|elimina|eliminar|limpia|limpiar|cancela|cancelar)"
+        rf" {_PEDIDO}{_CORTESIA}$")),
+    # Solo el pedido explícito: FINALIZAR toma el mensaje siguiente como datos de envío, y
+    # "nada más, gracias" o "eso es todo" también son despedidas (los decide la IA con el contexto)
+    ("FINALIZAR_PEDIDO", 95, re.compile(
+        rf"^(?:quiero )?(?:finalizar|finaliza|terminar|confirmar|confirma|cerrar) {_PEDIDO}{_CORTESIA}$")),
+    ("CHARLAR", 95, re.compile(
+        r"^(?:hola+|holis|buenas|buen dia|buenos dias|buenas tardes|buenas noches|que tal|como estas|como andas"
+        r"|gracias|muchas gracias|mil gracias|chau|adios|hasta luego|nos vemos)"
+        r"(?: (?:hola|buenas|como estas|como andas|que tal|gracias|chau))*$")),
+]
+
+# "¿tienen yerba?", "hay leche y pan", "venden gaseosa" -> CONSULTAR_INFO si todo existe en el catálogo
+CONSULTA = re.compile(r"^(?:tenes|tienen|tiene|hay|venden|vendes|tendras|tendran) (.+)$")
+SEPARADOR_PRODUCTOS = re.compile(r",| y | e ")
+ARTICULO = re.compile(r"^(?:el|la|los|las|un|una|unos|unas|algo de|algun|alguna) ")
+
+
+def _texto_normalizado(user_input: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", normalizar(user_input)).split())
+
+
+def _termino_en_catalogo(texto: str):
+    """Devuelve cómo buscar 'texto' en el catálogo (en singular si hace falta) o None si no existe."""
+    indice = catalogo.obtener_indice()
+    if indice is None:
+        return None
+    for candidato in (texto, texto[:-2] if texto.endswith("es") else None, texto[:-1] if texto.endswith("s") else None):
+        if candidato and indice.existe_termino(candidato):
+            return candidato
+    # "leche entera", "pan integral": cada palabra tiene que existir en el catálogo
+    palabras = [p for p in texto.split() if p not in ("de", "con", "sin")]
+    if len(palabras) > 1 and all(_termino_en_catalogo(p) for p in palabras):
+        return texto
+    return None
+
+
+def _consulta_de_catalogo(texto: str):
+    coincidencia = CONSULTA.match(texto)
+    if not coincidencia:
+        return None
+    productos = []
+    for parte in SEPARADOR_PRODUCTOS.split(coincidencia.group(1)):
+        parte = ARTICULO.sub("", parte.strip())
+        termino = _termino_en_catalogo(parte) if parte else None
+        if termino is None:
+            return None
+        productos.append(termino)
+    return productos or None
+
+
+def clasificar(user_input: str):
+    """
+    Devuelve un dict como el de detectar_intencion_estructurada
+    (intencion, confianza, productos, cantidad) o None si conviene preguntarle a la IA.
+    """
+    inicio = time.perf_counter()
+    texto = _texto_normalizado(user_input)
+
+    detectado = None
+    for intencion, confianza, regla in REGLAS:
+        if regla.match(texto):
+            detectado = {"intencion": intencion, "confianza": confianza, "productos": [], "cantidad": None}
+            break
+    else:
+        productos = _consulta_de_catalogo(texto)
+        if productos:
+            detectado = {"intencion": "CONSULTAR_INFO", "confianza": 90, "productos": productos, "cantidad": None}
+
+    duracion_clasificador.observar(time.perf_counter() - inicio)
+    if detectado is None:
+        derivados_a_ia.inc()
+    else:
+        resueltos_por_reglas.inc()
+        debug(f"📏 Intención resuelta por reglas: {detectado}")
+    resueltos = resueltos_por_reglas.valor
+    fraccion_resuelta.set(resueltos / ((resueltos + derivados_a_ia.valor) or 1))
+    return detectado
@@ -0,0 +1,342 @@
+# =============================================================================
+# Almacenamiento de conversaciones
+# Cada sesión se guarda en dos archivos de solo-agregar:
+#   conversaciones/<sesion>.conv  registros: largo del texto (u32) + fecha en
+#                                 segundos (u32) + rol (u8) + texto en UTF-8
+#   conversaciones/<sesion>.idx   offset de cada registro en el .conv (u64)
+# Con el índice, los últimos N mensajes son un seek y una lectura sin importar
+# el largo de la conversación, y un rango de fechas se busca por bisección.
+# Los mensajes de varias líneas ya no hay que adivinarlos: el largo está en el
+# registro. Los .txt del formato anterior se migran la primera vez que se usa
+# la sesión, o todos juntos con:
+#   python -m app.conversaciones migrar [carpeta] [--borrar-txt]
+# =============================================================================
+
+import argparse
+import calendar
+import os
+import struct
+import sys
+import threading
+import time
+
+CARPETA_CONVERSACIONES = "conversaciones"
+EXT_DATOS = ".conv"
+EXT_INDICE = ".idx"
+EXT_TEXTO = ".txt"
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+ROLES = ("user", "bot")
+
+_CABECERA = struct.Struct("<IIB")   # largo, fecha, rol
+_OFFSET = struct.Struct("<Q")
+
+_lock_migracion = threading.Lock()
+
+
+# =============================================================================
+# CODIFICACIÓN
+# =============================================================================
+
+def a_segundos(fecha: str) -> int:
+    # Las fechas del log no tienen zona horaria: se guardan tal cual (como si fueran UTC)
+    return calendar.timegm(time.strptime(fecha, FORMATO_FECHA))
+
+
+def a_fecha(segundos: int) -> str:
+    return time.strftime(FORMATO_FECHA, time.gmtime(segundos))
+
+
+def codificar(mensaje: dict) -> bytes:
+    """Registro binario de un mensaje {"timestamp", "role", "content"}."""
+    texto = mensaje["content"].encode("utf-8")
+    return _CABECERA.pack(len(texto), a_segundos(mensaje["timestamp"]), ROLES.index(mensaje["role"])) + texto
+
+
+def _decodificar(datos: bytes, posicion: int, cantidad: int) -> list:
+    mensajes = []
+    for _ in range(cantidad):
+        largo, segundos, rol = _CABECERA.unpack_from(datos, posicion)
+        posicion += _CABECERA.size
+        mensajes.append({
+            "timestamp": a_fecha(segundos),
+            "role": ROLES[rol],
+            "content": datos[posicion:posicion + largo].decode("utf-8", "replace"),
+        })
+        posicion += largo
+    return mensajes
+
+
+# =============================================================================
+# FORMATO ANTERIOR (.txt) Y MIGRACIÓN
+# =============================================================================
+
+def leer_txt(ruta: str) -> list:
+    """Parsea un log del formato anterior ('fecha - De <num>: ...' / 'fecha - Bot: ...')."""
+    if not os.path.exists(ruta):
+        return []
+
+    historial = []
+    rol_actual = None
+    contenido_actual = []
+    timestamp_actual = None
+
+    with open(ruta, "r", encoding="utf-8") as file:
+        for linea in file:
+            linea = linea.rstrip()
+            if " - De " in linea or " - Bot: " in linea:
+                # Guardar el bloque anterior antes de pasar al siguiente
+                if rol_actual and contenido_actual:
+                    historial.append({
+                        "timestamp": timestamp_actual,
+                        "role": rol_actual,
+                        "content": "\n".join(contenido_actual).strip()
+                    })
+                    contenido_actual = []
+
+                timestamp_actual = linea[:19]
+
+                if " - De " in linea:
+                    rol_actual = "user"
+                    contenido_actual.append(linea.split(" - De ", 1)[1].split(": ", 1)[-1])
+                else:
+                    rol_actual = "bot"
+                    contenido_actual.append(linea.split(" - Bot: ", 1)[1])
+            else:
+                # Línea que continúa el mensaje anterior
+                contenido_actual.append(linea)
+
+        # Guardar el último bloque
+        if rol_actual and contenido_actual:
+            historial.append({
+                "timestamp": timestamp_actual,
+                "role": rol_actual,
+                "content": "\n".join(contenido_actual).strip()
+            })
+
+    return historial
+
+
+def migrar_txt(ruta_txt: str, ruta_base: str) -> int:
+    """Convierte un .txt al formato nuevo. Devuelve cuántos mensajes se migraron."""
+    datos = bytearray()
+    offsets = bytearray()
+    anterior = 0
+    for mensaje in leer_txt(ruta_txt):
+        try:
+            a_segundos(mensaje["timestamp"])
+        except ValueError:
+            # Línea con fecha rota: se le pone la del mensaje anterior
+            mensaje["timestamp"] = a_fecha(anterior)
+        anterior = a_segundos(mensaje["timestamp"])
+        offsets += _OFFSET.pack(len(datos))
+        datos += codificar(mensaje)
+
+    # Primero el índice y después los datos: si se corta en el medio, la
+    # migración se repite porque el .conv todavía no existe
+    for ruta, contenido in ((ruta_base + EXT_INDICE, offsets), (ruta_base + EXT_DATOS, datos)):
+        with open(ruta + ".tmp", "wb") as f:
+            f.write(contenido)
+        os.replace(ruta + ".tmp", ruta)
+    return len(offsets) // _OFFSET.size
+
+
+def migrar_si_hace_falta(ruta_base: str):
+    """Migración perezosa: la primera vez que se usa una sesión con log .txt."""
+    if os.path.exists(ruta_base + EXT_DATOS) or not os.path.exists(ruta_base + EXT_TEXTO):
+        return
+    with _lock_migracion:
+        if not os.path.exists(ruta_base + EXT_DATOS):
+            cantidad = migrar_txt(ruta_base + EXT_TEXTO, ruta_base)
+            print(f"📦 Conversación migrada: {ruta_base}{EXT_TEXTO} ({cantidad} mensajes)")
+
+
+def migrar_carpeta(carpeta: str = CARPETA_CONVERSACIONES, borrar_txt: bool = False) -> dict:
+    resultado = {"archivos": 0, "mensajes": 0, "bytes_txt": 0, "bytes_nuevos": 0}
+    for nombre in sorted(os.listdir(carpeta)):
+        if not nombre.endswith(EXT_TEXTO):
+            continue
+        ruta_txt = os.path.join(carpeta, nombre)
+        ruta_base = ruta_txt[:-len(EXT_TEXTO)]
+        if os.path.exists(ruta_base + EXT_DATOS):
+            continue
+        resultado["archivos"] += 1
+        resultado["mensajes"] += migrar_txt(ruta_txt, ruta_base)
+        resultado["bytes_txt"] += os.path.getsize(ruta_txt)
+        resultado["bytes_nuevos"] += os.path.getsize(ruta_base + EXT_DATOS) + os.path.getsize(ruta_base + EXT_INDICE)
+        if borrar_txt:
+            os.remove(ruta_txt)
+    return resultado
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+class Conversacion:
+    def __init__(self, ruta_base: str):
+        self.ruta_datos = ruta_base + EXT_DATOS
+        self.ruta_indice = ruta_base + EXT_INDICE
+        migrar_si_hace_falta(ruta_base)
+
+    def cantidad(self) -> int:
+        try:
+            return os.path.getsize(self.ruta_indice) // _OFFSET.size
+        except OSError:
+            return 0
+
+    def _leer(self, desde: int, hasta: int) -> list:
+        """Mensajes [desde, hasta) según el índice."""
+        if desde >= hasta:
+            return []
+        total = self.cantidad()
+        with open(self.ruta_indice, "rb") as f:
+            f.seek(desde * _OFFSET.size)
+            # Un offset de más para saber dónde termina el último registro pedido
+            offsets = f.read((min(hasta + 1, total) - desde) * _OFFSET.size)
+        inicio = _OFFSET.unpack_from(offsets, 0)[0]
+        with open(self.ruta_datos, "rb") as f:
+            f.seek(inicio)
+            if hasta < total:
+                datos = f.read(_OFFSET.unpack_from(offsets, (hasta - desde) * _OFFSET.size)[0] - inicio)
+            else:
+                datos = f.read()
+        return _decodificar(datos, 0, hasta - desde)
+
+    def ultimos(self, cantidad: int) -> list:
+        total = self.cantidad()
+        return self._leer(max(total - cantidad, 0), total) if cantidad > 0 else []
+
+    def todos(self) -> list:
+        return self._leer(0, self.cantidad())
+
+    def _primero_desde(self, fi, fd, total: int, segundos: int) -> int:
+        """Primer índice con fecha >= segundos (las fechas crecen en orden de llegada)."""
+        bajo, alto = 0, total
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            fi.seek(medio * _OFFSET.size)
+            fd.seek(_OFFSET.unpack(fi.read(_OFFSET.size))[0])
+            if _CABECERA.unpack(fd.read(_CABECERA.size))[1] < segundos:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def entre(self, desde: str, hasta: str) -> list:
+        """Mensajes con fecha entre 'desde' y 'hasta' (inclusive), en formato YYYY-mm-dd HH:MM:SS."""
+        total = self.cantidad()
+        if not total:
+            return []
+        with open(self.ruta_indice, "rb") as fi, open(self.ruta_datos, "rb") as fd:
+            inicio = self._primero_desde(fi, fd, total, a_segundos(desde))
+            fin = self._primero_desde(fi, fd, total, a_segundos(hasta) + 1)
+        return self._leer(inicio, fin)
+
+
+# =============================================================================
+# ESCRITURA (la usa el hilo escritor de conversaciones)
+# =============================================================================
+
+class Anotador:
+    def __init__(self, ruta_base: str):
+        self.ruta_datos = ruta_base + EXT_DATOS
+        self.ruta_indice = ruta_base + EXT_INDICE
+        carpeta = os.path.dirname(ruta_base)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        migrar_si_hace_falta(ruta_base)
+        self.fin = self._reparar()
+        self.datos = open(self.ruta_datos, "ab")
+        self.indice = open(self.ruta_indice, "ab")
+
+    def _reparar(self) -> int:
+        """Deja índice y datos consistentes si una escritura anterior quedó a medias."""
+        with open(self.ruta_datos, "a+b") as fd, open(self.ruta_indice, "a+b") as fi:
+            tamanio = fd.seek(0, os.SEEK_END)
+            total = fi.seek(0, os.SEEK_END) // _OFFSET.size
+            posicion = 0
+            # Descartar entradas del índice cuyo registro no llegó completo
+            while total:
+                fi.seek((total - 1) * _OFFSET.size)
+                offset = _OFFSET.unpack(fi.read(_OFFSET.size))[0]
+                fd.seek(offset)
+                cabecera = fd.read(_CABECERA.size)
+                if len(cabecera) == _CABECERA.size:
+                    fin = offset + _CABECERA.size + _CABECERA.unpack(cabecera)[0]
+                    if fin <= tamanio:
+                        posicion = fin
+                        break
+                total -= 1
+            fi.truncate(total * _OFFSET.size)
+
+            # Registros completos que no llegaron al índice
+            fi.seek(0, os.SEEK_END)
+            while posicion + _CABECERA.size <= tamanio:
+                fd.seek(posicion)
+                fin = posicion + _CABECERA.size + _CABECERA.unpack(fd.read(_CABECERA.size))[0]
+                if fin > tamanio:
+                    break
+                fi.write(_OFFSET.pack(posicion))
+                posicion = fin
+            if posicion < tamanio:
+                fd.truncate(posicion)
+        return posicion
+
+    def agregar(self, mensajes: list):
+        datos = bytearray()
+        offsets = bytearray()
+        for mensaje in mensajes:
+            offsets += _OFFSET.pack(self.fin + len(datos))
+            datos += codificar(mensaje)
+        # Los datos van antes que el índice: un lector nunca ve un offset sin su registro
+        self.datos.write(datos)
+        self.datos.flush()
+        self.indice.write(offsets)
+        self.indice.flush()
+        self.fin += len(datos)
+
+    def close(self):
+        self.datos.close()
+        self.indice.close()
+
+
+# =============================================================================
+# LÍNEA DE COMANDOS
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.conversaciones")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    migrar = comandos.add_parser("migrar", help="convierte los .txt de la carpeta al formato indexado")
+    migrar.add_argument("carpeta", nargs="?", default=CARPETA_CONVERSACIONES)
+    migrar.add_argument("--borrar-txt", action="store_true", help="borra cada .txt después de migrarlo")
+
+    ver = comandos.add_parser("ver", help="muestra una conversación con el formato de texto anterior")
+    ver.add_argument("sesion", help="ruta sin extensión, por ejemplo conversaciones/5491100")
+    ver.add_argument("--ultimos", type=int, default=0)
+    ver.add_argument("--desde")
+    ver.add_argument("--hasta")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "migrar":
+        r = migrar_carpeta(args.carpeta, args.borrar_txt)
+        print(f"📦 {r['archivos']} archivos, {r['mensajes']} mensajes: "
+              f"{r['bytes_txt']} bytes en .txt -> {r['bytes_nuevos']} bytes (.conv + .idx)")
+        return
+
+    conversacion = Conversacion(args.sesion)
+    if args.desde or args.hasta:
+        mensajes = conversacion.entre(args.desde or a_fecha(0), args.hasta or a_fecha(2**32 - 1))
+    elif args.ultimos:
+        mensajes = conversacion.ultimos(args.ultimos)
+    else:
+        mensajes = conversacion.todos()
+    for m in mensajes:
+        quien = "De cliente" if m["role"] == "user" else "Bot"
+        sys.stdout.write(f"{m['timestamp']} - {quien}: {m['content']}\n")
+
+
+if __name__ == "__main__":
+    main()
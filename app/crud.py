@@ -6,18 +6,41 @@
 
 import os
 import re
-from text_to_num import text2num
-from word2number import w2n
+import json
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
 from fastapi import HTTPException
+from sqlalchemy import text
 
 from langchain_ollama import OllamaLLM, ChatOllama
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from app.pedidos import agregar_a_pedido, mostrar_pedido, finalizar_pedido
-from app.database import connect_to_db
-from app.info_super import leer_info_supermercado
+from app.pedidos import agregar_a_pedido, mostrar_pedido, vaciar_pedido, finalizar_pedido
+from app.database import obtener_conexion
+from app.catalogo import catalogo
+from app.resumenes import ColaResumenes
+from app import historial
+from app.sesiones import sesiones, HistorialChatAcotado
+from app.backend_sesiones import turno_sesion
+from app.admision import admision
+from app.cache_llm import invocar
+from app.calentamiento import Calentador, valor_keep_alive
+from app.streaming import invocar_con_streaming
+from app import clasificador
+from app.cantidades import extraer_cantidad
+from app.productos_mostrados import ProductosMostrados, lista_con_vinetas
+from app.trazas import debug, etapa
+from app.escritor_conversaciones import escritor
+from app.info_super import fragmento_info_supermercado
+
+load_dotenv()
+
+# Modo rápido: detección en JSON + respuestas por plantilla para intenciones deterministas
+MODO_RAPIDO = os.getenv("MODO_RAPIDO", "0").lower() in ("1", "true", "si", "yes")
+# Clasificador por reglas antes de la IA input (saludos, ver/vaciar/finalizar pedido, "¿tienen X?")
+CLASIFICADOR_REGLAS = os.getenv("CLASIFICADOR_REGLAS", "1").lower() in ("1", "true", "si", "yes")
 
 
 # =============================================================================
@@ -36,17 +59,28 @@ from app.info_super import leer_info_supermercado
 # MODELOS DE IA
 # =============================================================================
 
-modelo_input = OllamaLLM(model="gemma3_input:latest")
-modelo_output = ChatOllama(model="gemma3_output:latest")
+MODELO_INPUT = "gemma3_input:latest"
+MODELO_OUTPUT = "gemma3_output:latest"
+
+# keep_alive en cada llamada: si no, Ollama vuelve a su valor por defecto (5 minutos)
+modelo_input = OllamaLLM(model=MODELO_INPUT, keep_alive=valor_keep_alive())
+modelo_input_json = OllamaLLM(model=MODELO_INPUT, format="json", keep_alive=valor_keep_alive())   # salida restringida a JSON
+modelo_output = ChatOllama(model=MODELO_OUTPUT, keep_alive=valor_keep_alive())
+
+# Precarga al arrancar y pings de keep-alive (se inicia en el lifespan de main.py)
+calentador = Calentador({"input": MODELO_INPUT, "output": MODELO_OUTPUT})
 
 # =============================================================================
 # CONFIGURACIÓN DEL PROMPT Y DEL HISTORIAL
 # =============================================================================
 
+# Sin mensaje de sistema: Ollama usaría ese en lugar del SYSTEM del Modelfile.
+# La información del supermercado va como bloque rotulado antes del mensaje
+# (ya armado y cacheado; el historial guarda solo {input})
 prompt = ChatPromptTemplate.from_messages([
     MessagesPlaceholder(variable_name="history"),
-    ("human", "{input}")
-])
+    ("human", "{info_supermercado}{input}")
+]).partial(info_supermercado=fragmento_info_supermercado)
 
 chain = prompt | modelo_output
 
@@ -54,10 +88,11 @@ chain = prompt | modelo_output
 # HISTORIAL EN MEMORIA
 # =============================================================================
 
-store = {}
+# Historial acotado (mensajes/tokens) y sesiones desalojadas por LRU + inactividad
+store = sesiones.espacio("historial_chat")
 def get_session_history(session_id: str):
     if session_id not in store:
-        store[session_id] = InMemoryChatMessageHistory()
+        store[session_id] = HistorialChatAcotado()
     return store[session_id]
 # store = {}
 
@@ -90,49 +125,7 @@ with_message_history = RunnableWithMessageHistory(
 # =============================================================================
 
 def log_historial_archivo(session_id: str) -> list:
-    ruta_archivo = os.path.join("conversaciones", f"{session_id}.txt")
-    if not os.path.exists(ruta_archivo):
-        return []
-
-    historial = []
-    rol_actual = None
-    contenido_actual = []
-    timestamp_actual = None
-
-    with open(ruta_archivo, "r", encoding="utf-8") as file:
-        for linea in file:
-            linea = linea.rstrip()
-            if " - De " in linea or " - Bot: " in linea:
-                # Guardar el bloque anterior antes de pasar al siguiente
-                if rol_actual and contenido_actual:
-                    historial.append({
-                        "timestamp": timestamp_actual,
-                        "role": rol_actual,
-                        "content": "\n".join(contenido_actual).strip()
-                    })
-                    contenido_actual = []
-
-                timestamp_actual = linea[:19]
-
-                if " - De " in linea:
-                    rol_actual = "user"
-                    contenido_actual.append(linea.split(" - De ", 1)[1].split(": ", 1)[1])
-                else:
-                    rol_actual = "bot"
-                    contenido_actual.append(linea.split(" - Bot: ", 1)[1])
-            else:
-                # Línea que continúa el mensaje anterior
-                contenido_actual.append(linea)
-
-        # Guardar el último bloque
-        if rol_actual and contenido_actual:
-            historial.append({
-                "timestamp": timestamp_actual,
-                "role": rol_actual,
-                "content": "\n".join(contenido_actual).strip()
-            })
-
-    return historial
+    return historial.obtener_conversacion(session_id).todos()
 
 
 
@@ -142,85 +135,46 @@ def log_historial_archivo(session_id: str) -> list:
 # DATOS TRAÍDOS DESDE BD (guarda los productos ya consultados y mostrados al cliente)
 # ==================================================================================
 
-datos_traidos_desde_bd = {}
+datos_traidos_desde_bd = sesiones.espacio("datos_traidos_desde_bd")
 
 def get_datos_traidos_desde_bd(session_id: str):
     if session_id not in datos_traidos_desde_bd:
         datos_traidos_desde_bd[session_id] = {
-            "productos_mostrados": {},               # los productos que ya se consultaron
+            "productos_mostrados": ProductosMostrados(),   # los productos que ya se consultaron
             #"ultimo_producto_agregado": None,        # el último producto confirmado
             #"producto_pendiente_confirmacion": None  # si está esperando confirmación
         }
     return datos_traidos_desde_bd[session_id]
 
 
-# =============================================================================
-# FUNCIÓN AUXILIAR PARA REGENERAR LA LISTA TEXTUAL DE PRODUCTOS MOSTRADOS
-# (para que la IA pueda comparar el producto detectado con los productos ya mostrados)
-# =============================================================================
-
-def regenerar_productos_textuales(session_id: str):
-    session_data = get_datos_traidos_desde_bd(session_id)
-    productos_textuales = "Estos son los productos que se le mostraron hasta ahora al cliente:\n"
-    for lista in session_data["productos_mostrados"].values():
-        for p in lista:
-            productos_textuales += f"- {p['producto']}\n"
-    session_data["productos_textuales"] = productos_textuales
-
-    print("\n📦 Productos textuales actualizados:")
-    print(productos_textuales)
-
 # =============================================================================
 # FUNCION AUXILIAR PARA RECONOCER LAS CANTIDADES INGRESADAS POR EL USUARIO
 # =============================================================================
 
 def convertir_a_numero_es(user_input: str) -> int:
-    texto = user_input.lower().strip()
-
-    mapa_numeros = {
-        "uno": 1, "una": 1, "un": 1,
-        "dos": 2, "par": 2, "un par": 2,
-        "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6,
-        "siete": 7, "ocho": 8, "nueve": 9, "diez": 10,
-        "media docena": 6, "una docena": 12, "docena": 12
-    }
-
-    # Buscar expresiones comunes
-    for palabra, numero in mapa_numeros.items():
-        if palabra in texto:
-            return numero
-
-    # Buscar número en cifras
-    match = re.search(r"\b\d+\b", texto)
-    if match:
-        return int(match.group())
-
-    # Intentar convertir usando text2num (modo español)
-    try:
-        return text2num(texto, "es")
-    except Exception:
-        pass
-
-    # 4️⃣ Fallback: intentar word2number (inglés)
-    try:
-        return w2n.word_to_num(texto)
-    except Exception:
-        return 1
+    # Si el cliente no dijo cuántos, se agrega una unidad
+    return extraer_cantidad(user_input) or 1
 
 
 # =============================================================================
-# BÚSQUEDA DE PRODUCTOS EN LA BASE DE DATOS
+# BÚSQUEDA DE PRODUCTOS (índice en memoria, con la BD como respaldo)
 # =============================================================================
 
 def get_product_info(product_name: str):
-    connection = connect_to_db()
-    if not connection:
-        return print("no se conecto a la bd")
-    else:
-        print("🗃️  se conecto a la bd")
+    with etapa("catalogo"):
+        indice = catalogo.obtener_indice()
+        if indice is None:
+            # Si el catálogo no se pudo cargar, se consulta la base como antes
+            return get_product_info_bd(product_name)
 
-    cursor = connection.cursor(dictionary=True)
+        resultados = indice.buscar(product_name)
+        if resultados is not None:
+            return resultados
+
+    return f"No se encontró ningún producto relacionado con '{product_name}'."
 
+
+def get_product_info_bd(product_name: str):
     QUERY_START = """SELECT 
     p.id, 
     p.nombre AS producto, 
@@ -233,7 +187,7 @@ def get_product_info(product_name: str):
     FROM productos p 
     INNER JOIN marcas m ON p.marca_id = m.id 
     INNER JOIN categorias c ON p.categoria_id = c.id
-    WHERE LOWER(p.nombre) LIKE %s or LOWER(m.nombre) LIKE %s or LOWER(c.nombre) LIKE %s
+    WHERE LOWER(p.nombre) LIKE :prefijo or LOWER(m.nombre) LIKE :prefijo or LOWER(c.nombre) LIKE :prefijo
     ORDER BY p.nombre ASC; """
 
     QUERY_CONTAINS = """SELECT 
@@ -248,8 +202,8 @@ def get_product_info(product_name: str):
     FROM productos p 
     INNER JOIN marcas m ON p.marca_id = m.id 
     INNER JOIN categorias c ON p.categoria_id = c.id
-    WHERE LOWER(p.nombre) LIKE %s
-    AND NOT LOWER(p.nombre) LIKE %s
+    WHERE LOWER(p.nombre) LIKE :contiene
+    AND NOT LOWER(p.nombre) LIKE :empieza
     ORDER BY p.nombre ASC;"""
 
 
@@ -258,53 +212,53 @@ def get_product_info(product_name: str):
     words = product_name_lower.split()
     first_word = words[0] if words else product_name_lower
 
-
-    # =====================================================
-    # Verificar si el texto coincide con una categoría
-    # =====================================================
-    cursor.execute("SELECT id, nombre FROM categorias WHERE LOWER(nombre) = %s;", (product_name_lower,))
-    categoria_row = cursor.fetchone()
-
-    if categoria_row:
-        print(f"📂 Coincidencia con categoría detectada: {categoria_row['nombre']}")
-        categoria_id = categoria_row["id"]
-
-        cursor.execute("""
-            SELECT 
-                p.id,
-                p.nombre AS producto,
-                p.descripcion,
-                p.precio_venta,
-                m.nombre AS marca,
-                c.nombre AS categoria
-            FROM productos p
-            INNER JOIN marcas m ON p.marca_id = m.id
-            INNER JOIN categorias c ON p.categoria_id = c.id
-            WHERE p.categoria_id = %s
-            ORDER BY p.nombre ASC;
-        """, (categoria_id,))
-
-        productos_categoria = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        return productos_categoria
-
-
-
-    cursor.execute(QUERY_START, (f"{first_word}%", f"{first_word}%", f"{first_word}%"))
-    start_results = cursor.fetchall()
-    if start_results:
-        cursor.close()
-        connection.close()
-        return start_results
-
-    cursor.execute(QUERY_CONTAINS, (f"%{product_name_lower}%", f"{product_name_lower}%"))
-    contain_results = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    try:
+        with obtener_conexion() as connection:
+            debug("🗃️  se conecto a la bd")
+
+            # =====================================================
+            # Verificar si el texto coincide con una categoría
+            # =====================================================
+            categoria_row = connection.execute(
+                text("SELECT id, nombre FROM categorias WHERE LOWER(nombre) = :nombre;"),
+                {"nombre": product_name_lower}
+            ).mappings().first()
+
+            if categoria_row:
+                debug(f"📂 Coincidencia con categoría detectada: {categoria_row['nombre']}")
+                categoria_id = categoria_row["id"]
+
+                productos_categoria = connection.execute(text("""
+                    SELECT 
+                        p.id,
+                        p.nombre AS producto,
+                        p.descripcion,
+                        p.precio_venta,
+                        m.nombre AS marca,
+                        c.nombre AS categoria
+                    FROM productos p
+                    INNER JOIN marcas m ON p.marca_id = m.id
+                    INNER JOIN categorias c ON p.categoria_id = c.id
+                    WHERE p.categoria_id = :categoria_id
+                    ORDER BY p.nombre ASC;
+                """), {"categoria_id": categoria_id}).mappings().all()
+                return [dict(p) for p in productos_categoria]
+
+
+
+            start_results = connection.execute(text(QUERY_START), {"prefijo": f"{first_word}%"}).mappings().all()
+            if start_results:
+                return [dict(p) for p in start_results]
+
+            contain_results = connection.execute(
+                text(QUERY_CONTAINS),
+                {"contiene": f"%{product_name_lower}%", "empieza": f"{product_name_lower}%"}
+            ).mappings().all()
+    except Exception as e:
+        return print(f"no se conecto a la bd: {e}")
 
     if contain_results:
-        return contain_results
+        return [dict(p) for p in contain_results]
 
     return f"No se encontró ningún producto relacionado con '{product_name}'."
 
@@ -314,6 +268,52 @@ def get_product_info(product_name: str):
 # DETECCIÓN DE COMIDAS COMPUESTAS Y BÚSQUEDA DE SUS INGREDIENTES
 # =============================================================================
 
+# Plato -> productos del catálogo (ya resueltos los ingredientes). Cada entrada
+# recuerda con qué índice se armó: si el catálogo se recarga, se vuelve a calcular.
+EXPANSIONES_MAX = 500
+expansiones_platos = OrderedDict()
+lock_expansiones = threading.Lock()
+
+
+def buscar_varios_productos(nombres: list) -> list:
+    """Productos de varios nombres, sin repetir (por id), en una sola pasada por el índice."""
+    indice = catalogo.obtener_indice()
+    if indice is not None:
+        return indice.buscar_varios(nombres)
+
+    # Sin índice en memoria: una consulta por nombre, como antes
+    vistos = set()
+    encontrados = []
+    for nombre in dict.fromkeys(nombres):
+        resultados = get_product_info_bd(nombre)
+        for p in resultados if isinstance(resultados, list) else []:
+            if p["id"] not in vistos:
+                vistos.add(p["id"])
+                encontrados.append(p)
+    return encontrados
+
+
+def expansion_plato_guardada(nombre_plato: str):
+    indice = catalogo.obtener_indice()
+    with lock_expansiones:
+        guardada = expansiones_platos.get(nombre_plato)
+        if guardada is None or indice is None or guardada[0] is not indice:
+            return None
+        expansiones_platos.move_to_end(nombre_plato)
+        return list(guardada[1])
+
+
+def guardar_expansion_plato(nombre_plato: str, productos: list):
+    indice = catalogo.obtener_indice()
+    if indice is None:
+        return
+    with lock_expansiones:
+        expansiones_platos[nombre_plato] = (indice, list(productos))
+        expansiones_platos.move_to_end(nombre_plato)
+        while len(expansiones_platos) > EXPANSIONES_MAX:
+            expansiones_platos.popitem(last=False)
+
+
 def buscar_ingredientes_para_comida(nombre_plato: str):
     """
     Si un producto no se encuentra en la base, esta función intenta detectar
@@ -321,6 +321,15 @@ def buscar_ingredientes_para_comida(nombre_plato: str):
     y busca los ingredientes en la base de datos.
     """
 
+    # Misma comida, mismo prompt: así "Pizza" y "pizza " comparten la respuesta cacheada
+    nombre_plato = nombre_plato.strip().lower()
+
+    # Plato ya expandido con el catálogo vigente: ni IA ni búsquedas
+    encontrados = expansion_plato_guardada(nombre_plato)
+    if encontrados is not None:
+        debug(f"⚡ Ingredientes de '{nombre_plato}' desde la caché ({len(encontrados)} productos)")
+        return encontrados
+
     # 1️⃣ Pedimos a la IA que identifique los ingredientes
     prompt_ingredientes = f"""
     Tu tarea es detectar los ingredientes principales necesarios para preparar "{nombre_plato}".
@@ -347,26 +356,24 @@ def buscar_ingredientes_para_comida(nombre_plato: str):
 
 
     try:
-        respuesta_ia = modelo_input.invoke(prompt_ingredientes).strip()
+        with etapa("ingredientes_ia"):
+            respuesta_ia = invocar(modelo_input, prompt_ingredientes, sitio="ingredientes").strip()
         respuesta_ia = re.sub(r"<think>.*?</think>", "", respuesta_ia, flags=re.DOTALL).strip()
-        print(f"🤖 Ingredientes detectados por IA: {respuesta_ia}")
+        debug(f"🤖 Ingredientes detectados por IA: {respuesta_ia}")
 
         if respuesta_ia.upper() == "NINGUNO":
             return None
 
-        # Convertimos los ingredientes en lista
-        ingredientes = [i.strip().lower() for i in re.split(r",|\n|y", respuesta_ia) if i.strip()]
-        encontrados = []
-
-        # 2️⃣ Buscamos los ingredientes reales en la base
-        for ingrediente in ingredientes:
-            resultados = get_product_info(ingrediente)
-            if isinstance(resultados, list) and len(resultados) > 0:
-                encontrados.extend(resultados)
+        # Convertimos los ingredientes en lista ("y" solo como palabra: no partir "mayonesa")
+        ingredientes = [i.strip().lower() for i in re.split(r",|\n|\s+y\s+", respuesta_ia) if i.strip()]
 
+        # 2️⃣ Buscamos todos los ingredientes reales de una sola pasada
+        with etapa("catalogo"):
+            encontrados = buscar_varios_productos(ingredientes)
         if not encontrados:
             return None
 
+        guardar_expansion_plato(nombre_plato, encontrados)
         return encontrados
 
     except Exception as e:
@@ -379,22 +386,24 @@ def buscar_ingredientes_para_comida(nombre_plato: str):
 # DETECCIÓN DE INTENCIÓN Y PRODUCTOS CON IA
 # =============================================================================
 
-def detect_product_with_ai(user_input, session_id="main"):
-    try:
-        session_data = get_datos_traidos_desde_bd(session_id)
-        resumen_input = session_data.get("resumen_input", "").strip()
-        productos_mostrados = session_data.get("productos_mostrados", {})
-
-        # Construir lista textual con los productos ya mostrados
-        productos_previos_texto = ""
-        if productos_mostrados:
-            productos_previos_texto = "Estos son los productos que ya se le mostraron al cliente:\n"
-            for lista in productos_mostrados.values():
-                for p in lista:
-                    productos_previos_texto += f"- {p['producto']}\n"
-
-        # Prompt base
-        prompt = f"""
+def hay_contexto_deteccion(session_id: str) -> bool:
+    session_data = get_datos_traidos_desde_bd(session_id)
+    return bool(session_data.get("resumen_input", "").strip() or session_data.get("productos_mostrados"))
+
+
+def armar_prompt_deteccion(user_input: str, session_id: str) -> str:
+    # Si el resumen del turno anterior sigue generándose, se espera solo lo necesario
+    with etapa("espera_resumen"):
+        cola_resumenes.esperar(session_id)
+
+    session_data = get_datos_traidos_desde_bd(session_id)
+    resumen_input = session_data.get("resumen_input", "").strip()
+
+    # Lista textual con los productos ya mostrados (cacheada hasta que se muestre algo nuevo)
+    productos_previos_texto = session_data["productos_mostrados"].texto_prompt()
+
+    # Prompt base
+    prompt = f"""
 Analizá la siguiente frase del cliente y detectá:
 - Intención expresada
 - Nivel de confianza (0 a 100)
@@ -403,9 +412,9 @@ Analizá la siguiente frase del cliente y detectá:
 Frase del cliente: "{user_input}"
 """
 
-        # Si hay contexto o productos mostrados, incluirlos en el prompt
-        if resumen_input or productos_previos_texto:
-            prompt = f"""
+    # Si hay contexto o productos mostrados, incluirlos en el prompt
+    if resumen_input or productos_previos_texto:
+        prompt = f"""
 Considerá este contexto previo:
 {resumen_input}
 
@@ -423,9 +432,16 @@ Detectá:
 - Nivel de confianza (0 a 100)
 - Productos mencionados (si hay)
 """
+    return prompt
+
+
+def detect_product_with_ai(user_input, session_id="main"):
+    try:
+        prompt = armar_prompt_deteccion(user_input, session_id)
 
-        # Llamada a la IA input
-        raw_response = modelo_input.invoke(prompt).strip()
+        # Llamada a la IA input (sin contexto, la respuesta solo depende de la frase: se cachea)
+        sitio = None if hay_contexto_deteccion(session_id) else "deteccion"
+        raw_response = invocar(modelo_input, prompt, sitio=sitio).strip()
         cleaned = re.sub(r"<think>.*?</think>", "", raw_response, flags=re.DOTALL | re.IGNORECASE)
 
         # Extraer intención, confianza y productos
@@ -442,10 +458,10 @@ Detectá:
         else:
             products = [p.strip() for p in re.split(r",|\s+y\s+|\n", products_text) if p.strip()]
 
-        print("🧩 Resultado de la deteccion de input:")
-        print(f"  🔹 Intención: {intent or 'No detectada'}")
-        print(f"  🔹 Confianza: {confidence or 'No indicada'}")
-        print(f"  🔹 Productos: {products or 'Ninguno'}")
+        debug("🧩 Resultado de la deteccion de input:")
+        debug(f"  🔹 Intención: {intent or 'No detectada'}")
+        debug(f"  🔹 Confianza: {confidence or 'No indicada'}")
+        debug(f"  🔹 Productos: {products or 'Ninguno'}")
 
         return {
             "intencion": intent,
@@ -461,38 +477,128 @@ Detectá:
             "productos": []
         }
 
+# =============================================================================
+# MODO RÁPIDO: DETECCIÓN ESTRUCTURADA (JSON) Y RESPUESTAS POR PLANTILLA
+# =============================================================================
+
+INTENCIONES = {
+    "AGREGAR_PRODUCTO", "QUITAR_PRODUCTO", "MOSTRAR_PEDIDO", "VACIAR_PEDIDO",
+    "CONSULTAR_INFO", "FINALIZAR_PEDIDO", "CHARLAR",
+}
+
+FORMATO_JSON_DETECCION = """
+Respondé ÚNICAMENTE con un objeto JSON con esta forma exacta:
+{"intencion": "<una de: AGREGAR_PRODUCTO, QUITAR_PRODUCTO, MOSTRAR_PEDIDO, VACIAR_PEDIDO, CONSULTAR_INFO, FINALIZAR_PEDIDO, CHARLAR>",
+ "confianza": <entero 0 a 100>,
+ "productos": ["<producto en singular y minúsculas>", ...],
+ "cantidad": <entero o null si el cliente no indicó cantidad>}
+"""
+
+
+def es_json_valido(texto: str) -> bool:
+    try:
+        return isinstance(json.loads(texto), dict)
+    except ValueError:
+        return False
+
+
+def detectar_intencion_estructurada(user_input: str, session_id: str):
+    """
+    Una sola llamada al modelo input con salida JSON (intención, confianza, productos y cantidad).
+    Devuelve None si la respuesta no se pudo interpretar, para usar la detección clásica.
+    """
+    try:
+        prompt = armar_prompt_deteccion(user_input, session_id) + FORMATO_JSON_DETECCION
+        sitio = None if hay_contexto_deteccion(session_id) else "deteccion_json"
+        datos = json.loads(invocar(modelo_input_json, prompt, sitio=sitio, validar=es_json_valido))
+
+        intencion = str(datos.get("intencion") or "").strip().upper()
+        if intencion not in INTENCIONES:
+            return None
+
+        productos = datos.get("productos") or []
+        if isinstance(productos, str):
+            productos = [productos]
+        productos = [str(p).strip() for p in productos if str(p).strip() and str(p).strip().lower() != "ninguno"]
+
+        cantidad = datos.get("cantidad")
+        cantidad = int(cantidad) if isinstance(cantidad, (int, float)) and cantidad > 0 else None
+
+        detectado = {
+            "intencion": intencion,
+            "confianza": int(datos.get("confianza") or 0),
+            "productos": productos,
+            "cantidad": cantidad,
+        }
+        debug(f"🧩 Detección estructurada: {detectado}")
+        return detectado
+
+    except Exception as e:
+        print(f"⚠️ Detección estructurada inválida, se usa la clásica: {e}")
+        return None
+
+
+def buscar_en_productos_mostrados(session_id: str, nombre: str):
+    """Devuelve el primer producto ya mostrado al cliente cuyo nombre contiene 'nombre'."""
+    return get_datos_traidos_desde_bd(session_id)["productos_mostrados"].buscar(nombre)
+
+
+def responder_con_plantilla(detected: dict, user_input: str, session_id: str):
+    """
+    Arma la respuesta sin llamar a modelo_output para las intenciones deterministas.
+    Devuelve None si el turno necesita el camino completo con IA.
+    """
+    intencion = detected.get("intencion")
+    confianza = detected.get("confianza") or 0
+    productos = detected.get("productos") or []
+
+    if intencion == "MOSTRAR_PEDIDO":
+        return mostrar_pedido(session_id)
+
+    if intencion == "VACIAR_PEDIDO":
+        return vaciar_pedido(session_id)
+
+    if intencion == "AGREGAR_PRODUCTO" and confianza >= 90 and productos:
+        producto = buscar_en_productos_mostrados(session_id, productos[0])
+        if producto:
+            cantidad = detected.get("cantidad") or convertir_a_numero_es(user_input.lower())
+            return agregar_a_pedido(session_id, producto["producto"], cantidad, producto["precio_venta"], producto.get("id"))
+
+    return None
+
+
 # ==============================================================================
 # CIERRE COMÚN A TODOS LOS CAMINOS DEL GET_RESPONSE
 # ==============================================================================
 def finalizar_respuesta(session_id: str, respuesta: str) -> str:
-    try:
-        session_data = get_datos_traidos_desde_bd(session_id)
-        if session_data.get("finalizando", False):
-            print("⚠️ finalizar_respuesta() omitido: se detectó doble ejecución.")
-            return respuesta.strip()
-        session_data["finalizando"] = True
+    get_session_history(session_id).add_ai_message(respuesta)
 
-        if session_id not in store:
-            store[session_id] = InMemoryChatMessageHistory()
+    # Los resúmenes los necesita recién el próximo turno: se generan en segundo plano
+    cola_resumenes.programar(session_id, respuesta)
+    return respuesta.strip()
 
-        store[session_id].add_ai_message(respuesta)
 
+# ==============================================================================
+# RESÚMENES AUTOMÁTICOS (se ejecutan en segundo plano, fuera del turno)
+# ==============================================================================
+def generar_resumenes(session_id: str, ultima_respuesta: str = None):
+    # Las líneas del log se escriben en segundo plano: primero se bajan a disco
+    escritor.vaciar()
 
+    # Solo se leen los bytes nuevos del log (no se reparsea la conversación completa)
+    ultimos_mensajes = historial.ultimos_mensajes(session_id, 12)
 
-        historial = log_historial_archivo(session_id)
-        ultimos_mensajes = historial[-12:] if len(historial) > 12 else historial
+    # El log del bot se escribe después de responder: si todavía no está, se agrega
+    if ultima_respuesta and not (ultimos_mensajes and ultimos_mensajes[-1]["role"] == "bot"
+                                 and ultimos_mensajes[-1]["content"] == ultima_respuesta.strip()):
+        ultimos_mensajes = (ultimos_mensajes + [{"role": "bot", "content": ultima_respuesta.strip()}])[-12:]
 
-        if not ultimos_mensajes:
-            session_data["finalizando"] = False
-            return respuesta.strip()
+    if not ultimos_mensajes:
+        return
 
-        #print("\n====================== 📜 CONTEXTO ACTUAL IA ======================")
-        #for msg in ultimos_mensajes:
-        #    print(f"[{msg['role'].upper()}] {msg['content']}")
-        #print("=================================================================\n")
+    mensajes_texto = "".join(f"{m['role']}: {m['content']}\n" for m in ultimos_mensajes)
 
-        # ⚠️ Recordatorio para evitar falsas asunciones de carrito
-        recordatorio_contexto = """
+    recordatorio_contexto = """
 IMPORTANTE:
 El siguiente contexto se provee solo como referencia conversacional.
 NO representa el estado real del pedido ni las acciones realmente ejecutadas.
@@ -505,7 +611,7 @@ En esos casos, siempre debés usar las funciones del sistema para conocer o modi
 - vaciar_pedido()
 """
 
-        resumen_prompt = f"""
+    resumen_prompt = f"""
 Estos son los últimos mensajes entre el cliente y el bot.
 
 Generá un resumen claro y completo de lo ocurrido recientemente en la conversación.
@@ -521,19 +627,18 @@ Solo describí productos, acciones y contexto conversacional.
 Usá únicamente información textual real que aparezca en los mensajes, sin inventar nada nuevo.
 
 Mensajes:
-{''.join([f"{m['role']}: {m['content']}\n" for m in ultimos_mensajes])}
+{mensajes_texto}
 
 {recordatorio_contexto}
 """
 
+    with etapa("resumen_output"), admision.llamada_modelo():
         resumen_obj = modelo_output.invoke(resumen_prompt)
-        resumen = resumen_obj.content if hasattr(resumen_obj, "content") else str(resumen_obj)
-        resumen = resumen.strip()
-
-        session_data["ultimo_resumen"] = resumen
+    resumen = resumen_obj.content if hasattr(resumen_obj, "content") else str(resumen_obj)
+    resumen = resumen.strip()
 
-        # 🧠 Resumen corto para IA input
-        resumen_input_prompt = f"""
+    # 🧠 Resumen corto para IA input
+    resumen_input_prompt = f"""
 A partir de estos mensajes recientes, listá solo los nombres de los productos mencionados.
 No incluyas precios, acciones ni saludos.
 Si no se mencionaron productos, devolvé exactamente la palabra: NINGUNO.
@@ -544,30 +649,34 @@ NO asumas que el carrito realmente existe.
 El estado real se obtiene siempre llamando a las funciones del sistema.
 
 Mensajes:
-{''.join([f"{m['role']}: {m['content']}\n" for m in ultimos_mensajes])}
+{mensajes_texto}
 """
 
-        try:
+    resumen_input = None
+    try:
+        with etapa("resumen_input"), admision.llamada_modelo():
             resumen_input_obj = modelo_output.invoke(resumen_input_prompt)
-            resumen_input = resumen_input_obj.content if hasattr(resumen_input_obj, "content") else str(resumen_input_obj)
-            resumen_input = resumen_input.strip()
+        resumen_input = resumen_input_obj.content if hasattr(resumen_input_obj, "content") else str(resumen_input_obj)
+        resumen_input = resumen_input.strip()
 
-            session_data["resumen_input"] = resumen_input
+        debug("\n🧩 Resumen de productos detectados (para IA input):")
+        debug(resumen_input)
 
-            print("\n🧩 Resumen de productos detectados (para IA input):")
-            print(resumen_input)
+    except Exception as e:
+        print(f"⚠️ Error al generar resumen para IA input: {e}")
 
-        except Exception as e:
-            print(f"⚠️ Error al generar resumen para IA input: {e}")
+    # Se guardan al final, con la sesión bloqueada (puede haber varios workers)
+    with turno_sesion(session_id):
+        session_data = get_datos_traidos_desde_bd(session_id)
+        session_data["ultimo_resumen"] = resumen
+        if resumen_input is not None:
+            session_data["resumen_input"] = resumen_input
 
-        print("\n🧩 Resumen (para IA output):")
-        print(resumen[:250], "\n")
+    debug("\n🧩 Resumen (para IA output):")
+    debug(resumen[:250], "\n")
 
-    except Exception as e:
-        print(f"⚠️ Error al generar o guardar resumen automático: {e}")
 
-    session_data["finalizando"] = False
-    return respuesta.strip()
+cola_resumenes = ColaResumenes(generar_resumenes)
 
 
 
@@ -586,15 +695,21 @@ def get_response(user_input: str, session_id: str) -> str:
     # ==========================
     # DETECCIÓN DE INTENCIÓN Y PRODUCTOS (solo mensaje actual)
     # ==========================
-    print("===================================================================================================")
-    print(f"\n🧑 Mensaje real del usuario: {user_input}")
-
-    detected = detect_product_with_ai(user_input)
+    debug("===================================================================================================")
+    debug(f"\n🧑 Mensaje real del usuario: {user_input}")
+
+    # Primero las reglas locales; la IA input solo si el mensaje no es obvio
+    with etapa("deteccion"):
+        detected = clasificador.clasificar(user_input) if CLASIFICADOR_REGLAS else None
+        if detected is None and MODO_RAPIDO:
+            detected = detectar_intencion_estructurada(user_input, session_id)
+        if detected is None:
+            detected = detect_product_with_ai(user_input, session_id)
     intencion = detected.get("intencion")
     confianza = detected.get("confianza") or 0
     productos_detectados = detected.get("productos", [])
 
-    print(f"🧠 Intención detectada: {intencion} (confianza {confianza}%) — productos: {productos_detectados}") 
+    debug(f"🧠 Intención detectada: {intencion} (confianza {confianza}%) — productos: {productos_detectados}") 
 
 
     # ================================================================
@@ -647,10 +762,20 @@ def get_response(user_input: str, session_id: str) -> str:
     elif intencion in ["CHARLAR", "CONSULTAR_INFO"]:
         ultima_intencion = session_data.get("ultima_intencion_detectada")
         if ultima_intencion in intenciones_validas:
-            print(f"⚙️ Corrigiendo intención: {intencion} → {ultima_intencion}")
+            debug(f"⚙️ Corrigiendo intención: {intencion} → {ultima_intencion}")
             intencion = ultima_intencion
 
 
+    # ==========================
+    # MODO RÁPIDO: RESPUESTA POR PLANTILLA (sin modelo_output)
+    # ==========================
+    # Se usa la intención tal como la detectó el modelo, no la corregida por contexto
+    if MODO_RAPIDO:
+        respuesta_plantilla = responder_con_plantilla(detected, user_input, session_id)
+        if respuesta_plantilla is not None:
+            debug(f"⚡ Respuesta por plantilla ({detected.get('intencion')})")
+            return finalizar_respuesta(session_id, respuesta_plantilla)
+
     # ==========================
     # DECISIÓN SEGÚN INTENCIÓN
     # ==========================
@@ -664,8 +789,9 @@ def get_response(user_input: str, session_id: str) -> str:
 
     # Si la intención no es una acción directa ni una consulta o charla, usar la IA para responder
     if not requiere_accion_directa and intencion not in ["CONSULTAR_INFO", "CHARLAR"]:
-        print(f"🧠 Intención '{intencion}' no requiere acción directa. Usando solo contexto.")
-        result = with_message_history.invoke(
+        debug(f"🧠 Intención '{intencion}' no requiere acción directa. Usando solo contexto.")
+        result = invocar_con_streaming(
+            with_message_history,
             {"input": user_input},
             config={"configurable": {"session_id": session_id}}
         )
@@ -676,7 +802,7 @@ def get_response(user_input: str, session_id: str) -> str:
     # CONSULTAR_INFO — BÚSQUEDA DE PRODUCTOS O INGREDIENTES
     # ==========================
     if intencion == "CONSULTAR_INFO" and productos_detectados:
-        print("🔍 Intención de consulta detectada. Buscando productos o posibles ingredientes...")
+        debug("🔍 Intención de consulta detectada. Buscando productos o posibles ingredientes...")
 
         session_data = get_datos_traidos_desde_bd(session_id)
         all_products = []
@@ -686,16 +812,18 @@ def get_response(user_input: str, session_id: str) -> str:
 
             # Si se encontraron productos, los mostramos normalmente
             if isinstance(products, list) and len(products) > 0:
-                session_data["productos_mostrados"][product_name.lower()] = products
+                session_data["productos_mostrados"].mostrar(product_name, products)
                 all_products.extend(products)
 
             # 🧠 Si NO se encontró el producto, buscar posibles ingredientes
             elif isinstance(products, str) and "no se encontró" in products.lower():
-                print(f"No se encontró '{product_name}' en la base. Buscando ingredientes...")
+                debug(f"No se encontró '{product_name}' en la base. Buscando ingredientes...")
                 ingredientes = buscar_ingredientes_para_comida(product_name)
 
                 if ingredientes:
-                    print(f"✅ Ingredientes encontrados para {product_name}: {len(ingredientes)} productos")
+                    debug(f"✅ Ingredientes encontrados para {product_name}: {len(ingredientes)} productos")
+
+                    lista_ingredientes = lista_con_vinetas(ingredientes)
 
                     # Generar respuesta amable con IA
                     try:
@@ -707,16 +835,16 @@ def get_response(user_input: str, session_id: str) -> str:
                         Al final, preguntale de forma cordial si quiere consultar otro producto.
 
                         Ingredientes disponibles:
-                        {''.join([f"• {p['producto']} — ${p['precio_venta']}\n" for p in ingredientes])}
+                        {lista_ingredientes}
                         """
-                        result_ingredientes = modelo_output.invoke(prompt_ingredientes)
+                        result_ingredientes = invocar_con_streaming(modelo_output, prompt_ingredientes)
                         respuesta = result_ingredientes.content if hasattr(result_ingredientes, "content") else str(result_ingredientes)
                     except Exception as e:
                         print(f"⚠️ Error al generar lista de ingredientes con IA: {e}")
                         respuesta = (
                             f"Lamentablemente no tenemos {product_name} en este momento, "
                             "pero podés prepararla vos mismo con algunos de estos ingredientes:\n\n" +
-                            "\n".join([f"• {p['producto']} — ${p['precio_venta']}" for p in ingredientes]) +
+                            lista_ingredientes +
                             "\n\n¿Qué otro producto te gustaría consultar?"
                         )
 
@@ -733,21 +861,22 @@ def get_response(user_input: str, session_id: str) -> str:
 
         # Si sí había productos normales, mostramos la lista como siempre
         if all_products:
+            lista_productos = lista_con_vinetas(all_products)
             try:
                 prompt_lista = f"""
                 El cliente preguntó: "{user_input}"
                 Estos son los productos encontrados en la base:
-                {''.join([f"• {p['producto']} — ${p['precio_venta']}\n" for p in all_products])}
+                {lista_productos}
                 Mostrale la lista con tono amable y natural, usando viñetas (•),
                 y preguntale cuál de ellos quiere agregar a su pedido.
                 """
-                result_lista = modelo_output.invoke(prompt_lista)
+                result_lista = invocar_con_streaming(modelo_output, prompt_lista)
                 respuesta = result_lista.content if hasattr(result_lista, "content") else str(result_lista)
             except Exception as e:
                 print(f"⚠️ Error al generar lista con IA: {e}")
                 respuesta = (
                     "Tenemos estos productos disponibles:\n\n" +
-                    "\n".join([f"• {p['producto']} — ${p['precio_venta']}" for p in all_products]) +
+                    lista_productos +
                     "\n\n¿Querés agregar alguno a tu pedido? 😊"
                 )
 
@@ -757,7 +886,7 @@ def get_response(user_input: str, session_id: str) -> str:
 
     # SI SE DETECTA LA INTENCIÓN: AGREGAR_PRODUCTO
     if intencion == "AGREGAR_PRODUCTO" and productos_detectados:
-        print(f"🛒 Intención de agregar producto detectada: {productos_detectados}")
+        debug(f"🛒 Intención de agregar producto detectada: {productos_detectados}")
 
 
         # 🧠 Recuperar los productos ya mostrados en esta sesión
@@ -766,14 +895,13 @@ def get_response(user_input: str, session_id: str) -> str:
 
 
         # 🧾 Mostrar en consola los productos actualmente guardados en la sesión
-        print("\n📋 Productos actualmente mostrados al cliente:")
+        debug("\n📋 Productos actualmente mostrados al cliente:")
         if productos_previos:
-            for clave, lista in productos_previos.items():
-                print(f"  🔹 Producto '{clave}' → {len(lista)} producto(s):")
-                for p in lista:
-                    print(f"     • {p['producto']} — ${p['precio_venta']}")
+            for clave, lista in productos_previos.por_consulta().items():
+                debug(f"  🔹 Producto '{clave}' → {len(lista)} producto(s):")
+                debug(lista_con_vinetas(lista))
         else:
-            print("  (vacío)")
+            debug("  (vacío)")
 
 
 
@@ -785,7 +913,7 @@ def get_response(user_input: str, session_id: str) -> str:
 
         if confianza < 90:
             producto_pendiente = productos_detectados[0] if productos_detectados else None
-            print(f"🕐 Producto con baja confianza: {producto_pendiente}")
+            debug(f"🕐 Producto con baja confianza: {producto_pendiente}")
 
             mensaje_confirmacion = (
                 f"¿Querés que te agregue {producto_pendiente} al pedido?"
@@ -800,14 +928,13 @@ def get_response(user_input: str, session_id: str) -> str:
             producto = productos_detectados[0]
             cantidad = convertir_a_numero_es(user_input_lower)
 
-            for lista in session_data["productos_mostrados"].values():
-                for p in lista:
-                    if producto.lower() in p["producto"].lower():
-                        nombre = p["producto"]
-                        precio = p["precio_venta"]
-                        mensaje_confirmacion = agregar_a_pedido(session_id, nombre, cantidad, precio)
-                        print(f"✅ Producto agregado automáticamente: {nombre} x{cantidad}")
-                        return finalizar_respuesta(session_id, mensaje_confirmacion)
+            p = productos_previos.buscar(producto)
+            if p is not None:
+                nombre = p["producto"]
+                precio = p["precio_venta"]
+                mensaje_confirmacion = agregar_a_pedido(session_id, nombre, cantidad, precio, p.get("id"))
+                debug(f"✅ Producto agregado automáticamente: {nombre} x{cantidad}")
+                return finalizar_respuesta(session_id, mensaje_confirmacion)
 
 
 
@@ -816,16 +943,15 @@ def get_response(user_input: str, session_id: str) -> str:
         # 🧠 Verificar si alguno de los productos detectados ya fue mostrado
         encontrado_en_sesion = False
         for product_name in productos_detectados:
-            for lista in session_data["productos_mostrados"].values():
-                for p in lista:
-                    if product_name.lower() in p["producto"].lower():
-                        cantidad = convertir_a_numero_es(user_input_lower)
-                        nombre = p["producto"]
-                        precio = p["precio_venta"]
-                        print(f"✅ Producto encontrado en sesión: {nombre} — se agrega sin buscar en BD")
-                        mensaje_confirmacion = agregar_a_pedido(session_id, nombre, cantidad, precio)
-                        encontrado_en_sesion = True
-                        return finalizar_respuesta(session_id, mensaje_confirmacion)
+            p = productos_previos.buscar(product_name)
+            if p is not None:
+                cantidad = convertir_a_numero_es(user_input_lower)
+                nombre = p["producto"]
+                precio = p["precio_venta"]
+                debug(f"✅ Producto encontrado en sesión: {nombre} — se agrega sin buscar en BD")
+                mensaje_confirmacion = agregar_a_pedido(session_id, nombre, cantidad, precio, p.get("id"))
+                encontrado_en_sesion = True
+                return finalizar_respuesta(session_id, mensaje_confirmacion)
 
         # Solo si no se encontró en sesión, recién ahí buscar en la base
         if not encontrado_en_sesion:
@@ -836,7 +962,8 @@ def get_response(user_input: str, session_id: str) -> str:
             if isinstance(products, list) and len(products) > 0:
                 # Guardar también en los productos mostrados de la sesión
                 session_data = get_datos_traidos_desde_bd(session_id)
-                session_data["productos_mostrados"][product_name.lower()] = products
+                session_data["productos_mostrados"].mostrar(product_name, products)
+                lista_productos = lista_con_vinetas(products)
 
 
                 # 🧠 Pedirle a la IA que genere la lista con formato de viñetas
@@ -847,10 +974,10 @@ def get_response(user_input: str, session_id: str) -> str:
                     Al final, preguntale cuál de esos productos desea agregar al pedido.
 
                     Productos disponibles:
-                    {''.join([f"{p['producto']} - ${p['precio_venta']}\n" for p in products])}
+                    {lista_productos}
                     """
 
-                    result_lista = modelo_output.invoke(prompt_lista)
+                    result_lista = invocar_con_streaming(modelo_output, prompt_lista)
                     
                     context = (
                         result_lista.content
@@ -864,7 +991,7 @@ def get_response(user_input: str, session_id: str) -> str:
                     print(f"⚠️ Error al generar lista con IA: {e}")
                     # fallback manual si la IA falla
                     context = "Tenemos estos productos disponibles:\n\n" + \
-                            "\n".join([f"• {p['producto']} — ${p['precio_venta']}" for p in products]) + \
+                            lista_productos + \
                             "\n\n¿Querés agregar alguno a tu pedido? 😊"
 
                 return finalizar_respuesta(session_id, context)
@@ -877,7 +1004,8 @@ def get_response(user_input: str, session_id: str) -> str:
             f"alguno de los productos mostrados anteriormente. "
             f"Formulá una pregunta natural y breve para confirmar si desea agregarlo al pedido."
         )
-        result = with_message_history.invoke(
+        result = invocar_con_streaming(
+            with_message_history,
             {"input": mensaje_ia},
             config={"configurable": {"session_id": session_id}}
         )
@@ -930,7 +1058,7 @@ def get_response(user_input: str, session_id: str) -> str:
 
     # SI SE DETECTAN PRODUCTOS EN EL INPUT DEL CLIENTE
     if productos_detectados:
-        print(f"🛍️ Producto o categoria detectado: {productos_detectados}")
+        debug(f"🛍️ Producto o categoria detectado: {productos_detectados}")
         all_products = []
 
         # Recuperar los datos de sesión (productos ya consultados)
@@ -942,7 +1070,7 @@ def get_response(user_input: str, session_id: str) -> str:
 
             # Guardar los productos traídos en memoria
             if isinstance(products, list):
-                session_data["productos_mostrados"][product_name.lower()] = products
+                session_data["productos_mostrados"].mostrar(product_name, products)
                 all_products.extend(products)
 
 
@@ -956,20 +1084,21 @@ def get_response(user_input: str, session_id: str) -> str:
 
     # SI ENCUENTRA PRODUCTOS EN LA BASE
     if products and isinstance(products, list):
+        lista_productos = lista_con_vinetas(products)
         try:
             # Preparamos un prompt para que la IA genere la respuesta natural con los productos encontrados
             prompt_lista = f"""
             El cliente preguntó: "{user_input}"
 
             Estos son los productos encontrados en la base de datos relacionados con su consulta:
-            {''.join([f"• {p['producto']} — ${p['precio_venta']}\n" for p in products])}
+            {lista_productos}
 
             Mostrale la lista al cliente de manera clara, breve y ordenada.
             Mantené el formato de viñetas (•) y un tono amable y natural.
             Al final, preguntale cuál de esos productos desea agregar a su pedido.
             """
 
-            result_lista = modelo_output.invoke(prompt_lista)
+            result_lista = invocar_con_streaming(modelo_output, prompt_lista)
             respuesta = result_lista.content if hasattr(result_lista, "content") else str(result_lista)
 
         except Exception as e:
@@ -977,7 +1106,7 @@ def get_response(user_input: str, session_id: str) -> str:
             # fallback manual (solo si la IA falla)
             respuesta = (
                 "Tenemos estos productos disponibles:\n\n"
-                + "\n".join([f"• {p['producto']} — ${p['precio_venta']}" for p in products])
+                + lista_productos
                 + "\n\n¿Querés agregar alguno de esos productos a tu pedido? 😊"
             )
 
@@ -986,7 +1115,8 @@ def get_response(user_input: str, session_id: str) -> str:
     # SI EL CLIENTE NO NOMBRA PRODUCTOS NI DEMUESTRA NINGUNA INTENCION
 
     try:
-        result = with_message_history.invoke(
+        result = invocar_con_streaming(
+            with_message_history,
             {"input": user_input},
             config={"configurable": {"session_id": session_id}}
         )
@@ -1000,7 +1130,8 @@ def get_response(user_input: str, session_id: str) -> str:
             f"Respondé de manera amable y natural, pidiendo disculpas por el inconveniente "
             f"y ofreciendo continuar la conversación."
         )
-        result = with_message_history.invoke(
+        result = invocar_con_streaming(
+            with_message_history,
             {"input": mensaje_ia_error},
             config={"configurable": {"session_id": session_id}}
         )
@@ -1,9 +1,14 @@
-import mysql.connector
-from sqlalchemy import create_engine
+import re
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
+from app import metricas
+
 load_dotenv()
 
 # Credenciales en .env
@@ -13,33 +18,159 @@ MYSQL_HOST = os.getenv("MYSQL_HOST")
 MYSQL_PORT = os.getenv("MYSQL_PORT")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
 
-SQLALCHEMY_DATABASE_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+# URL alternativa (por ejemplo sqlite:///catalogo.db para probar sin servidor MySQL)
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "si", "yes")
+
+if DATABASE_URL:
+    SQLALCHEMY_DATABASE_URL = DATABASE_URL
+else:
+    # Validación individual de variables de entorno
+    if not all([MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE]):
+        raise ValueError("Faltan credenciales en el archivo .env Asegúrate de definir: MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE")
+
+    SQLALCHEMY_DATABASE_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+
 
-# Validación individual de variables de entorno
-if not all([MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE]):
-    raise ValueError("Faltan credenciales en el archivo .env Asegúrate de definir: MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE")
+def _opciones_pool(url: str) -> dict:
+    # SQLite en memoria usa un pool de una sola conexión y no acepta tamaño/overflow
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
-# Crear una instancia de motor para la base de datos
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+# Crear una instancia de motor para la base de datos (con pool de conexiones)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_opciones_pool(SQLALCHEMY_DATABASE_URL))
 
 # Crear una clase de sesión para interactuar con la base de datos
 SessionLocal = sessionmaker(autocommit=False,autoflush=False,bind=engine)
 
+
+# =============================================================================
+# MÉTRICAS DEL POOL
+# =============================================================================
+
+espera_checkout = metricas.histograma(
+    "db_pool_checkout_segundos", "Tiempo para obtener una conexión del pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+pool_agotado = metricas.contador("db_pool_agotado", "Checkouts que encontraron el pool sin conexiones libres")
+pool_timeouts = metricas.contador("db_pool_timeouts", "Checkouts que vencieron esperando una conexión")
+conexiones_en_uso = metricas.medidor("db_pool_conexiones_en_uso", "Conexiones prestadas por el pool")
+
+
+def _pool_sin_libres() -> bool:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    if checkedout is None or not _opciones_pool(SQLALCHEMY_DATABASE_URL):
+        return False
+    return checkedout() >= DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+
+def _registrar_checkout(checkout):
+    inicio = time.perf_counter()
+    if _pool_sin_libres():
+        pool_agotado.inc()
+    try:
+        conexion = checkout()
+    except PoolTimeoutError:
+        pool_timeouts.inc()
+        raise
+    finally:
+        espera_checkout.observar(time.perf_counter() - inicio)
+    conexiones_en_uso.inc()
+    return conexion
+
+
+@contextmanager
+def obtener_conexion():
+    """Presta una conexión SQLAlchemy del pool y la devuelve al salir."""
+    conexion = _registrar_checkout(engine.connect)
+    try:
+        yield conexion
+    finally:
+        conexion.close()
+        conexiones_en_uso.dec()
+
+
+def consultar(sql: str, params: dict = None) -> list:
+    """Ejecuta un SELECT y devuelve las filas como diccionarios."""
+    with obtener_conexion() as conexion:
+        return [dict(fila) for fila in conexion.execute(text(sql), params or {}).mappings()]
+
+
+class _ConexionPrestada:
+    """Envuelve una conexión DBAPI del pool: close() la devuelve en vez de cerrarla."""
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def close(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+            conexiones_en_uso.dec()
+
+
 def connect_to_db():
     try:
-        connection = mysql.connector.connect(
-            user=os.getenv("MYSQL_USER"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            host=os.getenv("MYSQL_HOST"),
-            port=os.getenv("MYSQL_PORT"),
-            database=os.getenv("MYSQL_DATABASE")
-        )
-        return connection
+        return _ConexionPrestada(_registrar_checkout(engine.raw_connection))
     except Exception as e:
         print(f"Error en la conexión a la base de datos: {e}")
         return None
 
 
+# =============================================================================
+# BASE SQLITE LOCAL (catálogo de script/bd.sql, para pruebas y benchmarks)
+# =============================================================================
+
+DDL_SQLITE = (
+    "CREATE TABLE IF NOT EXISTS categorias (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE, descripcion TEXT)",
+    "CREATE TABLE IF NOT EXISTS marcas (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)",
+    """CREATE TABLE IF NOT EXISTS productos (
+        id INTEGER PRIMARY KEY, nombre TEXT NOT NULL, descripcion TEXT,
+        precio_costo NUMERIC NOT NULL, precio_venta NUMERIC NOT NULL, stock INTEGER NOT NULL DEFAULT 0,
+        marca_id INTEGER REFERENCES marcas(id), categoria_id INTEGER REFERENCES categorias(id),
+        codigo_barras TEXT UNIQUE, fecha_alta TEXT DEFAULT CURRENT_TIMESTAMP)""",
+)
+
+RUTA_BD_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "script", "bd.sql")
+
+
+def crear_bd_sqlite(destino_engine, ruta_sql: str = RUTA_BD_SQL):
+    """
+    Crea categorías, marcas y productos en un engine SQLite con los datos del volcado MySQL.
+    Si la base ya tiene los datos no duplica nada.
+    """
+    with open(ruta_sql, "r", encoding="utf-8") as f:
+        volcado = f.read()
+
+    bloques = re.findall(r"^INSERT INTO `(?:categorias|marcas|productos)` .*?\);$", volcado, flags=re.MULTILINE | re.DOTALL)
+
+    with destino_engine.begin() as conexion:
+        for ddl in DDL_SQLITE:
+            conexion.exec_driver_sql(ddl)
+        for bloque in bloques:
+            # MySQL escapa comillas con \' y SQLite con ''; OR IGNORE permite volver a correrlo
+            bloque = bloque.replace("\\'", "''").replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+            conexion.exec_driver_sql(bloque)
+    return len(bloques)
+
+
 # Test de conexión
 if __name__ == "__main__":
     try:
@@ -48,4 +179,4 @@ if __name__ == "__main__":
         db.close()
     except Exception as e:
         print(f"Error al conectar a la base de datos: {e}")
-        
+
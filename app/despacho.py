@@ -0,0 +1,133 @@
+# =============================================================================
+# Despacho de turnos fuera del event loop
+# get_response es totalmente síncrono (Ollama + MySQL), así que cada turno se
+# ejecuta en un pool de hilos acotado. Los mensajes de una misma sesión se
+# procesan estrictamente en orden de llegada; sesiones distintas van en paralelo.
+# Para no acumular turnos que nadie va a esperar, una sesión no puede tener más
+# de DESPACHO_MAX_POR_SESION turnos pendientes ni el proceso más de
+# DESPACHO_MAX_PENDIENTES: los que sobran se rechazan con TurnoRechazado en el
+# momento. El plazo del turno (app/admision.py) viaja con el contexto hasta el
+# worker; si vence mientras espera en la cola, el turno no se ejecuta.
+# =============================================================================
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from app import metricas
+from app.admision import (
+    PlazoVencido, TurnoRechazado, verificar_plazo,
+    turnos_atendidos, turnos_rechazados_cola_global, turnos_rechazados_cola_sesion, turnos_rechazados_plazo,
+)
+
+load_dotenv()
+
+DESPACHO_MAX_WORKERS = int(os.getenv("DESPACHO_MAX_WORKERS", "4"))
+DESPACHO_MAX_POR_SESION = int(os.getenv("DESPACHO_MAX_POR_SESION", "5"))
+DESPACHO_MAX_PENDIENTES = int(os.getenv("DESPACHO_MAX_PENDIENTES", "32"))
+
+
+turnos_en_cola = metricas.medidor("despacho_turnos_en_cola", "Turnos esperando un worker libre")
+turnos_en_ejecucion = metricas.medidor("despacho_turnos_en_ejecucion", "Turnos ejecutándose en el pool")
+sesiones_activas = metricas.medidor("despacho_sesiones_activas", "Sesiones con turnos pendientes o en curso")
+espera_turno = metricas.histograma("despacho_espera_segundos", "Tiempo desde que llega el mensaje hasta que arranca el turno")
+duracion_turno = metricas.histograma("despacho_turno_segundos", "Duración de get_response dentro del worker")
+turnos_con_error = metricas.contador("despacho_turnos_con_error", "Turnos que terminaron con excepción")
+
+
+class _ColaSesion:
+    __slots__ = ("lock", "pendientes")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()   # asyncio.Lock despierta a los que esperan en orden FIFO
+        self.pendientes = 0
+
+
+class Despachador:
+    def __init__(self, max_workers: int = DESPACHO_MAX_WORKERS, max_por_sesion: int = DESPACHO_MAX_POR_SESION,
+                 max_pendientes: int = DESPACHO_MAX_PENDIENTES):
+        self.max_workers = max_workers
+        self.max_por_sesion = max_por_sesion
+        self.max_pendientes = max_pendientes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turno")
+        self._sesiones = {}
+        self._pendientes = 0        # turnos en cola o en ejecución, de todas las sesiones
+
+    async def ejecutar(self, session_id: str, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(*args, **kwargs) en el pool respetando el orden por sesión.
+        Si el request se cancela (por ejemplo, el cliente corta), el turno igual
+        termina antes de liberar la sesión para no romper el orden.
+        Lanza TurnoRechazado si la sesión o el proceso ya tienen demasiados turnos pendientes.
+        """
+        cola = self._sesiones.get(session_id)
+        if cola is not None and cola.pendientes >= self.max_por_sesion:
+            turnos_rechazados_cola_sesion.inc()
+            raise TurnoRechazado("cola_sesion")
+        if self._pendientes >= self.max_pendientes:
+            turnos_rechazados_cola_global.inc()
+            raise TurnoRechazado("cola_global")
+        if cola is None:
+            cola = self._sesiones[session_id] = _ColaSesion()
+            sesiones_activas.inc()
+        cola.pendientes += 1
+        self._pendientes += 1
+        turnos_en_cola.inc()
+
+        tarea = asyncio.ensure_future(self._turno(session_id, cola, time.perf_counter(), funcion, args, kwargs))
+        return await asyncio.shield(tarea)
+
+    async def _turno(self, session_id, cola, encolado, funcion, args, kwargs):
+        iniciado = False
+
+        def _en_worker():
+            nonlocal iniciado
+            iniciado = True
+            turnos_en_cola.dec()
+            espera_turno.observar(time.perf_counter() - encolado)
+            turnos_en_ejecucion.inc()
+            inicio = time.perf_counter()
+            try:
+                # Si el plazo venció esperando en la cola, ni se empieza
+                verificar_plazo()
+                resultado = funcion(*args, **kwargs)
+                turnos_atendidos.inc()
+                return resultado
+            except PlazoVencido:
+                turnos_rechazados_plazo.inc()
+                raise
+            except Exception:
+                turnos_con_error.inc()
+                raise
+            finally:
+                duracion_turno.observar(time.perf_counter() - inicio)
+                turnos_en_ejecucion.dec()
+
+        try:
+            async with cola.lock:
+                loop = asyncio.get_running_loop()
+                # run_in_executor no pasa las ContextVar al hilo (el plazo del turno viaja ahí)
+                contexto = contextvars.copy_context()
+                return await loop.run_in_executor(self._executor, contexto.run, _en_worker)
+        finally:
+            if not iniciado:
+                turnos_en_cola.dec()
+            cola.pendientes -= 1
+            self._pendientes -= 1
+            if cola.pendientes == 0 and self._sesiones.get(session_id) is cola:
+                del self._sesiones[session_id]
+                sesiones_activas.dec()
+
+    def profundidad_sesion(self, session_id: str) -> int:
+        cola = self._sesiones.get(session_id)
+        return cola.pendientes if cola else 0
+
+    def cerrar(self, esperar: bool = True):
+        self._executor.shutdown(wait=esperar)
+
+
+# Instancia compartida por los endpoints
+despachador = Despachador()
@@ -0,0 +1,264 @@
+# =============================================================================
+# Diario de carritos (write-ahead log)
+# Los carritos viven en memoria y se perdían en cada reinicio de uvicorn
+# (start.bat corre con --reload). Cada operación sobre un carrito agrega un
+# registro a CARRITOS_DIARIO_RUTA (una línea JSON); el archivo se baja al SO
+# en el momento y un hilo hace fsync en tandas cada CARRITOS_DIARIO_FSYNC_SEG,
+# así agregar un producto no espera al disco.
+# Cuando el diario pasa CARRITOS_DIARIO_COMPACTAR_BYTES se escribe una foto
+# de los carritos (<ruta>.snap) y el diario vuelve a empezar: al arrancar se
+# lee la foto y solo lo anotado después, no toda la historia.
+# Los registros guardan el estado final de la línea (no "sumar 1"), así
+# volver a aplicar un registro que ya estaba en la foto no cambia nada.
+#
+# Registros:
+#   ["a", session_id, producto_id, producto, cantidad, precio_centavos]
+#   ["v", session_id]    carrito vaciado
+#   ["f", session_id]    pedido finalizado (el carrito queda vacío)
+#   ["b", session_id]    sesión desalojada de memoria (TTL o SESIONES_MAX):
+#                        su carrito no vuelve al reiniciar
+#
+# Solo se usa con SESIONES_BACKEND=memoria: con sqlite o redis el carrito ya
+# se guarda con el resto de la sesión.
+# =============================================================================
+
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from app import metricas
+from app.carrito import Carrito
+from app.sesiones import sesiones
+from app.trazas import debug
+
+load_dotenv()
+
+CARRITOS_DIARIO_RUTA = os.getenv("CARRITOS_DIARIO_RUTA", "carritos.diario")
+CARRITOS_DIARIO_FSYNC_SEG = float(os.getenv("CARRITOS_DIARIO_FSYNC_SEG", "0.2"))
+CARRITOS_DIARIO_COMPACTAR_BYTES = int(os.getenv("CARRITOS_DIARIO_COMPACTAR_BYTES", str(256 * 1024)))
+
+ESPACIO_PEDIDOS = "pedidos_por_cliente"
+
+
+registros_por_fsync = metricas.histograma(
+    "carritos_diario_registros_por_fsync", "Registros del diario de carritos confirmados en cada fsync",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000),
+)
+compactaciones = metricas.contador("carritos_diario_compactaciones", "Fotos de carritos escritas (el diario vuelve a empezar)")
+registros_recuperados = metricas.contador("carritos_diario_registros_recuperados", "Registros del diario aplicados al arrancar")
+errores_diario = metricas.contador("carritos_diario_errores", "Fallas escribiendo el diario o la foto de carritos")
+
+
+def _fsync(archivo):
+    archivo.flush()
+    os.fsync(archivo.fileno())
+
+
+class DiarioCarritos:
+    def __init__(self, ruta: str = CARRITOS_DIARIO_RUTA, intervalo_fsync: float = CARRITOS_DIARIO_FSYNC_SEG,
+                 compactar_bytes: int = CARRITOS_DIARIO_COMPACTAR_BYTES, espacio: str = ESPACIO_PEDIDOS):
+        self.ruta = ruta
+        self.ruta_foto = ruta + ".snap"
+        self.intervalo_fsync = intervalo_fsync
+        self.compactar_bytes = compactar_bytes
+        self._carritos = sesiones.espacio(espacio)
+        self._carritos.al_olvidar = self._olvidado
+        self._archivo = None               # abierto solo entre abrir() y cerrar()
+        self._bytes = 0                    # tamaño del diario desde la última foto
+        self._sin_fsync = 0                # registros escritos todavía sin fsync
+        self._cerrado = False
+        self._cond = threading.Condition()
+        self._hilo = None
+
+    # =========================================================================
+    # OPERACIONES (las usa app/pedidos.py)
+    # Se aplican y se anotan bajo el mismo lock para que la foto nunca vea un
+    # carrito a medio modificar.
+    # =========================================================================
+
+    def agregar(self, session_id: str, carrito: Carrito, producto: str, cantidad: int, precio, producto_id=None):
+        with self._cond:
+            linea, nueva = carrito.agregar(producto, cantidad, precio, producto_id)
+            self._anotar(["a", session_id, linea.producto_id, linea.producto, linea.cantidad, linea.precio_centavos])
+        return linea, nueva
+
+    def vaciar(self, session_id: str, carrito: Carrito, finalizado: bool = False):
+        with self._cond:
+            carrito.vaciar()
+            self._anotar(["f" if finalizado else "v", session_id])
+
+    def _olvidado(self, session_id: str, carrito: Carrito):
+        # Lo llama el gestor de sesiones al desalojar (con su lock tomado)
+        if carrito:
+            with self._cond:
+                self._anotar(["b", session_id])
+
+    def _anotar(self, registro: list):
+        if self._archivo is None:
+            return
+        linea = (json.dumps(registro, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            self._archivo.write(linea)
+            # Al SO ya (sobrevive a que se caiga el proceso); el fsync va en tandas
+            self._archivo.flush()
+        except OSError as e:
+            errores_diario.inc()
+            print(f"⚠️ Error escribiendo el diario de carritos: {e}")
+            return
+        self._bytes += len(linea)
+        self._sin_fsync += 1
+        if self._bytes >= self.compactar_bytes:
+            self._cond.notify_all()
+
+    # =========================================================================
+    # ARRANQUE: foto + diario
+    # =========================================================================
+
+    def abrir(self) -> int:
+        """Recupera los carritos guardados y empieza a anotar. Devuelve cuántos carritos quedaron con productos."""
+        with self._cond:
+            if self._archivo is not None:
+                return 0
+            inicio = time.perf_counter()
+            carritos = self._leer_foto()
+            aplicados, valido = self._reproducir(carritos)
+        # Fuera del lock del diario: cargar un carrito puede desalojar otra sesión, y el
+        # desalojo (con el lock del gestor tomado) anota en el diario
+        for session_id, carrito in carritos.items():
+            if carrito:
+                self._carritos[session_id] = carrito
+        with self._cond:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._archivo = open(self.ruta, "ab")
+            if self._archivo.tell() != valido:
+                # Cola cortada por un apagado a mitad de escritura
+                self._archivo.truncate(valido)
+            self._bytes = valido
+            self._cerrado = False
+            registros_recuperados.inc(aplicados)
+            # Se arranca con una foto nueva: el próximo inicio no vuelve a leer estos registros
+            # (ni los carritos que se desalojaron al cargarlos)
+            if aplicados or carritos:
+                self._compactar()
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="diario-carritos", daemon=True)
+                self._hilo.start()
+            recuperados = sum(1 for c in carritos.values() if c)
+        if recuperados:
+            debug(f"🛒 {recuperados} carritos recuperados ({aplicados} registros en {(time.perf_counter() - inicio) * 1000:.1f}ms)")
+        return recuperados
+
+    def _leer_foto(self) -> dict:
+        try:
+            with open(self.ruta_foto, "r", encoding="utf-8") as f:
+                foto = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer la foto de carritos {self.ruta_foto}: {e}")
+            return {}
+        return {sid: Carrito.desde_compacto(lineas) for sid, lineas in foto.get("carritos", {}).items()}
+
+    def _reproducir(self, carritos: dict):
+        """Aplica el diario sobre 'carritos'. Devuelve (registros aplicados, bytes válidos del archivo)."""
+        aplicados = valido = 0
+        try:
+            f = open(self.ruta, "rb")
+        except FileNotFoundError:
+            return 0, 0
+        with f:
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                try:
+                    registro = json.loads(linea)
+                    op, session_id = registro[0], registro[1]
+                    if op == "a":
+                        _, _, producto_id, producto, cantidad, precio_centavos = registro
+                        carritos.setdefault(session_id, Carrito()).fijar(producto, cantidad, precio_centavos, producto_id)
+                    elif op in ("v", "f", "b"):
+                        carritos.pop(session_id, None)
+                    else:
+                        raise ValueError(f"operación desconocida {op!r}")
+                except (ValueError, TypeError, IndexError) as e:
+                    print(f"⚠️ Diario de carritos dañado en el byte {valido}: {e}. Se descarta desde ahí.")
+                    break
+                aplicados += 1
+                valido += len(linea)
+        return aplicados, valido
+
+    # =========================================================================
+    # FOTO (compactación)
+    # =========================================================================
+
+    def _compactar(self):
+        """Escribe la foto de los carritos actuales y vacía el diario. Se llama con el lock tomado."""
+        foto = {
+            "v": 1,
+            "carritos": {sid: c.a_compacto() for sid, c in list(self._carritos._datos.items()) if c},
+        }
+        temporal = self.ruta_foto + ".tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(foto, f, separators=(",", ":"), ensure_ascii=False)
+                _fsync(f)
+            os.replace(temporal, self.ruta_foto)
+            # Si se corta justo acá, al arrancar se reaplica el diario sobre la foto: da lo mismo
+            self._archivo.truncate(0)
+            self._archivo.seek(0)
+            _fsync(self._archivo)
+        except OSError as e:
+            errores_diario.inc()
+            print(f"⚠️ Error compactando el diario de carritos: {e}")
+            return
+        self._bytes = 0
+        self._sin_fsync = 0
+        compactaciones.inc()
+
+    # =========================================================================
+    # HILO DE FSYNC
+    # =========================================================================
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._cerrado or self._bytes >= self.compactar_bytes,
+                                    timeout=self.intervalo_fsync)
+                if self._cerrado or self._bytes >= self.compactar_bytes:
+                    if self._bytes:
+                        self._compactar()
+                    if self._cerrado:
+                        self._archivo.close()
+                        self._archivo = None
+                        self._hilo = None
+                        self._cond.notify_all()
+                        return
+                pendientes, self._sin_fsync = self._sin_fsync, 0
+                descriptor = self._archivo.fileno()
+            if not pendientes:
+                continue
+            # Fuera del lock: mientras tanto se pueden seguir anotando operaciones
+            try:
+                os.fsync(descriptor)
+            except OSError as e:
+                errores_diario.inc()
+                print(f"⚠️ Error sincronizando el diario de carritos: {e}")
+                continue
+            registros_por_fsync.observar(pendientes)
+
+    def cerrar(self, timeout: float = 10.0):
+        """Deja una foto al día, cierra el diario y detiene el hilo."""
+        with self._cond:
+            if self._archivo is None:
+                return
+            self._cerrado = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._archivo is None, timeout=timeout)
+
+
+# Instancia compartida por app/pedidos.py
+diario_carritos = DiarioCarritos()
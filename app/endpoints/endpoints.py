@@ -1,14 +1,48 @@
 from fastapi import APIRouter, Request
-from ..crud import get_response
+from fastapi.responses import StreamingResponse
+from ..crud import get_response, cola_resumenes
+from ..despacho import despachador
+from .. import backend_sesiones
+from ..backend_sesiones import turno_sesion
+from ..streaming import emitir_a, primer_trozo
+from ..trazas import debug, etapa, traza_turno
+from ..escritor_conversaciones import escritor
+from ..agrupador import agrupador
+from ..admision import con_plazo, PlazoVencido, TurnoRechazado, RESPUESTA_SATURADO
+import asyncio
+import json
 import os
+import time
 from datetime import datetime
 
 router = APIRouter()
 
+
+def responder_turno(body: str, session_id: str, emitir=None) -> str:
+    with traza_turno(session_id):
+        # Con un backend compartido el resumen pendiente guarda tomando la sesión: si el turno
+        # la tomara primero y lo esperara adentro (armar_prompt_deteccion), se bloquearían.
+        # En memoria no hay bloqueo y solo espera la detección que usa el resumen.
+        if backend_sesiones.backend.compartido:
+            with etapa("espera_resumen"):
+                cola_resumenes.esperar(session_id)
+        with turno_sesion(session_id), emitir_a(emitir):
+            return get_response(body, session_id)
+
+
 # Carpeta para guardar conversaciones
 CARPETA_CONVERSACIONES = "conversaciones"
 os.makedirs(CARPETA_CONVERSACIONES, exist_ok=True)
 
+
+def anotar_en_conversacion(ruta_conversacion: str, rol: str, texto: str):
+    # La fecha es la de llegada; el archivo lo escribe el hilo escritor en segundo plano
+    escritor.anotar(ruta_conversacion, {
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "role": rol,
+        "content": texto,
+    })
+
 @router.post("/process-message")
 async def process_message(request: Request):
     try:
@@ -21,24 +55,115 @@ async def process_message(request: Request):
 
         # Guardar conversación en archivo
         session_id = from_number.replace("+", "").replace(":", "_")
-        ruta_archivo = os.path.join(CARPETA_CONVERSACIONES, f"{session_id}.txt")
+        ruta_conversacion = os.path.join(CARPETA_CONVERSACIONES, session_id)
 
-        with open(ruta_archivo, "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - De {from_number}: {body}\n")
+        anotar_en_conversacion(ruta_conversacion, "user", body)
 
-        # Generar respuesta usando tu función de IA
+        # Si el cliente sigue escribiendo, responde el último mensaje de la ráfaga por todos
+        body = await agrupador.agrupar(session_id, body)
+        if body is None:
+            return {"status": "agrupado"}
+
+        # Generar respuesta usando tu función de IA (en el pool, sin bloquear el event loop)
         try:
-            bot_response = get_response(body, session_id)
+            with con_plazo():
+                bot_response = await despachador.ejecutar(session_id, responder_turno, body, session_id)
+        except (TurnoRechazado, PlazoVencido) as e:
+            # Ollama saturado: respuesta fija, sin modelo
+            debug(f"🚦 Turno sin modelo ({session_id}): {e}")
+            bot_response = RESPUESTA_SATURADO
         except Exception as e:
             print(f"❌ Error en IA: {e}")
             bot_response = "Estoy teniendo problemas para responder."
 
         # Guardar respuesta
-        with open(ruta_archivo, "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Bot: {bot_response}\n")
+        anotar_en_conversacion(ruta_conversacion, "bot", bot_response)
 
         return {"status": "ok", "response": bot_response}
 
     except Exception as e:
         print(f"❌ Error procesando mensaje: {e}")
         return {"status": "error", "message": str(e)}
+
+
+def evento_sse(evento: str, datos) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+@router.post("/process-message/stream")
+async def process_message_stream(request: Request):
+    """
+    Igual que /process-message, pero devuelve Server-Sent Events:
+    - "parcial": trozos de texto a medida que el modelo output los genera
+    - "reinicio": el modelo falló a mitad y el turno sigue con otro texto; lo recibido
+      hasta ahí no es parte de la respuesta (los "parcial" siguientes empiezan de cero)
+    - "fin": {"status": "ok", "response": <respuesta completa>}
+      o {"status": "agrupado"} si el mensaje se respondió junto con uno posterior
+    Las respuestas que no pasan por el modelo (plantillas, confirmaciones) llegan solo en "fin".
+    """
+    try:
+        data = await request.json()
+        from_number = data.get("from")
+        body = data.get("body")
+    except Exception as e:
+        print(f"❌ Error procesando mensaje: {e}")
+        return {"status": "error", "message": str(e)}
+
+    if not from_number or not body:
+        return {"status": "error", "message": "Datos incompletos"}
+
+    session_id = from_number.replace("+", "").replace(":", "_")
+    ruta_conversacion = os.path.join(CARPETA_CONVERSACIONES, session_id)
+
+    anotar_en_conversacion(ruta_conversacion, "user", body)
+
+    body = await agrupador.agrupar(session_id, body)
+    if body is None:
+        return StreamingResponse(iter([evento_sse("fin", {"status": "agrupado"})]), media_type="text/event-stream")
+
+    # Los trozos se generan en el hilo del turno y se pasan al event loop por una cola
+    loop = asyncio.get_running_loop()
+    trozos = asyncio.Queue()
+
+    def emitir(texto):
+        loop.call_soon_threadsafe(trozos.put_nowait, texto)
+
+    def evento_trozo(texto) -> str:
+        return evento_sse("reinicio", {}) if texto is None else evento_sse("parcial", {"texto": texto})
+
+    inicio = time.perf_counter()
+    # La tarea hereda el plazo del turno
+    with con_plazo():
+        turno = asyncio.ensure_future(despachador.ejecutar(session_id, responder_turno, body, session_id, emitir))
+
+    async def eventos():
+        primero = True
+        while True:
+            siguiente = asyncio.ensure_future(trozos.get())
+            await asyncio.wait({siguiente, turno}, return_when=asyncio.FIRST_COMPLETED)
+            if not siguiente.done():
+                siguiente.cancel()
+                break
+            if primero:
+                primer_trozo.observar(time.perf_counter() - inicio)
+                primero = False
+            yield evento_trozo(siguiente.result())
+
+        # Trozos que llegaron justo antes de terminar el turno
+        while not trozos.empty():
+            yield evento_trozo(trozos.get_nowait())
+
+        try:
+            bot_response = turno.result()
+        except (TurnoRechazado, PlazoVencido) as e:
+            debug(f"🚦 Turno sin modelo ({session_id}): {e}")
+            bot_response = RESPUESTA_SATURADO
+        except Exception as e:
+            print(f"❌ Error en IA: {e}")
+            bot_response = "Estoy teniendo problemas para responder."
+
+        anotar_en_conversacion(ruta_conversacion, "bot", bot_response)
+
+        yield evento_sse("fin", {"status": "ok", "response": bot_response})
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
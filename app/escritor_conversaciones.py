@@ -0,0 +1,147 @@
+# =============================================================================
+# Escritura de conversaciones en segundo plano
+# El endpoint ya no abre el archivo de la conversación dos veces por mensaje:
+# encola el mensaje y sigue. Un hilo escritor junta los mensajes por sesión y
+# los escribe en tandas (cada LOG_FLUSH_SEG, o antes si se acumulan
+# LOG_FLUSH_BYTES), con los archivos abiertos en un LRU acotado. Como hay un
+# solo escritor y cada sesión tiene su lista, el orden por sesión se respeta.
+# El formato de los archivos está en app/conversaciones.py.
+# =============================================================================
+
+import os
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from app import metricas
+from app.conversaciones import Anotador
+from app.trazas import etapa
+
+load_dotenv()
+
+LOG_FLUSH_SEG = float(os.getenv("LOG_FLUSH_SEG", "0.5"))
+LOG_FLUSH_BYTES = int(os.getenv("LOG_FLUSH_BYTES", str(64 * 1024)))
+LOG_ARCHIVOS_ABIERTOS = int(os.getenv("LOG_ARCHIVOS_ABIERTOS", "64"))
+
+
+lineas_pendientes = metricas.medidor("log_lineas_pendientes", "Mensajes de conversación esperando ser escritos")
+lineas_por_tanda = metricas.histograma(
+    "log_lineas_por_tanda", "Mensajes escritos en cada tanda",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000),
+)
+archivos_cerrados_lru = metricas.contador("log_archivos_cerrados_lru", "Archivos cerrados por superar LOG_ARCHIVOS_ABIERTOS")
+errores_escritura = metricas.contador("log_errores_escritura", "Tandas que no se pudieron escribir")
+
+
+class EscritorConversaciones:
+    def __init__(self, intervalo: float = LOG_FLUSH_SEG, max_bytes: int = LOG_FLUSH_BYTES,
+                 max_abiertos: int = LOG_ARCHIVOS_ABIERTOS):
+        self.intervalo = intervalo
+        self.max_bytes = max_bytes
+        self.max_abiertos = max_abiertos
+        self._pendientes = {}              # ruta -> [mensajes] en orden de llegada
+        self._bytes_pendientes = 0
+        self._encoladas = 0                # mensajes encolados desde el inicio
+        self._escritas = 0                 # mensajes ya escritos (o descartados por error)
+        self._vaciar_ya = False
+        self._cerrado = False
+        self._abiertos = OrderedDict()     # ruta -> Anotador abierto (solo lo usa el hilo escritor)
+        self._cond = threading.Condition()
+        self._hilo = None
+
+    def _iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="escritor-conversaciones", daemon=True)
+            self._hilo.start()
+
+    def anotar(self, ruta: str, mensaje: dict):
+        """Encola un mensaje {"timestamp", "role", "content"} para la conversación 'ruta' (sin extensión)."""
+        with self._cond:
+            if self._cerrado:
+                raise RuntimeError("El escritor de conversaciones está cerrado")
+            self._iniciar()
+            self._pendientes.setdefault(ruta, []).append(mensaje)
+            self._bytes_pendientes += len(mensaje["content"])
+            self._encoladas += 1
+            lineas_pendientes.inc()
+            if self._bytes_pendientes >= self.max_bytes:
+                self._cond.notify_all()
+
+    def vaciar(self, timeout: float = 5.0) -> bool:
+        """Espera a que todo lo encolado hasta ahora esté en disco (por ejemplo, antes de leer el historial)."""
+        with self._cond:
+            objetivo = self._encoladas
+            if self._escritas >= objetivo:
+                return True
+            self._vaciar_ya = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._escritas >= objetivo, timeout=timeout)
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._cerrado or self._vaciar_ya or self._bytes_pendientes >= self.max_bytes,
+                    timeout=self.intervalo,
+                )
+                tanda, self._pendientes = self._pendientes, {}
+                self._bytes_pendientes = 0
+                self._vaciar_ya = False
+                cerrar = self._cerrado
+
+            cantidad = sum(len(mensajes) for mensajes in tanda.values())
+            if cantidad:
+                self._escribir(tanda)
+                lineas_por_tanda.observar(cantidad)
+
+            with self._cond:
+                self._escritas += cantidad
+                lineas_pendientes.dec(cantidad)
+                self._cond.notify_all()
+                if cerrar and not self._pendientes:
+                    break
+
+        for archivo in self._abiertos.values():
+            archivo.close()
+        self._abiertos.clear()
+
+    def _archivo(self, ruta: str):
+        archivo = self._abiertos.get(ruta)
+        if archivo is not None:
+            self._abiertos.move_to_end(ruta)
+            return archivo
+        archivo = self._abiertos[ruta] = Anotador(ruta)
+        while len(self._abiertos) > self.max_abiertos:
+            _, viejo = self._abiertos.popitem(last=False)
+            viejo.close()
+            archivos_cerrados_lru.inc()
+        return archivo
+
+    def _escribir(self, tanda: dict):
+        with etapa("log_conversacion"):
+            for ruta, mensajes in tanda.items():
+                try:
+                    self._archivo(ruta).agregar(mensajes)
+                except Exception as e:
+                    errores_escritura.inc()
+                    # Se cierra: al reabrirlo, el Anotador descarta lo que haya quedado a medias
+                    anotador = self._abiertos.pop(ruta, None)
+                    if anotador is not None:
+                        try:
+                            anotador.close()
+                        except Exception:
+                            pass
+                    print(f"⚠️ Error escribiendo la conversación {ruta}: {e}")
+
+    def cerrar(self, timeout: float = 10.0):
+        """Escribe lo pendiente, cierra los archivos y detiene el hilo."""
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+            hilo = self._hilo
+        if hilo is not None:
+            hilo.join(timeout)
+
+
+# Instancia compartida por los endpoints
+escritor = EscritorConversaciones()
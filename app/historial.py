@@ -0,0 +1,25 @@
+# =============================================================================
+# Historial de conversaciones
+# Lectura de los mensajes guardados en conversaciones/<sesion>.conv. El índice
+# de offsets (ver app/conversaciones.py) permite leer solo la cola o un rango
+# de fechas sin recorrer la conversación entera, así que no hace falta
+# mantener una copia parseada por sesión en memoria.
+# =============================================================================
+
+import os
+
+from app.conversaciones import CARPETA_CONVERSACIONES, Conversacion
+
+
+def obtener_conversacion(session_id: str) -> Conversacion:
+    return Conversacion(os.path.join(CARPETA_CONVERSACIONES, session_id))
+
+
+def ultimos_mensajes(session_id: str, cantidad: int = 12) -> list:
+    """Últimos 'cantidad' mensajes de la conversación: [{"timestamp", "role", "content"}, ...]."""
+    return obtener_conversacion(session_id).ultimos(cantidad)
+
+
+def mensajes_entre(session_id: str, desde: str, hasta: str) -> list:
+    """Mensajes con fecha entre 'desde' y 'hasta' (YYYY-mm-dd HH:MM:SS, inclusive)."""
+    return obtener_conversacion(session_id).entre(desde, hasta)
@@ -1,5 +1,91 @@
-def leer_info_supermercado():
-	with open("info_supermercado.txt", "r", encoding="utf-8") as f:
-		contenido = f.read().strip()
-		print("--------------------------------- LEIDO info_supermercado.txt  ---------------------------------")
-	return contenido
\ No newline at end of file
+# =============================================================================
+# Información del supermercado (horarios, dirección, contacto)
+# info_supermercado.txt se lee una sola vez y queda en memoria junto con el
+# fragmento de prompt ya armado. Cada INFO_SUPER_VERIFICAR_SEG se mira la
+# fecha de modificación del archivo: si cambió, se relee sin reiniciar el bot.
+# La ruta se resuelve desde la raíz del proyecto, no desde la carpeta en la
+# que se lanzó uvicorn.
+# =============================================================================
+
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from app.trazas import debug
+
+load_dotenv()
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INFO_SUPER_RUTA = os.getenv("INFO_SUPER_RUTA", os.path.join(RAIZ, "info_supermercado.txt"))
+INFO_SUPER_VERIFICAR_SEG = float(os.getenv("INFO_SUPER_VERIFICAR_SEG", "5"))
+
+
+class ArchivoVigilado:
+    """Texto de un archivo cacheado en memoria, con recarga cuando cambia su mtime."""
+
+    def __init__(self, ruta: str, armar=lambda texto: texto, intervalo_verificacion: float = INFO_SUPER_VERIFICAR_SEG):
+        self.ruta = ruta
+        self.intervalo_verificacion = intervalo_verificacion
+        self._armar = armar             # texto -> valor precalculado (por ejemplo, el fragmento de prompt)
+        self._mtime = None
+        self._texto = ""
+        self._valor = armar("")
+        self._ultima_verificacion = None
+        self._lock = threading.Lock()
+
+    def _recargar_si_cambio(self):
+        try:
+            mtime = os.stat(self.ruta).st_mtime_ns
+        except OSError as e:
+            if self._mtime is not None or self._ultima_verificacion is None:
+                print(f"⚠️ No se pudo leer {self.ruta}: {e}")
+            self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            texto = f.read().strip()
+        self._texto, self._valor, self._mtime = texto, self._armar(texto), mtime
+        debug(f"📄 Leído {self.ruta}")
+
+    def _verificar(self):
+        ahora = time.monotonic()
+        if self._ultima_verificacion is not None and ahora - self._ultima_verificacion < self.intervalo_verificacion:
+            return
+        with self._lock:
+            if self._ultima_verificacion is None or ahora - self._ultima_verificacion >= self.intervalo_verificacion:
+                self._recargar_si_cambio()
+                self._ultima_verificacion = ahora
+
+    def texto(self) -> str:
+        self._verificar()
+        return self._texto
+
+    def valor(self):
+        self._verificar()
+        return self._valor
+
+
+def armar_fragmento_info(texto: str) -> str:
+    """Bloque rotulado que va antes del mensaje del cliente (no como mensaje de sistema)."""
+    if not texto:
+        return ""
+    return (
+        "[Datos del supermercado: usalos para responder sobre horarios, dirección, "
+        "contacto o quién sos; no inventes datos que no estén acá]\n"
+        + texto +
+        "\n[Fin de los datos del supermercado]\n\n"
+    )
+
+
+info_supermercado = ArchivoVigilado(INFO_SUPER_RUTA, armar_fragmento_info)
+
+
+def leer_info_supermercado() -> str:
+    return info_supermercado.texto()
+
+
+def fragmento_info_supermercado() -> str:
+    """Fragmento de prompt ya armado con la información del supermercado."""
+    return info_supermercado.valor()
@@ -1,11 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 from app.endpoints.endpoints import router
+from app.despacho import despachador
+from app.catalogo import catalogo
+from app.crud import cola_resumenes, calentador
+from app.calentamiento import MODELO_CALENTAR
+from app.escritor_conversaciones import escritor
+from app.notificaciones import notificador
+from app.diario_carritos import diario_carritos
+from app import backend_sesiones
+from app import metricas
+from app.sesiones import sesiones
 
 load_dotenv()
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cargar los modelos en Ollama antes del primer mensaje (en un hilo, mientras se carga el resto)
+    calentando = asyncio.ensure_future(asyncio.to_thread(calentador.calentar)) if MODELO_CALENTAR else None
+    # Cargar el catálogo en memoria antes del primer mensaje
+    catalogo.refrescar(forzar=True)
+    # Reenviar los pedidos que quedaron sin entregar antes de reiniciar
+    notificador.iniciar()
+    # Recuperar los carritos de antes del reinicio (con sqlite/redis ya viajan con la sesión)
+    if not backend_sesiones.backend.compartido:
+        diario_carritos.abrir()
+    if calentando is not None:
+        await calentando
+    # Pings para que Ollama no descargue los modelos (según MODELO_KEEP_ALIVE_POLITICA)
+    calentador.iniciar()
+    yield
+    # Esperar a que terminen los turnos en curso antes de apagar
+    despachador.cerrar()
+    cola_resumenes.cerrar()
+    # Bajar a disco las últimas líneas de conversación
+    escritor.cerrar()
+    # Dejar una foto de los carritos para el próximo arranque
+    diario_carritos.cerrar()
+    # Lo que no se llegue a entregar queda en la bandeja de salida
+    notificador.cerrar()
+    calentador.cerrar()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router)
 
@@ -17,3 +58,22 @@ def root():
         "docs": "Visita /docs para ver la documentación "
     }
 
+# Métricas internas (cola de turnos, tiempos de espera, etc.)
+@app.get("/metricas")
+def ver_metricas():
+    sesiones.medir_memoria()
+    return metricas.snapshot()
+
+# Las mismas métricas en formato Prometheus (para scrapear)
+@app.get("/metrics", response_class=PlainTextResponse)
+def ver_metricas_prometheus():
+    sesiones.medir_memoria()
+    return PlainTextResponse(metricas.exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+# Memoria aproximada de las sesiones más pesadas
+@app.get("/metricas/sesiones")
+def ver_memoria_sesiones(limite: int = 20):
+    return {
+        "sesiones_activas": len(sesiones),
+        "memoria_bytes": sesiones.memoria_por_sesion(limite),
+    }
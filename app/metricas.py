@@ -0,0 +1,213 @@
+# =============================================================================
+# Métricas en memoria del proceso (contadores, medidores e histogramas)
+# Son thread-safe porque los turnos se ejecutan en un pool de hilos.
+# =============================================================================
+
+import re
+import threading
+from bisect import bisect_left
+
+
+# Límites por defecto (en segundos) pensados para latencias de IA y base de datos
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+_registro = {}
+_lock_registro = threading.Lock()
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre: str, descripcion: str = ""):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self._valor = 0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1):
+        with self._lock:
+            self._valor += cantidad
+
+    @property
+    def valor(self):
+        return self._valor
+
+    def snapshot(self):
+        return self._valor
+
+    def reiniciar(self):
+        with self._lock:
+            self._valor = 0
+
+
+class Medidor:
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, descripcion: str = ""):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self._valor = 0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1):
+        with self._lock:
+            self._valor += cantidad
+
+    def dec(self, cantidad: float = 1):
+        with self._lock:
+            self._valor -= cantidad
+
+    def set(self, valor: float):
+        with self._lock:
+            self._valor = valor
+
+    @property
+    def valor(self):
+        return self._valor
+
+    def snapshot(self):
+        return self._valor
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, descripcion: str = "", buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.buckets = tuple(sorted(buckets))
+        self._conteos = [0] * (len(self.buckets) + 1)   # el último es +Inf
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += valor
+            self._total += 1
+
+    def percentil(self, p: float) -> float:
+        """Aproxima el percentil p (0-100) usando el límite superior del bucket."""
+        with self._lock:
+            total = self._total
+            conteos = list(self._conteos)
+        if not total:
+            return 0.0
+        objetivo = total * p / 100
+        acumulado = 0
+        for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return limite
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            total = self._total
+            suma = self._suma
+        return {
+            "count": total,
+            "sum": round(suma, 6),
+            "avg": round(suma / total, 6) if total else 0.0,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+        }
+
+    def acumulados(self):
+        """(límite, observaciones <= límite) por bucket, terminando en +Inf; más suma y total."""
+        with self._lock:
+            conteos = list(self._conteos)
+            suma = self._suma
+            total = self._total
+        acumulado = 0
+        pares = []
+        for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+            acumulado += conteo
+            pares.append((limite, acumulado))
+        return pares, suma, total
+
+    def reiniciar(self):
+        with self._lock:
+            self._conteos = [0] * (len(self.buckets) + 1)
+            self._suma = 0.0
+            self._total = 0
+
+
+def _registrar(clase, nombre: str, descripcion: str, **kwargs):
+    with _lock_registro:
+        existente = _registro.get(nombre)
+        if existente is not None:
+            return existente
+        metrica = clase(nombre, descripcion, **kwargs)
+        _registro[nombre] = metrica
+        return metrica
+
+
+def contador(nombre: str, descripcion: str = "") -> Contador:
+    return _registrar(Contador, nombre, descripcion)
+
+
+def medidor(nombre: str, descripcion: str = "") -> Medidor:
+    return _registrar(Medidor, nombre, descripcion)
+
+
+def histograma(nombre: str, descripcion: str = "", buckets=BUCKETS_SEGUNDOS) -> Histograma:
+    return _registrar(Histograma, nombre, descripcion, buckets=buckets)
+
+
+def snapshot() -> dict:
+    with _lock_registro:
+        metricas = list(_registro.values())
+    return {m.nombre: m.snapshot() for m in metricas}
+
+
+def reiniciar():
+    """
+    Pone en cero contadores e histogramas (para benchmarks: descartar el calentamiento).
+    Los medidores reflejan el estado actual (conexiones, sesiones) y no se tocan.
+    """
+    with _lock_registro:
+        metricas = list(_registro.values())
+    for m in metricas:
+        if hasattr(m, "reiniciar"):
+            m.reiniciar()
+
+
+# =============================================================================
+# EXPORTACIÓN EN FORMATO DE TEXTO DE PROMETHEUS (/metrics)
+# =============================================================================
+
+def _nombre_prometheus(nombre: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", nombre)
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar_prometheus() -> str:
+    with _lock_registro:
+        metricas = sorted(_registro.values(), key=lambda m: m.nombre)
+
+    lineas = []
+    for m in metricas:
+        nombre = _nombre_prometheus(m.nombre)
+        if m.tipo == "counter" and not nombre.endswith("_total"):
+            nombre += "_total"
+        descripcion = m.descripcion.replace("\\", "\\\\").replace("\n", " ")
+        lineas.append(f"# HELP {nombre} {descripcion}")
+        lineas.append(f"# TYPE {nombre} {m.tipo}")
+        if m.tipo == "histogram":
+            pares, suma, total = m.acumulados()
+            for limite, acumulado in pares:
+                lineas.append(f'{nombre}_bucket{{le="{_numero(limite)}"}} {acumulado}')
+            lineas.append(f"{nombre}_sum {_numero(suma)}")
+            lineas.append(f"{nombre}_count {total}")
+        else:
+            lineas.append(f"{nombre} {_numero(m.valor)}")
+    return "\n".join(lineas) + "\n"
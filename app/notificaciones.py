@@ -0,0 +1,268 @@
+# =============================================================================
+# Notificaciones salientes (pedidos confirmados al encargado vía bot.js)
+# El mensaje se guarda primero en una bandeja de salida SQLite (sobrevive a un
+# reinicio del bot o de bot.js) y un hilo con su propio event loop lo envía
+# con un cliente httpx asíncrono compartido: timeout por intento, reintentos
+# acotados con backoff exponencial y un barrido periódico de lo pendiente.
+# Con --workers N todos los procesos abren la misma bandeja: antes de enviar,
+# cada uno reclama la fila (estado 'enviando' hasta 'proximo') con un UPDATE
+# condicional, y solo envía quien la reclamó. Si ese proceso se cae, la fila
+# vuelve a estar disponible cuando vence el reclamo.
+# =============================================================================
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+import httpx
+
+from app import metricas
+
+load_dotenv()
+
+NOTIF_OUTBOX_RUTA = os.getenv("NOTIF_OUTBOX_RUTA", "notificaciones.db")
+NOTIF_TIMEOUT_SEG = float(os.getenv("NOTIF_TIMEOUT_SEG", "5"))
+# Intentos seguidos antes de dejar el mensaje para el próximo barrido
+NOTIF_REINTENTOS = int(os.getenv("NOTIF_REINTENTOS", "4"))
+NOTIF_BACKOFF_SEG = float(os.getenv("NOTIF_BACKOFF_SEG", "0.5"))
+NOTIF_BARRIDO_SEG = float(os.getenv("NOTIF_BARRIDO_SEG", "30"))
+# Cuánto dura el reclamo de una fila; como mínimo lo que tardan todos los intentos seguidos
+NOTIF_RECLAMO_SEG = float(os.getenv("NOTIF_RECLAMO_SEG", "120"))
+
+# Errores del cliente que no se arreglan reintentando (salvo timeout y rate limit)
+_REINTENTABLES_4XX = (408, 429)
+_SIN_ENTREGAR = "estado IN ('pendiente', 'enviando')"
+
+
+notif_encoladas = metricas.contador("notif_encoladas", "Notificaciones guardadas en la bandeja de salida")
+notif_entregadas = metricas.contador("notif_entregadas", "Notificaciones entregadas al puente de WhatsApp")
+notif_reintentos = metricas.contador("notif_reintentos", "Reintentos de envío")
+notif_descartadas = metricas.contador("notif_descartadas", "Notificaciones rechazadas por el puente (4xx)")
+notif_pendientes = metricas.medidor("notif_pendientes", "Notificaciones en la bandeja de salida")
+notif_intento = metricas.histograma("notif_intento_segundos", "Duración de cada POST al puente")
+notif_entrega = metricas.histograma(
+    "notif_entrega_segundos", "Tiempo desde que se guarda la notificación hasta que se entrega",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+
+class Notificador:
+    def __init__(self, ruta: str = NOTIF_OUTBOX_RUTA, timeout: float = NOTIF_TIMEOUT_SEG,
+                 reintentos: int = NOTIF_REINTENTOS, backoff: float = NOTIF_BACKOFF_SEG,
+                 barrido: float = NOTIF_BARRIDO_SEG, reclamo: float = NOTIF_RECLAMO_SEG, transporte=None):
+        self.ruta = ruta
+        self.timeout = timeout
+        self.reintentos = max(1, reintentos)
+        self.backoff = backoff
+        self.barrido = barrido
+        tanda = self.reintentos * self.timeout + self.backoff * 2 ** self.reintentos * 1.25
+        self.reclamo = max(reclamo, tanda)
+        self._transporte = transporte      # solo para tests (httpx.MockTransport)
+        self._db = None
+        self._lock = threading.Lock()
+        self._loop = None
+        self._hilo = None
+        self._cliente = None
+        self._parar = None
+        self._en_curso = {}                # id -> tarea (solo se toca desde el loop)
+
+    # =========================================================================
+    # BANDEJA DE SALIDA
+    # =========================================================================
+
+    def _conexion(self) -> sqlite3.Connection:
+        # Se abre recién al usarla: importar el módulo no crea archivos
+        if self._db is None:
+            # Otros workers pueden estar escribiendo la misma bandeja
+            self._db = sqlite3.connect(self.ruta, check_same_thread=False, timeout=10)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS salida ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, payload TEXT NOT NULL,"
+                " creado REAL NOT NULL, intentos INTEGER NOT NULL DEFAULT 0,"
+                " proximo REAL NOT NULL DEFAULT 0, estado TEXT NOT NULL DEFAULT 'pendiente')"
+            )
+            self._db.commit()
+            notif_pendientes.set(self._db.execute(f"SELECT COUNT(*) FROM salida WHERE {_SIN_ENTREGAR}").fetchone()[0])
+        return self._db
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return self._conexion().execute(f"SELECT COUNT(*) FROM salida WHERE {_SIN_ENTREGAR}").fetchone()[0]
+
+    def encolar(self, url: str, payload: dict) -> int:
+        """Guarda la notificación en disco y la manda en segundo plano. Devuelve su id."""
+        with self._lock:
+            db = self._conexion()
+            cursor = db.execute(
+                "INSERT INTO salida (url, payload, creado) VALUES (?, ?, ?)",
+                (url, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+            db.commit()
+            id_notificacion = cursor.lastrowid
+        notif_encoladas.inc()
+        notif_pendientes.inc()
+        if self.iniciar():
+            self._loop.call_soon_threadsafe(self._lanzar, id_notificacion)
+        return id_notificacion
+
+    # =========================================================================
+    # ENVÍO (hilo con event loop propio)
+    # =========================================================================
+
+    def iniciar(self) -> bool:
+        """Arranca el hilo de envío (y manda lo que haya quedado de antes). False si ya se cerró."""
+        with self._lock:
+            if self._parar is not None and self._hilo is None:
+                return False
+            if self._hilo is None:
+                self._conexion()
+                self._loop = asyncio.new_event_loop()
+                self._parar = asyncio.Event()
+                self._cliente = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                    transport=self._transporte,
+                )
+                self._hilo = threading.Thread(target=self._correr, name="notificaciones", daemon=True)
+                self._hilo.start()
+            return True
+
+    def _correr(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._principal())
+        finally:
+            self._loop.close()
+
+    async def _principal(self):
+        # Al arrancar se manda todo lo pendiente, aunque su próximo intento fuera más adelante
+        hasta = float("inf")
+        while not self._parar.is_set():
+            self._barrer(hasta)
+            hasta = None
+            try:
+                await asyncio.wait_for(self._parar.wait(), timeout=self.barrido)
+            except asyncio.TimeoutError:
+                pass
+
+        # Al apagar se da un momento a los envíos en curso; lo que no llegue queda en la bandeja
+        tareas = list(self._en_curso.values())
+        if tareas:
+            _, sin_terminar = await asyncio.wait(tareas, timeout=self.timeout)
+            for tarea in sin_terminar:
+                tarea.cancel()
+            await asyncio.gather(*sin_terminar, return_exceptions=True)
+        await self._cliente.aclose()
+
+    def _barrer(self, hasta: float = None):
+        ahora = time.time()
+        with self._lock:
+            # Las que están 'enviando' son de otro worker (o de uno caído, si venció el reclamo)
+            ids = [fila[0] for fila in self._conexion().execute(
+                "SELECT id FROM salida WHERE (estado = 'pendiente' AND proximo <= ?)"
+                " OR (estado = 'enviando' AND proximo <= ?) ORDER BY id",
+                (ahora if hasta is None else hasta, ahora)
+            )]
+        for id_notificacion in ids:
+            self._lanzar(id_notificacion)
+
+    def _lanzar(self, id_notificacion: int):
+        if id_notificacion in self._en_curso or self._parar.is_set():
+            return
+        tarea = self._loop.create_task(self._entregar(id_notificacion))
+        self._en_curso[id_notificacion] = tarea
+        tarea.add_done_callback(lambda _: self._en_curso.pop(id_notificacion, None))
+
+    def _reclamar(self, id_notificacion: int):
+        """Marca la fila como 'enviando' si nadie la tiene. Devuelve (url, payload, creado) o None."""
+        ahora = time.time()
+        with self._lock:
+            db = self._conexion()
+            reclamada = db.execute(
+                "UPDATE salida SET estado = 'enviando', proximo = ? WHERE id = ?"
+                " AND (estado = 'pendiente' OR (estado = 'enviando' AND proximo <= ?))",
+                (ahora + self.reclamo, id_notificacion, ahora),
+            ).rowcount == 1
+            db.commit()
+            if not reclamada:
+                return None
+            return db.execute("SELECT url, payload, creado FROM salida WHERE id = ?", (id_notificacion,)).fetchone()
+
+    def _soltar(self, id_notificacion: int, proximo: float, intentos: int = 0):
+        with self._lock:
+            self._conexion().execute(
+                "UPDATE salida SET estado = 'pendiente', intentos = intentos + ?, proximo = ? WHERE id = ?",
+                (intentos, proximo, id_notificacion),
+            )
+            self._db.commit()
+
+    async def _entregar(self, id_notificacion: int):
+        fila = self._reclamar(id_notificacion)
+        if fila is None:
+            return
+        url, payload, creado = fila[0], json.loads(fila[1]), fila[2]
+        try:
+            await self._intentar(id_notificacion, url, payload, creado)
+        except asyncio.CancelledError:
+            # Apagado a mitad del envío: que la tome el próximo barrido (de este worker o de otro)
+            self._soltar(id_notificacion, 0)
+            raise
+
+    async def _intentar(self, id_notificacion: int, url: str, payload: dict, creado: float):
+        for intento in range(self.reintentos):
+            if intento:
+                notif_reintentos.inc()
+                await asyncio.sleep(self.backoff * 2 ** (intento - 1) * random.uniform(0.75, 1.25))
+            inicio = time.perf_counter()
+            try:
+                respuesta = await self._cliente.post(url, json=payload)
+            except httpx.HTTPError as e:
+                print(f"⚠️ Notificación {id_notificacion}: intento {intento + 1} falló ({type(e).__name__})")
+                continue
+            finally:
+                notif_intento.observar(time.perf_counter() - inicio)
+
+            if respuesta.is_success:
+                self._terminar(id_notificacion, "DELETE FROM salida WHERE id = ?")
+                notif_entregadas.inc()
+                notif_entrega.observar(time.time() - creado)
+                return
+            if 400 <= respuesta.status_code < 500 and respuesta.status_code not in _REINTENTABLES_4XX:
+                # Se deja en la tabla para poder revisarla, pero no se reintenta
+                self._terminar(id_notificacion, "UPDATE salida SET estado = 'rechazada' WHERE id = ?")
+                notif_descartadas.inc()
+                print(f"⚠️ Notificación {id_notificacion} rechazada por el puente: HTTP {respuesta.status_code}")
+                return
+            print(f"⚠️ Notificación {id_notificacion}: intento {intento + 1} falló (HTTP {respuesta.status_code})")
+
+        # Sin suerte por ahora: queda en la bandeja para el próximo barrido
+        self._soltar(id_notificacion, time.time() + self.barrido, self.reintentos)
+
+    def _terminar(self, id_notificacion: int, sql: str):
+        with self._lock:
+            self._conexion().execute(sql, (id_notificacion,))
+            self._db.commit()
+        notif_pendientes.dec()
+
+    def cerrar(self, timeout: float = 10.0):
+        """Detiene el hilo de envío. Lo no entregado queda en la bandeja para el próximo arranque."""
+        with self._lock:
+            hilo = self._hilo
+            if self._parar is None:
+                self._parar = asyncio.Event()
+        if hilo is not None:
+            self._loop.call_soon_threadsafe(self._parar.set)
+            hilo.join(timeout)
+        with self._lock:
+            self._hilo = None
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Instancia compartida (la usa pedidos.finalizar_pedido)
+notificador = Notificador()
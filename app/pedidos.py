@@ -1,36 +1,41 @@
-# Diccionario global que guarda los pedidos activos por sesión
-pedidos_por_cliente = {}
+import os
+from dotenv import load_dotenv
 
-def agregar_a_pedido(session_id: str, producto: str, cantidad: int, precio_unitario: float) -> str:
-    from decimal import Decimal
+from app.carrito import Carrito, formatear_centavos
+from app.diario_carritos import diario_carritos
+from app.notificaciones import notificador
+from app.sesiones import sesiones
+from app.trazas import debug, etapa
 
-    if session_id not in pedidos_por_cliente:
-        pedidos_por_cliente[session_id] = []
+load_dotenv()
 
-    pedido = pedidos_por_cliente[session_id]
+# Endpoint de bot.js que reenvía el pedido al encargado por WhatsApp
+URL_ENVIO_PEDIDOS = os.getenv("URL_ENVIO_PEDIDOS", "http://localhost:3000/enviar-mensaje")
 
-    # Buscar si el producto ya está en el pedido
-    producto_existente = next((p for p in pedido if p["producto"].lower() == producto.lower()), None)
+# Pedidos activos por sesión: session_id -> Carrito (se liberan junto con el resto del estado de la sesión).
+# Los cambios pasan por diario_carritos para que sobrevivan a un reinicio.
+pedidos_por_cliente = sesiones.espacio("pedidos_por_cliente")
 
-    if producto_existente:
-        # Si ya existe, sumar la cantidad
-        producto_existente["cantidad"] += cantidad
-        producto_existente["subtotal"] = float(Decimal(producto_existente["precio_unitario"]) * producto_existente["cantidad"])
-        total_actual = sum(p["subtotal"] for p in pedido)
-        mensaje = f"Se actualizaron las unidades de {producto} (ahora x{producto_existente['cantidad']}).               Total: ${total_actual:.2f}"
+def carrito_de(session_id: str) -> Carrito:
+    carrito = pedidos_por_cliente.get(session_id)
+    if carrito is None:
+        carrito = pedidos_por_cliente[session_id] = Carrito()
+    return carrito
+
+
+def agregar_a_pedido(session_id: str, producto: str, cantidad: int, precio_unitario, producto_id=None) -> str:
+    carrito = carrito_de(session_id)
+
+    # Si el producto ya está en el pedido se suman las unidades a esa línea
+    linea, nueva = diario_carritos.agregar(session_id, carrito, producto, cantidad, precio_unitario, producto_id)
+    total_actual = formatear_centavos(carrito.total_centavos)
+
+    if not nueva:
+        mensaje = f"Se actualizaron las unidades de {producto} (ahora x{linea.cantidad}).               Total: ${total_actual}"
     else:
-        # Si no existe, agregarlo nuevo
-        subtotal = float(Decimal(precio_unitario) * cantidad)
-        pedido.append({
-            "producto": producto,
-            "cantidad": cantidad,
-            "precio_unitario": float(precio_unitario),
-            "subtotal": subtotal
-        })
-        total_actual = sum(p["subtotal"] for p in pedido)
-        mensaje = f"🛒 Agregué {cantidad} {producto} al pedido. (Total: ${total_actual:.2f}), cuando quieras finalizar tu pedido me avisas 😊"
-
-    print(f"Pedido actualizado!({session_id})")
+        mensaje = f"🛒 Agregué {cantidad} {producto} al pedido. (Total: ${total_actual}), cuando quieras finalizar tu pedido me avisas 😊"
+
+    debug(f"Pedido actualizado!({session_id})")
     return mensaje
 
 
@@ -39,18 +44,17 @@ def mostrar_pedido(session_id: str) -> str:
     if session_id not in pedidos_por_cliente or not pedidos_por_cliente[session_id]:
         return "Parece que todavía no tenés productos en tu pedido."
 
-    items = pedidos_por_cliente[session_id]
-    total = sum(i["subtotal"] for i in items)
+    carrito = pedidos_por_cliente[session_id]
 
     listado = "\n".join([
-        f"{i['producto']} ${i['precio_unitario']:.2f}({i['cantidad']}) : ${i['subtotal']:.2f}"
-        for i in items
+        f"{l.producto} ${formatear_centavos(l.precio_centavos)}({l.cantidad}) : ${formatear_centavos(l.subtotal_centavos)}"
+        for l in carrito
     ])
 
     return (
         f"Actualmente tu pedido tiene:\n\n"
         f"{listado}\n\n"
-        f"🧾 Total: ${total:.2f}\n"
+        f"🧾 Total: ${formatear_centavos(carrito.total_centavos)}\n"
         f"¿Querés agregar algo más o cerrar el pedido?"
     )
 
@@ -60,15 +64,14 @@ def vaciar_pedido(session_id: str) -> str:
     if session_id not in pedidos_por_cliente or not pedidos_por_cliente[session_id]:
         return "todavía no agregaste productos a tu pedido 😕"
 
-    pedidos_por_cliente[session_id] = []
-    print(f"Pedido vaciado ({session_id})")
+    diario_carritos.vaciar(session_id, pedidos_por_cliente[session_id])
+    debug(f"Pedido vaciado ({session_id})")
     return "Vacié tu pedido. Podés empezar un nuevo pedido cuando quieras. 🧺"
 
 
 
 
 def finalizar_pedido(session_id: str, datos_cliente: str, numero_cliente: str) -> str:
-    import requests
     from app.pedidos import mostrar_pedido
 
     if session_id not in pedidos_por_cliente or not pedidos_por_cliente[session_id]:
@@ -87,18 +90,19 @@ def finalizar_pedido(session_id: str, datos_cliente: str, numero_cliente: str) -
     )
 
     try:
-        url = "http://localhost:3000/enviar-mensaje"
         #payload = {"numero": "5491125123781", "mensaje": mensaje}  # número del encargado
         payload = {"numero": "5491162195267", "mensaje": mensaje}  # número del encargado
-        requests.post(url, json=payload)
-        print("📤 Pedido enviado correctamente al encargado.")
+        # Queda guardado en la bandeja de salida y se envía en segundo plano (con reintentos)
+        with etapa("envio_pedido"):
+            id_notificacion = notificador.encolar(URL_ENVIO_PEDIDOS, payload)
+        debug(f"📤 Pedido encolado para el encargado (notificación {id_notificacion}).")
     except Exception as e:
         print(f"⚠️ Error enviando pedido al encargado: {e}")
         return "Hubo un problema al enviar el pedido al encargado 😕. Intentá de nuevo más tarde."
 
     # Vaciar el pedido del cliente
-    pedidos_por_cliente[session_id] = []
-    print(f"Pedido finalizado ({session_id})")
+    diario_carritos.vaciar(session_id, pedidos_por_cliente[session_id], finalizado=True)
+    debug(f"Pedido finalizado ({session_id})")
     return "Perfecto 👍 Tu pedido fue confirmado correctamente y ya está en camino 🚚"
 
 
@@ -0,0 +1,86 @@
+# =============================================================================
+# Productos ya mostrados al cliente (por sesión)
+# Cada producto se guarda una vez por id, con un tope de PRODUCTOS_MOSTRADOS_MAX
+# (se descartan los mostrados hace más tiempo); el texto para el prompt de
+# detección queda cacheado hasta que cambia algo.
+# =============================================================================
+
+import os
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PRODUCTOS_MOSTRADOS_MAX = int(os.getenv("PRODUCTOS_MOSTRADOS_MAX", "150"))
+
+
+def linea_producto(p: dict) -> str:
+    return f"• {p['producto']} — ${p['precio_venta']}"
+
+
+def lista_con_vinetas(productos) -> str:
+    """Lista '• producto — $precio', una por línea (la usan los prompts y los mensajes de respaldo)."""
+    return "\n".join(linea_producto(p) for p in productos)
+
+
+class ProductosMostrados:
+    def __init__(self, max_productos: int = PRODUCTOS_MOSTRADOS_MAX):
+        self.max_productos = max_productos
+        self._productos = OrderedDict()    # id -> producto, del mostrado hace más tiempo al más reciente
+        self._nombres = {}                 # id -> nombre en minúsculas (para buscar)
+        self._consultas = {}               # id -> consulta con la que se mostró por última vez
+        self._texto = None                 # fragmento de prompt cacheado
+
+    @staticmethod
+    def _id(p: dict):
+        return p["id"] if p.get("id") is not None else p["producto"]
+
+    def mostrar(self, consulta: str, productos):
+        """Registra los productos mostrados para 'consulta' (los repetidos pasan a ser los más recientes)."""
+        consulta = consulta.lower()
+        for p in productos:
+            clave = self._id(p)
+            if clave in self._productos:
+                self._productos.move_to_end(clave)
+            self._productos[clave] = p
+            self._nombres[clave] = p["producto"].lower()
+            self._consultas[clave] = consulta
+            self._texto = None
+        while len(self._productos) > self.max_productos:
+            viejo, _ = self._productos.popitem(last=False)
+            del self._nombres[viejo], self._consultas[viejo]
+
+    def buscar(self, nombre: str):
+        """Primer producto mostrado cuyo nombre contiene 'nombre', o None."""
+        nombre = nombre.lower()
+        for clave, p in self._productos.items():
+            if nombre in self._nombres[clave]:
+                return p
+        return None
+
+    def texto_prompt(self) -> str:
+        if self._texto is None:
+            self._texto = (
+                "Estos son los productos que ya se le mostraron al cliente:\n"
+                + "".join(f"- {p['producto']}\n" for p in self._productos.values())
+            ) if self._productos else ""
+        return self._texto
+
+    def por_consulta(self) -> dict:
+        agrupados = {}
+        for clave, p in self._productos.items():
+            agrupados.setdefault(self._consultas[clave], []).append(p)
+        return agrupados
+
+    @classmethod
+    def desde_consultas(cls, consultas: dict, max_productos: int = PRODUCTOS_MOSTRADOS_MAX):
+        mostrados = cls(max_productos)
+        for consulta, productos in consultas.items():
+            mostrados.mostrar(consulta, productos)
+        return mostrados
+
+    def __iter__(self):
+        return iter(self._productos.values())
+
+    def __len__(self):
+        return len(self._productos)
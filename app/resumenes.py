@@ -0,0 +1,115 @@
+# =============================================================================
+# Resúmenes de conversación en segundo plano
+# Los resúmenes (para la IA output y la IA input) solo los necesita el turno
+# siguiente, así que se generan después de devolver la respuesta. Si el cliente
+# manda varios mensajes seguidos, se coalescen en un único resumen por sesión.
+# El pool tiene por defecto tantos hilos como el de turnos (DESPACHO_MAX_WORKERS).
+# =============================================================================
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from app import metricas
+from app.despacho import DESPACHO_MAX_WORKERS
+
+load_dotenv()
+
+RESUMEN_WORKERS = int(os.getenv("RESUMEN_WORKERS", str(DESPACHO_MAX_WORKERS)))
+# Máximo que el turno siguiente espera a que termine un resumen pendiente
+RESUMEN_ESPERA_MAX_SEG = float(os.getenv("RESUMEN_ESPERA_MAX_SEG", "20"))
+
+
+resumenes_generados = metricas.contador("resumenes_generados", "Resúmenes generados en segundo plano")
+resumenes_coalescidos = metricas.contador("resumenes_coalescidos", "Pedidos de resumen absorbidos por uno pendiente")
+resumenes_con_error = metricas.contador("resumenes_con_error", "Resúmenes que fallaron")
+resumenes_pendientes = metricas.medidor("resumenes_pendientes", "Sesiones con un resumen en cola o en curso")
+espera_resumen = metricas.histograma("resumen_espera_segundos", "Tiempo que un turno esperó a un resumen pendiente")
+duracion_resumen = metricas.histograma("resumen_duracion_segundos", "Duración de la generación de un resumen")
+
+
+class _EstadoResumen:
+    __slots__ = ("futuro", "iniciado", "repetir", "argumento")
+
+    def __init__(self, argumento):
+        self.futuro = None
+        self.iniciado = False
+        self.repetir = False
+        self.argumento = argumento
+
+
+class ColaResumenes:
+    def __init__(self, generar, max_workers: int = RESUMEN_WORKERS):
+        # generar(session_id, argumento) hace el trabajo pesado (llamadas a la IA)
+        self._generar = generar
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resumen")
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def programar(self, session_id: str, argumento=None):
+        """Encola un resumen; si ya hay uno pendiente para la sesión, se reutiliza."""
+        with self._lock:
+            estado = self._estados.get(session_id)
+            if estado is not None:
+                estado.argumento = argumento
+                if estado.iniciado:
+                    # Ya está corriendo con datos viejos: se repite una vez al terminar
+                    estado.repetir = True
+                resumenes_coalescidos.inc()
+                return estado.futuro
+
+            estado = self._estados[session_id] = _EstadoResumen(argumento)
+            resumenes_pendientes.inc()
+            estado.futuro = self._executor.submit(self._ejecutar, session_id, estado)
+            return estado.futuro
+
+    def _ejecutar(self, session_id: str, estado: _EstadoResumen):
+        while True:
+            with self._lock:
+                estado.iniciado = True
+                estado.repetir = False
+                argumento = estado.argumento
+
+            inicio = time.perf_counter()
+            try:
+                self._generar(session_id, argumento)
+                resumenes_generados.inc()
+            except Exception as e:
+                resumenes_con_error.inc()
+                print(f"⚠️ Error al generar resumen en segundo plano ({session_id}): {e}")
+            finally:
+                duracion_resumen.observar(time.perf_counter() - inicio)
+
+            with self._lock:
+                if not estado.repetir:
+                    del self._estados[session_id]
+                    resumenes_pendientes.dec()
+                    return
+
+    def esperar(self, session_id: str, timeout: float = RESUMEN_ESPERA_MAX_SEG) -> bool:
+        """
+        Bloquea hasta que el resumen pendiente de la sesión termine (o venza el timeout).
+        Devuelve False solo si se venció la espera.
+        """
+        with self._lock:
+            estado = self._estados.get(session_id)
+        if estado is None or estado.futuro.done():
+            return True
+
+        inicio = time.perf_counter()
+        try:
+            estado.futuro.result(timeout=timeout)
+            return True
+        except Exception:
+            return estado.futuro.done()
+        finally:
+            espera_resumen.observar(time.perf_counter() - inicio)
+
+    def pendiente(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._estados
+
+    def cerrar(self, esperar: bool = True):
+        self._executor.shutdown(wait=esperar)
@@ -0,0 +1,200 @@
+# =============================================================================
+# Estado por sesión acotado (LRU + vencimiento por inactividad)
+# store, datos_traidos_desde_bd y pedidos_por_cliente son "espacios" de un
+# mismo gestor: cuando una sesión queda inactiva más del TTL, o se supera el
+# máximo de sesiones, se desaloja de todos los espacios a la vez.
+# =============================================================================
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from dotenv import load_dotenv
+from langchain_core.chat_history import InMemoryChatMessageHistory
+
+from app import metricas
+
+load_dotenv()
+
+SESIONES_MAX = int(os.getenv("SESIONES_MAX", "5000"))
+SESIONES_TTL_SEG = float(os.getenv("SESIONES_TTL_SEG", str(6 * 3600)))
+# Tope del historial de chat que se manda al modelo
+HISTORIAL_MAX_MENSAJES = int(os.getenv("HISTORIAL_MAX_MENSAJES", "20"))
+HISTORIAL_MAX_TOKENS = int(os.getenv("HISTORIAL_MAX_TOKENS", "2000"))
+
+
+sesiones_activas = metricas.medidor("sesiones_activas", "Sesiones con estado en memoria")
+sesiones_memoria = metricas.medidor("sesiones_memoria_bytes", "Memoria aproximada de todas las sesiones (se mide en /metrics y /metricas)")
+sesiones_desalojadas_lru = metricas.contador("sesiones_desalojadas_lru", "Sesiones desalojadas por superar SESIONES_MAX")
+sesiones_desalojadas_ttl = metricas.contador("sesiones_desalojadas_ttl", "Sesiones desalojadas por inactividad")
+mensajes_recortados = metricas.contador("historial_mensajes_recortados", "Mensajes de chat descartados por el tope del historial")
+
+
+# =============================================================================
+# HISTORIAL DE CHAT CON TOPE DE MENSAJES Y TOKENS
+# =============================================================================
+
+def estimar_tokens(texto) -> int:
+    # Aproximación suficiente para español: ~4 caracteres por token
+    return len(str(texto)) // 4 + 1
+
+
+class HistorialChatAcotado(InMemoryChatMessageHistory):
+    max_mensajes: int = HISTORIAL_MAX_MENSAJES
+    max_tokens: int = HISTORIAL_MAX_TOKENS
+
+    def add_message(self, message) -> None:
+        self.messages.append(message)
+        self._recortar()
+
+    def _recortar(self):
+        descartar = max(len(self.messages) - self.max_mensajes, 0)
+        tokens = sum(estimar_tokens(m.content) for m in self.messages[descartar:])
+        # Siempre se conserva al menos el último mensaje
+        while tokens > self.max_tokens and descartar < len(self.messages) - 1:
+            tokens -= estimar_tokens(self.messages[descartar].content)
+            descartar += 1
+        if descartar:
+            del self.messages[:descartar]
+            mensajes_recortados.inc(descartar)
+
+
+# =============================================================================
+# GESTOR DE SESIONES
+# =============================================================================
+
+def tamanio_profundo(objeto, vistos=None) -> int:
+    """Bytes aproximados que ocupa un objeto y todo lo que referencia."""
+    if vistos is None:
+        vistos = set()
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    tamanio = sys.getsizeof(objeto)
+    # Se recorren copias: los turnos pueden estar modificando estos objetos en otro hilo
+    if isinstance(objeto, dict):
+        tamanio += sum(tamanio_profundo(k, vistos) + tamanio_profundo(v, vistos) for k, v in list(objeto.items()))
+    elif isinstance(objeto, (list, tuple, set, frozenset)):
+        tamanio += sum(tamanio_profundo(e, vistos) for e in tuple(objeto))
+    elif hasattr(objeto, "__dict__"):
+        tamanio += tamanio_profundo(vars(objeto), vistos)
+    elif hasattr(type(objeto), "__slots__"):
+        # Objetos compactos (por ejemplo, las líneas del carrito)
+        tamanio += sum(tamanio_profundo(getattr(objeto, a), vistos)
+                       for a in type(objeto).__slots__ if hasattr(objeto, a))
+    return tamanio
+
+
+class EspacioSesion(MutableMapping):
+    """Vista tipo diccionario sobre un tipo de dato de sesión (carrito, historial, etc.)."""
+
+    def __init__(self, gestor, nombre: str):
+        self._gestor = gestor
+        self.nombre = nombre
+        self._datos = {}
+        self.al_olvidar = None      # función(session_id, valor) cuando el gestor desaloja la sesión
+
+    def __getitem__(self, session_id):
+        valor = self._datos[session_id]
+        self._gestor.tocar(session_id)
+        return valor
+
+    def __setitem__(self, session_id, valor):
+        self._datos[session_id] = valor
+        self._gestor.tocar(session_id)
+
+    def __delitem__(self, session_id):
+        del self._datos[session_id]
+
+    def __contains__(self, session_id):
+        return session_id in self._datos
+
+    def __iter__(self):
+        return iter(list(self._datos))
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class GestorSesiones:
+    def __init__(self, max_sesiones: int = SESIONES_MAX, ttl_seg: float = SESIONES_TTL_SEG, reloj=time.monotonic):
+        self.max_sesiones = max_sesiones
+        self.ttl_seg = ttl_seg
+        self._reloj = reloj
+        self._ultimo_acceso = OrderedDict()    # session_id -> último acceso (más viejo primero)
+        self._espacios = {}
+        self._lock = threading.RLock()
+
+    def espacio(self, nombre: str) -> EspacioSesion:
+        with self._lock:
+            if nombre not in self._espacios:
+                self._espacios[nombre] = EspacioSesion(self, nombre)
+            return self._espacios[nombre]
+
+    def tocar(self, session_id: str):
+        with self._lock:
+            ahora = self._reloj()
+            if session_id in self._ultimo_acceso:
+                self._ultimo_acceso.move_to_end(session_id)
+            self._ultimo_acceso[session_id] = ahora
+            self._desalojar_vencidas(ahora)
+            sesiones_activas.set(len(self._ultimo_acceso))
+
+    def _desalojar_vencidas(self, ahora: float):
+        while self._ultimo_acceso:
+            session_id, ultimo = next(iter(self._ultimo_acceso.items()))
+            if ahora - ultimo > self.ttl_seg:
+                sesiones_desalojadas_ttl.inc()
+            elif len(self._ultimo_acceso) > self.max_sesiones:
+                sesiones_desalojadas_lru.inc()
+            else:
+                break
+            self.olvidar(session_id)
+
+    def olvidar(self, session_id: str):
+        """Elimina la sesión de todos los espacios (avisando a los que registraron al_olvidar)."""
+        with self._lock:
+            self._ultimo_acceso.pop(session_id, None)
+            for espacio in self._espacios.values():
+                valor = espacio._datos.pop(session_id, None)
+                if valor is not None and espacio.al_olvidar is not None:
+                    espacio.al_olvidar(session_id, valor)
+            sesiones_activas.set(len(self._ultimo_acceso))
+
+    def __contains__(self, session_id):
+        return session_id in self._ultimo_acceso
+
+    def __len__(self):
+        return len(self._ultimo_acceso)
+
+    def _valores(self, ids) -> dict:
+        """session_id -> objetos de la sesión en cada espacio (se toma con el lock)."""
+        with self._lock:
+            espacios = list(self._espacios.values())
+            return {s: [e._datos[s] for e in espacios if s in e._datos] for s in ids}
+
+    def memoria_sesion(self, session_id: str) -> int:
+        vistos = set()
+        return sum(tamanio_profundo(valor, vistos) for valor in self._valores([session_id])[session_id])
+
+    def medir_memoria(self) -> dict:
+        """Bytes aproximados de cada sesión; también actualiza el medidor sesiones_memoria_bytes."""
+        with self._lock:
+            ids = list(self._ultimo_acceso)
+        tamanios = {}
+        for session_id, valores in self._valores(ids).items():
+            vistos = set()
+            tamanios[session_id] = sum(tamanio_profundo(valor, vistos) for valor in valores)
+        sesiones_memoria.set(sum(tamanios.values()))
+        return tamanios
+
+    def memoria_por_sesion(self, limite: int = 20) -> dict:
+        """Las 'limite' sesiones que más memoria ocupan (bytes aproximados)."""
+        tamanios = sorted(((bytes_, s) for s, bytes_ in self.medir_memoria().items()), reverse=True)[:limite]
+        return {s: bytes_ for bytes_, s in tamanios}
+
+
+# Gestor compartido por crud.py y pedidos.py
+sesiones = GestorSesiones()
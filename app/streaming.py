@@ -0,0 +1,58 @@
+# =============================================================================
+# Streaming de la respuesta del modelo output
+# Durante un turno de /process-message/stream el endpoint registra una función
+# "emitir" en el hilo que ejecuta get_response. Las llamadas que generan el
+# texto que ve el cliente pasan por invocar_con_streaming: si hay alguien
+# escuchando, se usa modelo.stream y cada trozo se emite apenas llega.
+# Sin streaming activo se comporta igual que modelo.invoke.
+# Si el modelo falla a mitad del stream, el turno sigue con otro texto (el
+# de respaldo de crud.py): se emite None para avisar que lo emitido hasta
+# ahí no forma parte de la respuesta y el endpoint lo pasa como "reinicio".
+# =============================================================================
+
+import threading
+from contextlib import contextmanager
+from langchain_core.messages import AIMessage
+
+from app import metricas
+from app.admision import admision
+from app.trazas import etapa
+
+_salida = threading.local()
+
+trozos_emitidos = metricas.contador("stream_trozos_emitidos", "Trozos de texto enviados por streaming")
+reinicios = metricas.contador("stream_reinicios", "Streams cortados a mitad por un error (el cliente descarta lo recibido)")
+primer_trozo = metricas.histograma("stream_primer_trozo_segundos", "Tiempo hasta el primer trozo de la respuesta")
+
+
+@contextmanager
+def emitir_a(emitir):
+    """Mientras dure el bloque, el texto generado en este hilo se pasa a emitir(texto) (None = reinicio)."""
+    anterior = getattr(_salida, "emitir", None)
+    _salida.emitir = emitir
+    try:
+        yield
+    finally:
+        _salida.emitir = anterior
+
+
+def invocar_con_streaming(modelo, entrada, **kwargs):
+    emitir = getattr(_salida, "emitir", None)
+    with etapa("respuesta_ia"), admision.llamada_modelo():
+        if emitir is None:
+            return modelo.invoke(entrada, **kwargs)
+
+        partes = []
+        try:
+            for trozo in modelo.stream(entrada, **kwargs):
+                texto = trozo.content if hasattr(trozo, "content") else trozo
+                if isinstance(texto, str) and texto:
+                    partes.append(texto)
+                    emitir(texto)
+                    trozos_emitidos.inc()
+        except BaseException:
+            if partes:
+                emitir(None)
+                reinicios.inc()
+            raise
+        return AIMessage(content="".join(partes))
@@ -0,0 +1,57 @@
+# =============================================================================
+# Trazas por etapa y prints de depuración
+# etapa("nombre") mide un tramo del turno (detección, catálogo, IA, archivos,
+# envío del pedido) y lo registra en el histograma etapa_<nombre>_segundos,
+# que se exporta en /metrics. Dentro de traza_turno() además se arma el
+# desglose del turno completo para ver de un vistazo dónde se fue el tiempo.
+# Con BOT_DEBUG=0 se silencian los print de seguimiento (los errores no).
+# =============================================================================
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from app import metricas
+
+load_dotenv()
+
+BOT_DEBUG = os.getenv("BOT_DEBUG", "1").lower() in ("1", "true", "si", "yes")
+
+_traza = threading.local()
+
+
+def debug(*args, **kwargs):
+    """print() de seguimiento: se puede apagar en producción con BOT_DEBUG=0."""
+    if BOT_DEBUG:
+        print(*args, **kwargs)
+
+
+@contextmanager
+def etapa(nombre: str):
+    histograma = metricas.histograma(f"etapa_{nombre}_segundos", f"Duración de la etapa '{nombre}'")
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        histograma.observar(duracion)
+        tramos = getattr(_traza, "tramos", None)
+        if tramos is not None:
+            tramos.append((nombre, duracion))
+
+
+@contextmanager
+def traza_turno(session_id: str):
+    """Junta las etapas del turno (en este hilo) y al terminar muestra el desglose."""
+    anteriores = getattr(_traza, "tramos", None)
+    tramos = _traza.tramos = []
+    inicio = time.perf_counter()
+    try:
+        yield tramos
+    finally:
+        _traza.tramos = anteriores
+        total = time.perf_counter() - inicio
+        desglose = ", ".join(f"{nombre}={duracion * 1000:.0f}ms" for nombre, duracion in tramos)
+        debug(f"⏱️  Turno {session_id}: {total * 1000:.0f}ms ({desglose or 'sin etapas medidas'})")
@@ -0,0 +1,93 @@
+# =============================================================================
+# Micro-benchmark del extractor de cantidades
+# Corre app.cantidades.extraer_cantidad sobre todos los mensajes del cliente
+# de conversaciones/*.txt y, si text2num y word2number siguen instalados,
+# la versión anterior de convertir_a_numero_es para comparar.
+#
+# Uso:
+#   python -m bench.bench_cantidades --repeticiones 200
+# =============================================================================
+
+import argparse
+import glob
+import os
+import re
+import time
+
+from app.cantidades import extraer_cantidad
+from app.conversaciones import leer_txt
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_CONVERSACIONES = os.path.join(RAIZ, "conversaciones")
+
+
+def convertir_anterior(user_input: str) -> int:
+    """convertir_a_numero_es tal como estaba antes (búsqueda por substring + text2num + word2number)."""
+    from text_to_num import text2num
+    from word2number import w2n
+
+    texto = user_input.lower().strip()
+    mapa_numeros = {
+        "uno": 1, "una": 1, "un": 1,
+        "dos": 2, "par": 2, "un par": 2,
+        "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6,
+        "siete": 7, "ocho": 8, "nueve": 9, "diez": 10,
+        "media docena": 6, "una docena": 12, "docena": 12
+    }
+    for palabra, numero in mapa_numeros.items():
+        if palabra in texto:
+            return numero
+    match = re.search(r"\b\d+\b", texto)
+    if match:
+        return int(match.group())
+    try:
+        return text2num(texto, "es")
+    except Exception:
+        pass
+    try:
+        return w2n.word_to_num(texto)
+    except Exception:
+        return 1
+
+
+def cargar_mensajes(carpeta: str = CARPETA_CONVERSACIONES) -> list:
+    mensajes = []
+    for ruta in sorted(glob.glob(os.path.join(carpeta, "*.txt"))):
+        mensajes.extend(m["content"] for m in leer_txt(ruta) if m["role"] == "user")
+    return mensajes
+
+
+def medir(funcion, mensajes: list, repeticiones: int) -> float:
+    """Microsegundos por mensaje."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for mensaje in mensajes:
+            funcion(mensaje)
+    return (time.perf_counter() - inicio) / (repeticiones * len(mensajes)) * 1e6
+
+
+def correr(repeticiones: int = 200) -> dict:
+    mensajes = cargar_mensajes()
+    resultados = {"mensajes": len(mensajes), "nuevo_us": medir(extraer_cantidad, mensajes, repeticiones)}
+    try:
+        import text_to_num, word2number  # noqa: F401
+    except ImportError:
+        return resultados
+    resultados["anterior_us"] = medir(convertir_anterior, mensajes, max(1, repeticiones // 10))
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark del extractor de cantidades")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    r = correr(args.repeticiones)
+    print(f"📊 {r['mensajes']} mensajes del cliente")
+    print(f"   extraer_cantidad: {r['nuevo_us']:.1f}µs por mensaje")
+    if "anterior_us" in r:
+        print(f"   versión anterior: {r['anterior_us']:.1f}µs por mensaje")
+
+
+if __name__ == "__main__":
+    main()
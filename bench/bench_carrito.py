@@ -0,0 +1,106 @@
+# =============================================================================
+# Micro-benchmark del carrito
+# Agrega productos a un carrito hasta llegar a --lineas líneas distintas
+# (y vuelve a sumar unidades a las que ya están) comparando la lista de dicts
+# anterior (búsqueda lineal + total recalculado con Decimal) con
+# app.carrito.Carrito, y cuánto suma anotar cada agregado en el diario de
+# carritos (app/diario_carritos.py, con fsync en tandas).
+#
+# Uso:
+#   python -m bench.bench_carrito --lineas 300 --repeticiones 20
+# =============================================================================
+
+import argparse
+import os
+import tempfile
+import time
+from decimal import Decimal
+
+from app.carrito import Carrito, formatear_centavos
+from app.diario_carritos import DiarioCarritos
+from app.sesiones import tamanio_profundo
+
+
+def agregar_anterior(pedido: list, producto: str, cantidad: int, precio_unitario) -> str:
+    """agregar_a_pedido tal como estaba antes (lista de dicts)."""
+    existente = next((p for p in pedido if p["producto"].lower() == producto.lower()), None)
+    if existente:
+        existente["cantidad"] += cantidad
+        existente["subtotal"] = float(Decimal(existente["precio_unitario"]) * existente["cantidad"])
+    else:
+        pedido.append({
+            "producto": producto,
+            "cantidad": cantidad,
+            "precio_unitario": float(precio_unitario),
+            "subtotal": float(Decimal(precio_unitario) * cantidad),
+        })
+    total = sum(p["subtotal"] for p in pedido)
+    return f"{total:.2f}"
+
+
+def agregar_nuevo(carrito: Carrito, producto: str, cantidad: int, precio_unitario, producto_id) -> str:
+    carrito.agregar(producto, cantidad, precio_unitario, producto_id)
+    return formatear_centavos(carrito.total_centavos)
+
+
+def operaciones(lineas: int) -> list:
+    """Cada producto se agrega dos veces: una línea nueva y una actualización."""
+    productos = [(i, f"Producto {i} x 500g", Decimal(f"{1000 + i * 7}.50")) for i in range(lineas)]
+    return productos + productos
+
+
+def medir(lineas: int, repeticiones: int) -> dict:
+    ops = operaciones(lineas)
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        pedido = []
+        for _, nombre, precio in ops:
+            total_anterior = agregar_anterior(pedido, nombre, 1, precio)
+    anterior = (time.perf_counter() - inicio) / (repeticiones * len(ops)) * 1e6
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        carrito = Carrito()
+        for i, nombre, precio in ops:
+            total_nuevo = agregar_nuevo(carrito, nombre, 1, precio, i)
+    nuevo = (time.perf_counter() - inicio) / (repeticiones * len(ops)) * 1e6
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        diario = DiarioCarritos(os.path.join(carpeta, "carritos.diario"), espacio="bench_carrito")
+        diario.abrir()
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            carrito = Carrito()
+            for i, nombre, precio in ops:
+                diario.agregar("bench", carrito, nombre, 1, precio, i)
+        con_diario = (time.perf_counter() - inicio) / (repeticiones * len(ops)) * 1e6
+        diario.cerrar()
+
+    assert total_anterior == total_nuevo, (total_anterior, total_nuevo)
+    return {
+        "lineas": lineas,
+        "anterior_us": anterior,
+        "nuevo_us": nuevo,
+        "diario_us": con_diario,
+        "anterior_bytes": tamanio_profundo(pedido),
+        "nuevo_bytes": tamanio_profundo(carrito),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark del carrito")
+    parser.add_argument("--lineas", type=int, nargs="+", default=[10, 100, 300, 1000])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    for lineas in args.lineas:
+        r = medir(lineas, args.repeticiones)
+        print(f"📊 {r['lineas']} líneas")
+        print(f"   lista de dicts: {r['anterior_us']:.1f}µs por agregado, {r['anterior_bytes'] / 1024:.1f} KiB")
+        print(f"   Carrito:        {r['nuevo_us']:.1f}µs por agregado, {r['nuevo_bytes'] / 1024:.1f} KiB")
+        print(f"   con diario:     {r['diario_us']:.1f}µs por agregado")
+
+
+if __name__ == "__main__":
+    main()
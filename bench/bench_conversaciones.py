@@ -0,0 +1,75 @@
+# =============================================================================
+# Benchmark del almacenamiento de conversaciones
+# Arma una conversación larga repitiendo las de conversaciones/*.txt y compara
+# el formato de texto anterior (parseo completo del .txt) con el formato
+# indexado (.conv + .idx): bytes en disco y tiempo para leer la cola.
+#
+# Uso:
+#   python -m bench.bench_conversaciones --mensajes 20000 --cola 12
+# =============================================================================
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from app.conversaciones import Conversacion, leer_txt, migrar_txt
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_CONVERSACIONES = os.path.join(RAIZ, "conversaciones")
+
+
+def armar_txt(ruta: str, mensajes: int, carpeta: str = CARPETA_CONVERSACIONES):
+    """Escribe un .txt del formato anterior con 'mensajes' mensajes tomados de las conversaciones grabadas."""
+    modelo = []
+    for archivo in sorted(glob.glob(os.path.join(carpeta, "*.txt"))):
+        modelo.extend(leer_txt(archivo))
+    with open(ruta, "w", encoding="utf-8") as f:
+        for i in range(mensajes):
+            m = modelo[i % len(modelo)]
+            quien = "De whatsapp:+5491100000000" if m["role"] == "user" else "Bot"
+            f.write(f"{m['timestamp']} - {quien}: {m['content']}\n")
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def correr(mensajes: int = 20000, cola: int = 12, repeticiones: int = 20) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-conversaciones-") as carpeta:
+        base = os.path.join(carpeta, "sesion")
+        armar_txt(base + ".txt", mensajes)
+        migrar_txt(base + ".txt", base)
+        conversacion = Conversacion(base)
+
+        assert conversacion.ultimos(cola) == leer_txt(base + ".txt")[-cola:]
+        return {
+            "mensajes": mensajes,
+            "bytes_txt": os.path.getsize(base + ".txt"),
+            "bytes_indexado": os.path.getsize(base + ".conv") + os.path.getsize(base + ".idx"),
+            "cola_txt_seg": medir(lambda: leer_txt(base + ".txt")[-cola:], repeticiones),
+            "cola_indexado_seg": medir(lambda: conversacion.ultimos(cola), repeticiones),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del formato de conversaciones")
+    parser.add_argument("--mensajes", type=int, default=20000)
+    parser.add_argument("--cola", type=int, default=12)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    r = correr(args.mensajes, args.cola, args.repeticiones)
+    print(f"📊 {r['mensajes']} mensajes")
+    print(f"   disco: .txt {r['bytes_txt']} bytes | .conv + .idx {r['bytes_indexado']} bytes "
+          f"({r['bytes_indexado'] / r['bytes_txt']:.0%})")
+    print(f"   últimos {args.cola}: .txt {r['cola_txt_seg'] * 1000:.2f}ms | "
+          f"indexado {r['cola_indexado_seg'] * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# =============================================================================
+# Benchmark del pipeline de respuesta (get_response y /process-message)
+# Reproduce las conversaciones grabadas en conversaciones/ con N sesiones en
+# paralelo, usando modelos de IA falsos con latencia configurable y el
+# catálogo de script/bd.sql cargado en SQLite. Informa percentiles por etapa
+# y throughput; con --comparar falla si hay una regresión contra una base.
+#
+# Uso:
+#   python -m bench.bench_pipeline --sesiones 8 --latencia-input 0.3 --latencia-output 1.5
+#   python -m bench.bench_pipeline --modo http --guardar base.json
+#   python -m bench.bench_pipeline --comparar base.json --tolerancia 0.2
+# =============================================================================
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_CONVERSACIONES = os.path.join(RAIZ, "conversaciones")
+
+# Percentiles que se informan por etapa
+PERCENTILES = (50, 95, 99)
+
+
+# =============================================================================
+# ENTORNO AISLADO (antes de importar app/)
+# =============================================================================
+
+def preparar_entorno(carpeta_trabajo: str = None) -> str:
+    """
+    Trabaja en una carpeta temporal (los logs de conversaciones del benchmark
+    no se mezclan con los reales) con una base SQLite propia, salvo que
+    DATABASE_URL ya esté definida.
+    """
+    carpeta_trabajo = carpeta_trabajo or tempfile.mkdtemp(prefix="bench-chatbot-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(carpeta_trabajo, 'catalogo.db')}")
+    os.environ.setdefault("SESIONES_BACKEND", "memoria")
+    os.environ.setdefault("LLM_CACHE_RUTA", "")
+    # Cada mensaje del guion espera su respuesta: no hay ráfagas que agrupar
+    os.environ.setdefault("AGRUPAR_VENTANA_SEG", "0")
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    os.chdir(carpeta_trabajo)
+    preparar_catalogo()
+    return carpeta_trabajo
+
+
+def preparar_catalogo():
+    """Carga script/bd.sql en la base configurada (si ya estaba cargado no cambia nada)."""
+    from app import database
+    database.crear_bd_sqlite(database.engine)
+
+
+# =============================================================================
+# MODELOS FALSOS (deterministas, con latencia configurable)
+# =============================================================================
+
+FRASE_CLIENTE = re.compile(r'(?:Frase del cliente: |nueva frase del cliente:\s*)"(.*?)"', re.DOTALL)
+PALABRAS_VACIAS = {"de", "la", "el", "los", "las", "un", "una", "me", "por", "favor", "que", "con", "y", "hay", "tenes", "tienen"}
+
+RESPUESTA_SALIDA = (
+    "¡Claro! Estas son las opciones que tenemos disponibles para vos hoy en el supermercado. "
+    "Cada una tiene su precio actualizado y hay stock suficiente para tu pedido.\n\n"
+    "• Opción uno a buen precio\n• Opción dos con descuento\n• Opción tres de primera marca\n\n"
+    "¿Cuál de estos productos querés que agregue a tu pedido? Si necesitás algo más, avisame."
+)
+
+
+def intencion_de(frase: str):
+    """Clasificación trivial y determinista para que el pipeline recorra todas las ramas."""
+    texto = frase.lower()
+    palabras = [p for p in re.findall(r"[a-záéíóúñ]+", texto) if p not in PALABRAS_VACIAS and len(p) > 2]
+    producto = [palabras[-1]] if palabras else []
+    if "vaci" in texto:
+        return "VACIAR_PEDIDO", []
+    if "pedido" in texto or "carrito" in texto:
+        return "MOSTRAR_PEDIDO", []
+    if re.search(r"\b(listo|finaliz|termin)", texto):
+        return "FINALIZAR_PEDIDO", []
+    if re.search(r"\b(agreg|sum|quiero|dame|poneme|anota)", texto):
+        return "AGREGAR_PRODUCTO", producto
+    if re.search(r"\b(tenes|tenés|tienen|hay|precio|venden|cuanto)", texto):
+        return "CONSULTAR_INFO", producto
+    return "CHARLAR", []
+
+
+def responder_input(prompt: str, en_json: bool) -> str:
+    if "ingredientes principales" in prompt:
+        return "harina, queso, salsa de tomate, aceite, sal"
+    coincidencia = FRASE_CLIENTE.search(prompt)
+    intencion, productos = intencion_de(coincidencia.group(1) if coincidencia else "")
+    if en_json:
+        return json.dumps({"intencion": intencion, "confianza": 92, "productos": productos, "cantidad": None})
+    return (
+        f"Intención detectada: {intencion}\n"
+        f"Confianza: 92\n"
+        f"Productos mencionados: {', '.join(productos) or 'ninguno'}"
+    )
+
+
+def crear_modelos_falsos(latencia_input: float, latencia_output: float, llamadas: dict):
+    """Devuelve (modelo_input, modelo_input_json, modelo_output) con la interfaz de langchain."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.language_models.llms import LLM
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    class LLMFalso(LLM):
+        model: str = "bench_input"
+        format: str = None
+        latencia: float = 0.0
+
+        @property
+        def _llm_type(self) -> str:
+            return "bench"
+
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            llamadas[self.model] = llamadas.get(self.model, 0) + 1
+            time.sleep(self.latencia)
+            return responder_input(prompt, en_json=self.format == "json")
+
+    class ChatFalso(BaseChatModel):
+        model: str = "bench_output"
+        latencia: float = 0.0
+
+        @property
+        def _llm_type(self) -> str:
+            return "bench"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            llamadas[self.model] = llamadas.get(self.model, 0) + 1
+            time.sleep(self.latencia)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=RESPUESTA_SALIDA))])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            # La latencia total se reparte entre las palabras, como la generación token a token
+            llamadas[self.model] = llamadas.get(self.model, 0) + 1
+            palabras = RESPUESTA_SALIDA.split(" ")
+            for i, palabra in enumerate(palabras):
+                time.sleep(self.latencia / len(palabras))
+                yield ChatGenerationChunk(message=AIMessageChunk(content=palabra if i == 0 else " " + palabra))
+
+    return (
+        LLMFalso(latencia=latencia_input),
+        LLMFalso(model="bench_input_json", format="json", latencia=latencia_input),
+        ChatFalso(latencia=latencia_output),
+    )
+
+
+def instalar_modelos_falsos(latencia_input: float, latencia_output: float) -> dict:
+    """Reemplaza los modelos de crud.py (y la cadena con historial) por los falsos."""
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+    from app import crud
+
+    llamadas = {}
+    crud.modelo_input, crud.modelo_input_json, crud.modelo_output = crear_modelos_falsos(latencia_input, latencia_output, llamadas)
+    crud.chain = crud.prompt | crud.modelo_output
+    crud.with_message_history = RunnableWithMessageHistory(
+        crud.chain,
+        crud.get_session_history,
+        input_messages_key="input",
+        history_messages_key="history",
+    )
+    return llamadas
+
+
+# =============================================================================
+# CONVERSACIONES GRABADAS
+# =============================================================================
+
+def cargar_conversaciones(carpeta: str = CARPETA_CONVERSACIONES) -> list:
+    """Mensajes del cliente de cada conversación grabada (.conv o .txt del formato anterior)."""
+    from app.conversaciones import EXT_DATOS, EXT_TEXTO, Conversacion, leer_txt
+
+    conversaciones = []
+    for nombre in sorted(os.listdir(carpeta)):
+        ruta = os.path.join(carpeta, nombre)
+        if nombre.endswith(EXT_DATOS):
+            mensajes = Conversacion(ruta[:-len(EXT_DATOS)]).todos()
+        elif nombre.endswith(EXT_TEXTO) and not os.path.exists(ruta[:-len(EXT_TEXTO)] + EXT_DATOS):
+            # Se lee sin migrar: la carpeta del repo no se toca
+            mensajes = leer_txt(ruta)
+        else:
+            continue
+        del_cliente = [m["content"] for m in mensajes if m["role"] == "user" and m["content"]]
+        if del_cliente:
+            conversaciones.append(del_cliente)
+    return conversaciones
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def _guion(conversaciones: list, sesion: int, max_mensajes: int) -> list:
+    mensajes = conversaciones[sesion % len(conversaciones)]
+    return mensajes[:max_mensajes] if max_mensajes else mensajes
+
+
+def correr_directo(conversaciones: list, sesiones: int, max_mensajes: int) -> list:
+    """Cada sesión en su hilo llamando al mismo turno que usa el endpoint (sin HTTP ni despachador)."""
+    from app.endpoints.endpoints import responder_turno
+
+    def correr_sesion(i):
+        tiempos = []
+        for mensaje in _guion(conversaciones, i, max_mensajes):
+            inicio = time.perf_counter()
+            responder_turno(mensaje, f"bench{i}")
+            tiempos.append(time.perf_counter() - inicio)
+        return tiempos
+
+    with ThreadPoolExecutor(max_workers=sesiones) as executor:
+        return [t for tiempos in executor.map(correr_sesion, range(sesiones)) for t in tiempos]
+
+
+async def _correr_http(conversaciones: list, sesiones: int, max_mensajes: int) -> list:
+    import httpx
+    from app.catalogo import catalogo
+    from app.main import app
+
+    catalogo.refrescar(forzar=True)
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+        async def correr_sesion(i):
+            tiempos = []
+            for mensaje in _guion(conversaciones, i, max_mensajes):
+                inicio = time.perf_counter()
+                respuesta = await cliente.post("/process-message", json={"from": f"+bench{i}", "body": mensaje})
+                tiempos.append(time.perf_counter() - inicio)
+                if respuesta.json().get("status") != "ok":
+                    raise RuntimeError(f"Respuesta inválida: {respuesta.text}")
+            return tiempos
+
+        resultados = await asyncio.gather(*(correr_sesion(i) for i in range(sesiones)))
+    return [t for tiempos in resultados for t in tiempos]
+
+
+def correr_http(conversaciones: list, sesiones: int, max_mensajes: int) -> list:
+    """Pasa por /process-message (FastAPI + despachador) sin abrir un puerto."""
+    return asyncio.run(_correr_http(conversaciones, sesiones, max_mensajes))
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados) + 0.5) - 1))]
+
+
+def correr(modo: str = "directo", sesiones: int = 4, latencia_input: float = 0.0, latencia_output: float = 0.0,
+           max_mensajes: int = 0, carpeta_conversaciones: str = CARPETA_CONVERSACIONES, silencioso: bool = True) -> dict:
+    """Corre el benchmark y devuelve los resultados (ver imprimir_resultados)."""
+    from app import metricas
+    from app.crud import cola_resumenes
+
+    conversaciones = cargar_conversaciones(carpeta_conversaciones)
+    if not conversaciones:
+        raise RuntimeError(f"No hay conversaciones en {carpeta_conversaciones}")
+    llamadas = instalar_modelos_falsos(latencia_input, latencia_output)
+    metricas.reiniciar()
+
+    ejecutar = correr_http if modo == "http" else correr_directo
+    salida = io.StringIO() if silencioso else sys.stdout
+    with contextlib.redirect_stdout(salida):
+        inicio = time.perf_counter()
+        tiempos = ejecutar(conversaciones, sesiones, max_mensajes)
+        duracion = time.perf_counter() - inicio
+        # Los resúmenes pendientes también son parte del costo del turno
+        for i in range(sesiones):
+            cola_resumenes.esperar(f"bench{i}")
+
+    etapas = {
+        nombre: {f"p{p}": valor[f"p{p}"] for p in PERCENTILES} | {"count": valor["count"]}
+        for nombre, valor in metricas.snapshot().items()
+        if isinstance(valor, dict) and valor["count"]
+    }
+    return {
+        "modo": modo,
+        "sesiones": sesiones,
+        "turnos": len(tiempos),
+        "duracion_seg": round(duracion, 3),
+        "throughput_turnos_seg": round(len(tiempos) / duracion, 2) if duracion else 0.0,
+        "turno": {f"p{p}": round(percentil(tiempos, p), 4) for p in PERCENTILES},
+        "llamadas_por_turno": {m: round(n / len(tiempos), 2) for m, n in sorted(llamadas.items())},
+        "etapas": etapas,
+    }
+
+
+# =============================================================================
+# REPORTE Y COMPARACIÓN
+# =============================================================================
+
+def imprimir_resultados(resultados: dict):
+    print(f"\n📊 Benchmark ({resultados['modo']}): {resultados['turnos']} turnos, {resultados['sesiones']} sesiones, "
+          f"{resultados['duracion_seg']} s → {resultados['throughput_turnos_seg']} turnos/s")
+    turno = resultados["turno"]
+    print(f"⏱️  Turno completo: p50={turno['p50']:.4f}s  p95={turno['p95']:.4f}s  p99={turno['p99']:.4f}s")
+    print(f"🤖 Llamadas a modelos por turno: {resultados['llamadas_por_turno']}")
+    print("\nEtapa                                        count        p50        p95        p99")
+    for nombre, valores in sorted(resultados["etapas"].items()):
+        print(f"{nombre:<44} {valores['count']:>6} {valores['p50']:>10} {valores['p95']:>10} {valores['p99']:>10}")
+
+
+def comparar(resultados: dict, base: dict, tolerancia: float) -> list:
+    """Regresiones respecto de la base: p95 del turno más lento o throughput más bajo que la tolerancia."""
+    regresiones = []
+    if resultados["turno"]["p95"] > base["turno"]["p95"] * (1 + tolerancia):
+        regresiones.append(f"p95 del turno: {base['turno']['p95']}s → {resultados['turno']['p95']}s")
+    if resultados["throughput_turnos_seg"] < base["throughput_turnos_seg"] * (1 - tolerancia):
+        regresiones.append(f"throughput: {base['throughput_turnos_seg']} → {resultados['throughput_turnos_seg']} turnos/s")
+    for modelo, por_turno in resultados["llamadas_por_turno"].items():
+        if por_turno > base["llamadas_por_turno"].get(modelo, 0) * (1 + tolerancia):
+            regresiones.append(f"llamadas a {modelo} por turno: {base['llamadas_por_turno'].get(modelo, 0)} → {por_turno}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de get_response con modelos falsos")
+    parser.add_argument("--modo", choices=("directo", "http"), default="directo")
+    parser.add_argument("--sesiones", type=int, default=4, help="sesiones concurrentes")
+    parser.add_argument("--latencia-input", type=float, default=0.2, help="segundos por llamada al modelo input")
+    parser.add_argument("--latencia-output", type=float, default=1.0, help="segundos por respuesta del modelo output")
+    parser.add_argument("--max-mensajes", type=int, default=0, help="mensajes por sesión (0 = toda la conversación)")
+    parser.add_argument("--conversaciones", default=CARPETA_CONVERSACIONES)
+    parser.add_argument("--guardar", help="guardar los resultados en JSON (para usar como base)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="mostrar los print del bot")
+    args = parser.parse_args(argv)
+
+    carpeta_conversaciones = os.path.abspath(args.conversaciones)
+    guardar = os.path.abspath(args.guardar) if args.guardar else None
+    comparar_con = os.path.abspath(args.comparar) if args.comparar else None
+    preparar_entorno()
+
+    resultados = correr(args.modo, args.sesiones, args.latencia_input, args.latencia_output,
+                        args.max_mensajes, carpeta_conversaciones, silencioso=not args.verbose)
+    imprimir_resultados(resultados)
+
+    if guardar:
+        with open(guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    if comparar_con:
+        with open(comparar_con, "r", encoding="utf-8") as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        for regresion in regresiones:
+            print(f"❌ Regresión: {regresion}")
+        if regresiones:
+            return 1
+        print("✅ Sin regresiones respecto de la base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
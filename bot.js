@@ -73,6 +73,98 @@ client.on("ready", async () => {
   }
 });
 
+// --- respuestas por partes (streaming) ---
+// BOT_STREAMING=0 vuelve al envío de la respuesta completa
+const STREAMING = process.env.BOT_STREAMING !== "0";
+const MIN_BLOQUE = 120; // no mandar mensajes demasiado cortos
+const MAX_BLOQUE = 700; // si no aparece un párrafo, cortar en la última oración
+
+// Devuelve hasta dónde conviene enviar el texto acumulado (0 = seguir esperando)
+function puntoDeCorte(texto) {
+  let corte = texto.lastIndexOf("\n\n");
+  if (corte < MIN_BLOQUE && texto.length >= MAX_BLOQUE) {
+    const oraciones = [...texto.matchAll(/[.!?…](\s)|\n/g)];
+    corte = oraciones.length ? oraciones[oraciones.length - 1].index + 1 : -1;
+  }
+  return corte >= MIN_BLOQUE ? corte : 0;
+}
+
+// Para comparar lo enviado con la respuesta final: el servidor la devuelve con strip()
+// y el stream llega crudo, así que se ignoran los espacios del principio y se colapsan los demás
+function normalizar(texto) {
+  return texto.trimStart().replace(/\s+/g, " ");
+}
+
+// Índice de "texto" donde terminan los primeros n caracteres de normalizar(texto)
+function indiceNormalizado(texto, n) {
+  let i = texto.length - texto.trimStart().length;
+  for (let cuenta = 0; cuenta < n && i < texto.length; cuenta++) {
+    if (/\s/.test(texto[i])) {
+      while (i < texto.length && /\s/.test(texto[i])) i++;
+    } else {
+      i++;
+    }
+  }
+  return i;
+}
+
+async function procesarConStreaming(msg, payload) {
+  const response = await axios.post("http://localhost:8000/process-message/stream", payload, {
+    headers: { Authorization: `Bearer ${ACCESS_TOKEN}` },
+    responseType: "stream",
+  });
+  response.data.setEncoding("utf8");
+
+  let pendiente = ""; // eventos SSE sin terminar de llegar
+  let recibido = ""; // todo el texto generado hasta ahora
+  let enviado = 0; // cuánto de "recibido" ya se mandó por WhatsApp
+  let final = null;
+
+  for await (const trozo of response.data) {
+    pendiente += trozo;
+    let fin;
+    while ((fin = pendiente.indexOf("\n\n")) !== -1) {
+      const bloque = pendiente.slice(0, fin);
+      pendiente = pendiente.slice(fin + 2);
+      const evento = (bloque.match(/^event: (.*)$/m) || [])[1];
+      const datos = JSON.parse((bloque.match(/^data: (.*)$/m) || [])[1] || "{}");
+
+      if (evento === "parcial") {
+        recibido += datos.texto;
+        const corte = puntoDeCorte(recibido.slice(enviado));
+        if (corte) {
+          const parte = recibido.slice(enviado, enviado + corte).trim();
+          enviado += corte;
+          if (parte) await client.sendMessage(msg.from, parte);
+        }
+      } else if (evento === "reinicio") {
+        // El modelo falló a mitad: lo que ya se mandó queda, lo que sigue es otro texto
+        recibido = "";
+        enviado = 0;
+      } else if (evento === "fin") {
+        final = datos;
+      }
+    }
+  }
+
+  // El mensaje se respondió junto con uno posterior del mismo cliente
+  if (final?.status === "agrupado") return;
+
+  if (final?.status !== "ok") {
+    console.log("⚠️ Respuesta inválida del endpoint:", final);
+    return;
+  }
+
+  // Si la respuesta final continúa lo ya enviado se manda el resto; si no (por ejemplo,
+  // un texto alternativo que no pasó por el stream), se manda completa
+  const yaEnviado = normalizar(recibido.slice(0, enviado)).trimEnd();
+  const resto = normalizar(final.response).startsWith(yaEnviado)
+    ? final.response.slice(indiceNormalizado(final.response, yaEnviado.length)).trim()
+    : final.response;
+  if (resto) await client.sendMessage(msg.from, resto);
+  console.log(`✅ Respuesta enviada: ${final.response}`);
+}
+
 // --- enviar mensajes reales a FastAPI ---
 client.on("message", async (msg) => {
   try {
@@ -84,13 +176,26 @@ client.on("message", async (msg) => {
 
     console.log(`📩 Mensaje de ${nombreCliente} (${fromNumber}): ${body}`);
 
+    const payload = { from: fromNumber, body, nombre: nombreCliente };
+
+    // Con streaming, la primera parte de la respuesta llega mientras se genera el resto
+    if (STREAMING) {
+      await procesarConStreaming(msg, payload);
+      return;
+    }
+
     // Enviar al backend con nombre incluido
     const response = await axios.post(
       "http://localhost:8000/process-message",
-      { from: fromNumber, body, nombre: nombreCliente },
+      payload,
       { headers: { Authorization: `Bearer ${ACCESS_TOKEN}` } }
     );
 
+    if (response.data?.status === "agrupado") {
+      // Lo responde el último mensaje de la ráfaga
+      return;
+    }
+
     if (response.data?.status === "ok") {
       const reply = response.data.response;
       await client.sendMessage(msg.from, reply);
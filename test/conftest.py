@@ -0,0 +1,12 @@
+# conftest.py
+
+import os
+import sys
+import tempfile
+
+# Permite importar el paquete app/ corriendo pytest desde cualquier carpeta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Los tests no necesitan un servidor MySQL: usan un archivo SQLite temporal
+_carpeta_bd = tempfile.mkdtemp(prefix="chatbot-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_carpeta_bd, 'catalogo.db')}")
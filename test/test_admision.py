@@ -0,0 +1,125 @@
+# test_admision.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import crud
+from app.admision import ControlAdmision, PlazoVencido, TurnoRechazado, RESPUESTA_SATURADO, con_plazo, tiempo_restante
+from app.agrupador import AgrupadorMensajes
+from app.despacho import Despachador
+from app.endpoints import endpoints
+from bench import bench_pipeline
+
+
+def test_limita_las_llamadas_concurrentes_al_modelo():
+    control = ControlAdmision(max_concurrentes=2, min_restante=0)
+    en_curso, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def llamada():
+        with control.llamada_modelo():
+            with lock:
+                en_curso[0] += 1
+                maximo[0] = max(maximo[0], en_curso[0])
+            time.sleep(0.03)
+            with lock:
+                en_curso[0] -= 1
+
+    hilos = [threading.Thread(target=llamada) for _ in range(6)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert maximo[0] == 2
+
+
+def test_sin_lugar_dentro_del_plazo_corta_rapido():
+    control = ControlAdmision(max_concurrentes=1, min_restante=0.05)
+    with control.llamada_modelo():
+        inicio = time.perf_counter()
+        with con_plazo(0.1), pytest.raises(PlazoVencido):
+            with control.llamada_modelo():
+                pass
+        assert time.perf_counter() - inicio < 0.5
+
+    # Con menos tiempo que el mínimo ni se intenta
+    with con_plazo(0.01), pytest.raises(PlazoVencido):
+        with control.llamada_modelo():
+            pass
+    assert tiempo_restante() is None
+
+
+def test_topes_de_cola_por_sesion_y_global():
+    despachador = Despachador(max_workers=2, max_por_sesion=2, max_pendientes=3)
+
+    async def correr():
+        tareas = [asyncio.ensure_future(despachador.ejecutar("a", time.sleep, 0.05)) for _ in range(3)]
+        tareas.append(asyncio.ensure_future(despachador.ejecutar("b", time.sleep, 0.05)))
+        tareas.append(asyncio.ensure_future(despachador.ejecutar("c", time.sleep, 0.05)))
+        return await asyncio.gather(*tareas, return_exceptions=True)
+
+    resultados = asyncio.run(correr())
+    despachador.cerrar()
+    motivos = [r.motivo if isinstance(r, TurnoRechazado) else None for r in resultados]
+    assert motivos == [None, None, "cola_sesion", None, "cola_global"]
+
+
+def test_el_plazo_viaja_hasta_el_worker_y_vence_en_la_cola():
+    despachador = Despachador(max_workers=2)
+    ejecutados = []
+
+    def turno(n, demora):
+        ejecutados.append((n, tiempo_restante() is not None))
+        time.sleep(demora)
+
+    async def correr():
+        primero = asyncio.ensure_future(despachador.ejecutar("a", turno, 1, 0.15))
+        with con_plazo(0.05):
+            segundo = asyncio.ensure_future(despachador.ejecutar("a", turno, 2, 0))
+        return await asyncio.gather(primero, segundo, return_exceptions=True)
+
+    resultados = asyncio.run(correr())
+    despachador.cerrar()
+    assert ejecutados == [(1, False)]
+    assert isinstance(resultados[1], PlazoVencido)
+
+
+def test_endpoint_responde_sin_modelo_cuando_se_rechaza(monkeypatch, tmp_path):
+    monkeypatch.setattr(endpoints, "CARPETA_CONVERSACIONES", str(tmp_path))
+    monkeypatch.setattr(endpoints, "agrupador", AgrupadorMensajes(ventana_seg=0))
+    monkeypatch.setattr(endpoints, "despachador", Despachador(max_workers=1, max_pendientes=0))
+    monkeypatch.setattr(endpoints, "get_response", lambda body, session_id: pytest.fail("no debería llamar al modelo"))
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    respuesta = TestClient(app).post("/process-message", json={"from": "+5491100", "body": "hola"})
+    assert respuesta.json() == {"status": "ok", "response": RESPUESTA_SATURADO}
+
+
+def test_plazo_vencido_en_una_rama_con_respaldo_responde_saturado(monkeypatch, tmp_path):
+    # buscar_ingredientes_para_comida atrapa los errores y respondería "no tenemos pizza"
+    for nombre in ("modelo_input", "modelo_input_json", "modelo_output", "chain", "with_message_history"):
+        monkeypatch.setattr(crud, nombre, getattr(crud, nombre))
+    bench_pipeline.preparar_catalogo()
+    bench_pipeline.instalar_modelos_falsos(0, 0)
+    monkeypatch.setattr(crud, "expansiones_platos", type(crud.expansiones_platos)())
+    invocar = crud.invocar
+
+    def invocar_con_plazo_vencido(modelo, prompt, sitio=None, **kwargs):
+        if sitio == "ingredientes":
+            raise PlazoVencido("quedan 0.0s del plazo del turno")
+        return invocar(modelo, prompt, sitio=sitio, **kwargs)
+
+    monkeypatch.setattr(crud, "invocar", invocar_con_plazo_vencido)
+    monkeypatch.setattr(endpoints, "CARPETA_CONVERSACIONES", str(tmp_path))
+    monkeypatch.setattr(endpoints, "agrupador", AgrupadorMensajes(ventana_seg=0))
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    respuesta = TestClient(app).post("/process-message", json={"from": "+5491199", "body": "¿tienen pizza?"})
+    assert respuesta.json() == {"status": "ok", "response": RESPUESTA_SATURADO}
@@ -0,0 +1,69 @@
+# test_agrupador.py
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.agrupador import AgrupadorMensajes
+from app.endpoints import endpoints
+
+
+async def rafaga(agrupador, session_id, textos, pausa=0.01):
+    tareas = []
+    for texto in textos:
+        tareas.append(asyncio.ensure_future(agrupador.agrupar(session_id, texto)))
+        await asyncio.sleep(pausa)
+    return await asyncio.gather(*tareas)
+
+
+def test_el_ultimo_mensaje_responde_por_la_rafaga():
+    agrupador = AgrupadorMensajes(ventana_seg=0.1, max_espera_seg=5)
+
+    async def correr():
+        return await asyncio.gather(
+            rafaga(agrupador, "a", ["hola", "quiero", "2 leches"]),
+            rafaga(agrupador, "b", ["tenés yerba?"]),
+        )
+
+    a, b = asyncio.run(correr())
+    assert a == [None, None, "hola\nquiero\n2 leches"]
+    assert b == ["tenés yerba?"]
+    assert agrupador.pendientes("a") == 0
+
+
+def test_mensajes_separados_por_mas_que_la_ventana_no_se_juntan():
+    agrupador = AgrupadorMensajes(ventana_seg=0.05)
+    resultado = asyncio.run(rafaga(agrupador, "a", ["hola", "quiero pan"], pausa=0.1))
+    assert resultado == ["hola", "quiero pan"]
+
+
+def test_tope_de_mensajes_y_de_espera():
+    agrupador = AgrupadorMensajes(ventana_seg=10, max_espera_seg=10, max_mensajes=3)
+    resultado = asyncio.run(asyncio.wait_for(rafaga(agrupador, "a", ["1", "2", "3"]), timeout=1))
+    assert resultado == [None, None, "1\n2\n3"]
+
+    agrupador = AgrupadorMensajes(ventana_seg=10, max_espera_seg=0.1)
+    resultado = asyncio.run(asyncio.wait_for(rafaga(agrupador, "a", ["1", "2"]), timeout=1))
+    assert resultado == [None, "1\n2"]
+
+
+def test_endpoint_responde_una_sola_vez(monkeypatch, tmp_path):
+    turnos = []
+    monkeypatch.setattr(endpoints, "CARPETA_CONVERSACIONES", str(tmp_path))
+    monkeypatch.setattr(endpoints, "agrupador", AgrupadorMensajes(ventana_seg=0.1))
+    monkeypatch.setattr(endpoints, "get_response", lambda body, session_id: turnos.append(body) or "¡Listo!")
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+
+    async def correr():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as cliente:
+            async def enviar(texto, demora):
+                await asyncio.sleep(demora)
+                return (await cliente.post("/process-message", json={"from": "+5491100", "body": texto})).json()
+            return await asyncio.gather(enviar("hola", 0), enviar("quiero", 0.02), enviar("2 leches", 0.04))
+
+    respuestas = asyncio.run(correr())
+    assert [r["status"] for r in respuestas] == ["agrupado", "agrupado", "ok"]
+    assert turnos == ["hola\nquiero\n2 leches"]
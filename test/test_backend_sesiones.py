@@ -0,0 +1,86 @@
+# test_backend_sesiones.py
+
+import json
+import threading
+import time
+import zlib
+from decimal import Decimal
+
+from app import backend_sesiones
+from app.backend_sesiones import BackendSQLite, serializar_sesion, restaurar_sesion
+from app.carrito import Carrito
+from app.productos_mostrados import ProductosMostrados
+from app.sesiones import sesiones, HistorialChatAcotado
+
+
+def cargar_sesion_de_ejemplo(session_id):
+    historial = HistorialChatAcotado()
+    historial.add_user_message("tenés leche?")
+    historial.add_ai_message("Sí: • Leche Entera — $1200")
+    sesiones.espacio("historial_chat")[session_id] = historial
+    sesiones.espacio("datos_traidos_desde_bd")[session_id] = {
+        "productos_mostrados": ProductosMostrados.desde_consultas({
+            "leche": [{"id": 7, "producto": "Leche Entera", "precio_venta": Decimal("1200.00"),
+                       "descripcion": "Sachet 1L", "marca": "La Serenísima"}],
+        }),
+        "resumen_input": "leche",
+    }
+    carrito = Carrito()
+    carrito.agregar("Leche Entera", 2, Decimal("1200.00"), producto_id=7)
+    sesiones.espacio("pedidos_por_cliente")[session_id] = carrito
+
+
+def test_serializacion_ida_y_vuelta():
+    cargar_sesion_de_ejemplo("ida")
+    blob = serializar_sesion("ida")
+    sesiones.olvidar("ida")
+    restaurar_sesion("ida", blob)
+
+    datos = sesiones.espacio("datos_traidos_desde_bd")["ida"]
+    assert datos["productos_mostrados"].por_consulta()["leche"] == [{"id": 7, "producto": "Leche Entera", "precio_venta": 1200.0}]
+    assert datos["resumen_input"] == "leche"
+    assert sesiones.espacio("pedidos_por_cliente")["ida"].total_centavos == 240000
+    assert [m.content for m in sesiones.espacio("historial_chat")["ida"].messages][0] == "tenés leche?"
+
+
+def test_restaura_pedidos_guardados_en_formato_anterior():
+    estado = {"v": 1, "d": {}, "h": [],
+              "p": [["Leche Entera", 2, 1200.1, 2400.2], ["Yerba", 1, 3500.0, 3500.0]]}
+    restaurar_sesion("v1", zlib.compress(json.dumps(estado).encode("utf-8")))
+
+    carrito = sesiones.espacio("pedidos_por_cliente")["v1"]
+    assert [(l.producto, l.cantidad, l.precio_centavos) for l in carrito] == [("Leche Entera", 2, 120010), ("Yerba", 1, 350000)]
+    assert carrito.total_centavos == 590020
+
+
+def test_turno_con_backend_sqlite_comparte_el_estado(tmp_path, monkeypatch):
+    backend = BackendSQLite(str(tmp_path / "sesiones.db"))
+    monkeypatch.setattr(backend_sesiones, "backend", backend)
+
+    with backend_sesiones.turno_sesion("s1"):
+        cargar_sesion_de_ejemplo("s1")
+
+    # Otro worker no tiene nada en memoria: lo trae del backend
+    sesiones.olvidar("s1")
+    with backend_sesiones.turno_sesion("s1"):
+        assert sesiones.espacio("pedidos_por_cliente")["s1"].agregar("Leche", 1, 1200, producto_id=7)[0].cantidad == 3
+
+
+def test_bloqueo_sqlite_es_exclusivo(tmp_path):
+    backend = BackendSQLite(str(tmp_path / "sesiones.db"))
+    orden = []
+
+    def turno(nombre):
+        with backend.bloquear("s1"):
+            orden.append(f"{nombre}-entra")
+            time.sleep(0.1)
+            orden.append(f"{nombre}-sale")
+
+    hilos = [threading.Thread(target=turno, args=(n,)) for n in ("a", "b")]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert orden[0].split("-")[0] == orden[1].split("-")[0]
+    assert orden[2].split("-")[0] == orden[3].split("-")[0]
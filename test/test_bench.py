@@ -0,0 +1,26 @@
+# test_bench.py
+
+from app import crud
+from bench import bench_pipeline
+
+
+def test_benchmark_corre_con_modelos_falsos(monkeypatch):
+    # instalar_modelos_falsos reemplaza los modelos de crud: se restauran al terminar
+    for nombre in ("modelo_input", "modelo_input_json", "modelo_output", "chain", "with_message_history"):
+        monkeypatch.setattr(crud, nombre, getattr(crud, nombre))
+    bench_pipeline.preparar_catalogo()
+
+    resultados = bench_pipeline.correr(sesiones=2, max_mensajes=3)
+
+    assert resultados["turnos"] == 6
+    assert resultados["throughput_turnos_seg"] > 0
+    assert resultados["turno"]["p50"] <= resultados["turno"]["p99"]
+    assert resultados["llamadas_por_turno"]["bench_output"] > 0
+    assert bench_pipeline.comparar(resultados, resultados, tolerancia=0.2) == []
+
+
+def test_benchmark_conversaciones():
+    from bench import bench_conversaciones
+
+    resultados = bench_conversaciones.correr(mensajes=500, cola=12, repeticiones=1)
+    assert resultados["bytes_indexado"] < resultados["bytes_txt"]
@@ -0,0 +1,47 @@
+# test_cache_llm.py
+
+from app import cache_llm
+from app.cache_llm import CacheLLM, clave_cache
+
+
+class ModeloFalso:
+    model = "falso"
+    temperature = 0
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def invoke(self, prompt):
+        self.llamadas += 1
+        return f"respuesta {self.llamadas}"
+
+
+def test_mismo_prompt_normalizado_no_vuelve_al_modelo(monkeypatch):
+    monkeypatch.setattr(cache_llm, "cache", CacheLLM(max_entradas=10))
+    modelo = ModeloFalso()
+
+    assert cache_llm.invocar(modelo, "ingredientes de  pizza\n", sitio="ingredientes") == "respuesta 1"
+    assert cache_llm.invocar(modelo, "ingredientes de pizza", sitio="ingredientes") == "respuesta 1"
+    # Sin sitio habilitado siempre se llama al modelo
+    assert cache_llm.invocar(modelo, "ingredientes de pizza") == "respuesta 2"
+    assert modelo.llamadas == 2
+
+
+def test_las_opciones_del_modelo_forman_parte_de_la_clave():
+    assert clave_cache("m", "hola", {"format": "json"}) != clave_cache("m", "hola", {})
+    assert clave_cache("m", "hola", {}) != clave_cache("otro", "hola", {})
+
+
+def test_lru_y_persistencia_en_disco(tmp_path):
+    ruta = str(tmp_path / "cache.db")
+    cache = CacheLLM(max_entradas=2, ruta=ruta)
+    cache.guardar("a", "1")
+    cache.guardar("b", "2")
+    cache.obtener("a")           # "b" queda como la menos usada
+    cache.guardar("c", "3")
+    assert cache.obtener("b") is None
+
+    reiniciada = CacheLLM(max_entradas=2, ruta=ruta)
+    assert reiniciada.obtener("a") == "1"
+    assert reiniciada.obtener("c") == "3"
+    assert reiniciada.obtener("b") is None
@@ -0,0 +1,69 @@
+# test_calentamiento.py
+
+import json
+
+import httpx
+import pytest
+
+from app import metricas
+from app.calentamiento import Calentador, en_horario, url_ollama, valor_keep_alive
+
+
+def ollama_falso(pedidos, cargados):
+    def responder(request):
+        datos = json.loads(request.content)
+        pedidos.append(datos)
+        carga = 0 if datos["model"] in cargados else 2_000_000_000
+        cargados.add(datos["model"])
+        return httpx.Response(200, json={"response": "h" if "prompt" in datos else "", "load_duration": carga})
+    return httpx.MockTransport(responder)
+
+
+def test_calentar_carga_ceba_y_mide_frio_y_caliente():
+    pedidos = []
+    calentador = Calentador({"input": "gemma3_input:latest", "output": "gemma3_output:latest"},
+                            keep_alive="-1", transporte=ollama_falso(pedidos, set()))
+    resultados = calentador.calentar()
+    calentador.cerrar()
+
+    assert [p["model"] for p in pedidos] == ["gemma3_input:latest"] * 2 + ["gemma3_output:latest"] * 2
+    assert all(p["keep_alive"] == -1 and p["options"] == {"num_predict": 1} for p in pedidos)
+    assert resultados["input"]["carga"] == 2.0
+    assert metricas.medidor("modelo_output_carga_segundos").snapshot() == 2.0
+    assert "modelo_input_caliente_segundos" in metricas.snapshot()
+
+
+def test_ping_sin_generar_y_error_no_corta():
+    pedidos = []
+
+    def responder(request):
+        datos = json.loads(request.content)
+        pedidos.append(datos)
+        if datos["model"] == "caido":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"response": ""})
+
+    calentador = Calentador({"a": "caido", "b": "ok"}, transporte=httpx.MockTransport(responder))
+    calentador.ping()
+    calentador.cerrar()
+    assert [p["model"] for p in pedidos] == ["caido", "ok"]
+    assert all("prompt" not in p for p in pedidos)
+
+
+def test_politicas_de_keep_alive():
+    hora = [23]
+    calentador = Calentador({}, politica="horario", horario="8-22", hora_actual=lambda: hora[0])
+    assert not calentador.toca_ping()
+    hora[0] = 8
+    assert calentador.toca_ping()
+    assert not Calentador({}, politica="nunca").toca_ping()
+    assert en_horario(2, "22-6") and not en_horario(12, "22-6")
+    with pytest.raises(ValueError):
+        Calentador({}, politica="a veces")
+
+
+def test_formatos_de_configuracion():
+    assert valor_keep_alive("30m") == "30m"
+    assert valor_keep_alive("-1") == -1
+    assert url_ollama("localhost:11434") == "http://localhost:11434"
+    assert url_ollama("http://ollama:11434/") == "http://ollama:11434"
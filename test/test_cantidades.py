@@ -0,0 +1,63 @@
+# test_cantidades.py
+
+import glob
+import os
+
+import pytest
+
+from app.cantidades import extraer_cantidad
+from app.conversaciones import leer_txt
+from app.crud import convertir_a_numero_es
+
+CARPETA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conversaciones")
+
+# Pedidos reales de conversaciones/ con la cantidad que quiso el cliente
+CORPUS = {
+    "agregame 2 leches enteras al carrito": 2,
+    "agregame 2 leches entera de la serenisima y 4 leches de almendras fortificada con calcio": 2,
+    "agregame 4 leches de almendras fortificada con calcio": 4,
+    "agregame al carrito una unidad de las galletitas saladas de bagley": 1,
+    "agregame una leche": 1,
+    "agregar 3 helados de dulce de leche": 3,
+    "agregar al carrito 3 Leches Entera 1L (La Serenísima)": 3,
+    "agregar al carrito Leche Entera 1L (La Serenísima)": 1,
+    "agregar helado de dulce de leche de 1kg": 1,
+    "agregar las galletitas de agua al carrito": 1,
+    "Pásame 10": 10,
+    "Tráeme 3 marcas de fideos": 3,
+}
+
+
+def mensajes_del_cliente():
+    for ruta in sorted(glob.glob(os.path.join(CARPETA, "*.txt"))):
+        for mensaje in leer_txt(ruta):
+            if mensaje["role"] == "user":
+                yield mensaje["content"]
+
+
+def test_corpus_de_conversaciones():
+    mensajes = set(mensajes_del_cliente())
+    assert set(CORPUS) <= mensajes
+    assert {texto: convertir_a_numero_es(texto) for texto in CORPUS} == CORPUS
+    # Ningún mensaje grabado rompe el extractor ni da cantidades sin sentido
+    assert all(convertir_a_numero_es(texto) >= 1 for texto in mensajes)
+
+
+@pytest.mark.parametrize("texto, cantidad", [
+    ("un par de yerbas", 2),
+    ("una docena de huevos", 12),
+    ("media docena de huevos", 6),
+    ("docena y media de facturas", 18),
+    ("treinta y dos alfajores", 32),
+    ("ciento veinte servilletas", 120),
+    ("dame veintidós", 22),
+    ("3 yerbas de medio kilo", 3),
+    ("leche x2", 2),
+    ("medio kilo de yerba", None),
+    ("un cuarto de kilo de jamón", None),
+    ("2 kg de papas", None),
+    ("alguno de esos", None),
+    ("unos fideos", None),
+])
+def test_cantidades(texto, cantidad):
+    assert extraer_cantidad(texto) == cantidad
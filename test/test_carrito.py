@@ -0,0 +1,54 @@
+# test_carrito.py
+
+from decimal import Decimal
+
+from app.carrito import Carrito, a_centavos, formatear_centavos
+from app.pedidos import agregar_a_pedido, mostrar_pedido, vaciar_pedido, pedidos_por_cliente
+
+
+def test_centavos_sin_error_de_float():
+    assert a_centavos(2300.1) == 230010
+    assert a_centavos(Decimal("1199.995")) == 120000
+    assert a_centavos(450) == 45000
+    assert formatear_centavos(230010) == "2300.10"
+    assert formatear_centavos(5) == "0.05"
+
+
+def test_misma_linea_por_id_o_por_nombre():
+    carrito = Carrito()
+    carrito.agregar("Leche Entera", 2, Decimal("1200.00"), producto_id=7)
+    linea, nueva = carrito.agregar("Leche Entera", 1, Decimal("1200.00"), producto_id=7)
+    assert not nueva and linea.cantidad == 3
+
+    # Sin id se encuentra por nombre, sin importar mayúsculas
+    linea, nueva = carrito.agregar("leche entera", 1, 1200)
+    assert not nueva and linea.cantidad == 4
+
+    carrito.agregar("Yerba", 1, 3500.5)
+    assert len(carrito) == 2
+    assert carrito.total_centavos == sum(l.subtotal_centavos for l in carrito) == 4 * 120000 + 350050
+
+
+def test_ida_y_vuelta_compacta():
+    carrito = Carrito()
+    carrito.agregar("Leche Entera", 2, Decimal("1200.00"), producto_id=7)
+    carrito.agregar("Pan", 3, 899.9)
+    copia = Carrito.desde_compacto(carrito.a_compacto())
+    assert copia.a_compacto() == [[7, "Leche Entera", 2, 120000], [None, "Pan", 3, 89990]]
+    assert copia.total_centavos == carrito.total_centavos
+
+
+def test_mensajes_del_pedido_no_cambian():
+    sid = "carrito-msj"
+    assert agregar_a_pedido(sid, "Leche Entera", 2, Decimal("1200.00"), 7) == (
+        "🛒 Agregué 2 Leche Entera al pedido. (Total: $2400.00), cuando quieras finalizar tu pedido me avisas 😊"
+    )
+    assert agregar_a_pedido(sid, "Leche Entera", 1, Decimal("1200.00"), 7) == (
+        "Se actualizaron las unidades de Leche Entera (ahora x3).               Total: $3600.00"
+    )
+    assert "Leche Entera $1200.00(3) : $3600.00" in mostrar_pedido(sid)
+    assert "🧾 Total: $3600.00" in mostrar_pedido(sid)
+
+    assert vaciar_pedido(sid).startswith("Vacié tu pedido.")
+    assert not pedidos_por_cliente[sid]
+    assert mostrar_pedido(sid) == "Parece que todavía no tenés productos en tu pedido."
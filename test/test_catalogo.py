@@ -0,0 +1,93 @@
+# test_catalogo.py
+
+from app.catalogo import Catalogo, IndiceCatalogo, normalizar
+
+CATEGORIAS = [
+    {"id": 1, "nombre": "Lácteos"},
+    {"id": 2, "nombre": "Bebidas sin alcohol"},
+    {"id": 3, "nombre": "Fiambres"},
+]
+
+FILAS = [
+    {"id": 1, "producto": "Leche Entera La Serenísima 1L", "precio_venta": 1200, "marca": "La Serenísima", "categoria": "Lácteos"},
+    {"id": 2, "producto": "Leche Descremada Sancor 1L", "precio_venta": 1100, "marca": "Sancor", "categoria": "Lácteos"},
+    {"id": 3, "producto": "Dulce de leche Sancor 400g", "precio_venta": 2100, "marca": "Sancor", "categoria": "Lácteos"},
+    {"id": 4, "producto": "Agua Mineral Villavicencio 2L", "precio_venta": 900, "marca": "Villavicencio", "categoria": "Bebidas sin alcohol"},
+    {"id": 5, "producto": "Jabón en polvo Ala 800g", "precio_venta": 3000, "marca": "Ala", "categoria": "Limpieza"},
+]
+
+
+def nombres(resultados):
+    return [r["producto"] for r in resultados]
+
+
+def test_normalizar_quita_tildes_y_mayusculas():
+    assert normalizar("  Jabón   EN Polvo ") == "jabon en polvo"
+
+
+def test_busqueda_por_categoria_exacta_sin_tildes():
+    indice = IndiceCatalogo(FILAS, CATEGORIAS)
+    assert nombres(indice.buscar("lacteos")) == [
+        "Dulce de leche Sancor 400g", "Leche Descremada Sancor 1L", "Leche Entera La Serenísima 1L",
+    ]
+    # Categoría existente pero sin productos: lista vacía, como la consulta SQL
+    assert indice.buscar("Fiambres") == []
+
+
+def test_busqueda_por_prefijo_de_producto_marca_o_categoria():
+    indice = IndiceCatalogo(FILAS, CATEGORIAS)
+    assert nombres(indice.buscar("leche chocolatada")) == ["Leche Descremada Sancor 1L", "Leche Entera La Serenísima 1L"]
+    assert nombres(indice.buscar("sancor")) == ["Dulce de leche Sancor 400g", "Leche Descremada Sancor 1L"]
+    assert nombres(indice.buscar("bebidas")) == ["Agua Mineral Villavicencio 2L"]
+
+
+def test_busqueda_por_contenido():
+    indice = IndiceCatalogo(FILAS, CATEGORIAS)
+    assert nombres(indice.buscar("de leche")) == ["Dulce de leche Sancor 400g"]
+    assert nombres(indice.buscar("jabon")) == ["Jabón en polvo Ala 800g"]
+    assert nombres(indice.buscar("polvo ala")) == ["Jabón en polvo Ala 800g"]
+    assert nombres(indice.buscar("ineral")) == ["Agua Mineral Villavicencio 2L"]
+    assert indice.buscar("yerba") is None
+
+
+def test_refresco_solo_cuando_cambia_la_version():
+    version = {"valor": ("400", "2025-01-01")}
+    lecturas = []
+
+    def leer_catalogo():
+        lecturas.append(1)
+        return FILAS, CATEGORIAS
+
+    catalogo = Catalogo(leer_catalogo, lambda: version["valor"], intervalo_verificacion=0)
+    assert len(catalogo.obtener_indice()) == 5
+    catalogo.obtener_indice()
+    assert len(lecturas) == 1
+
+    version["valor"] = ("401", "2025-01-02")
+    catalogo.obtener_indice()
+    assert len(lecturas) == 2
+
+
+def test_con_la_base_caida_no_consulta_en_cada_mensaje():
+    consultas = []
+
+    def leer_version():
+        consultas.append(1)
+        raise ConnectionError("base caída")
+
+    catalogo = Catalogo(lambda: (FILAS, CATEGORIAS), leer_version, intervalo_verificacion=3600)
+    assert catalogo.obtener_indice() is None
+    assert catalogo.obtener_indice() is None
+    assert len(consultas) == 1
+
+    catalogo.intervalo_verificacion = 0
+    catalogo.obtener_indice()
+    assert len(consultas) == 2
+
+
+def test_buscar_varios_no_repite_productos():
+    indice = IndiceCatalogo(FILAS, CATEGORIAS)
+    # "leche" y "sancor" comparten productos; "yerba" no existe
+    assert nombres(indice.buscar_varios(["leche", "Sancor", "yerba", "leche "])) == [
+        "Leche Descremada Sancor 1L", "Leche Entera La Serenísima 1L", "Dulce de leche Sancor 400g",
+    ]
@@ -0,0 +1,64 @@
+# test_clasificador.py
+
+import pytest
+
+from app import clasificador, crud, pedidos
+from bench import bench_pipeline
+from app.catalogo import Catalogo
+
+CATEGORIAS = [{"id": 1, "nombre": "Infusiones"}, {"id": 2, "nombre": "Bebidas sin alcohol"}]
+FILAS = [
+    {"id": 1, "producto": "Yerba Mate Playadito 1kg", "precio_venta": 4500, "marca": "Playadito", "categoria": "Infusiones"},
+    {"id": 2, "producto": "Leche Entera La Serenísima 1L", "precio_venta": 1200, "marca": "La Serenísima", "categoria": "Lácteos"},
+    {"id": 3, "producto": "Pan Lactal Integral Bimbo", "precio_venta": 2500, "marca": "Bimbo", "categoria": "Panadería"},
+]
+
+
+@pytest.fixture(autouse=True)
+def catalogo_de_prueba(monkeypatch):
+    monkeypatch.setattr(clasificador, "catalogo", Catalogo(lambda: (FILAS, CATEGORIAS), lambda: ("v1",)))
+
+
+@pytest.mark.parametrize("mensaje, intencion", [
+    ("Hola!", "CHARLAR"),
+    ("buenas tardes, cómo estás?", "CHARLAR"),
+    ("Muchas gracias", "CHARLAR"),
+    ("Mostrame el pedido", "MOSTRAR_PEDIDO"),
+    ("¿cómo va mi carrito?", "MOSTRAR_PEDIDO"),
+    ("vaciá el carrito por favor", "VACIAR_PEDIDO"),
+    ("quiero finalizar el pedido", "FINALIZAR_PEDIDO"),
+])
+def test_mensajes_obvios_se_resuelven_sin_ia(mensaje, intencion):
+    detectado = clasificador.clasificar(mensaje)
+    assert detectado["intencion"] == intencion
+    assert detectado["productos"] == []
+
+
+def test_consulta_de_productos_del_catalogo():
+    assert clasificador.clasificar("¿Tienen yerbas?")["productos"] == ["yerba"]
+    assert clasificador.clasificar("hay leche entera y pan integral?")["productos"] == ["leche entera", "pan integral"]
+    assert clasificador.clasificar("¿Tienen bebidas sin alcohol?")["intencion"] == "CONSULTAR_INFO"
+
+
+@pytest.mark.parametrize("mensaje", [
+    "2", "dale", "agregame la yerba", "nada más, gracias", "eso es todo", "Listo, ya terminé", "mostrame el pedido y sumá leche", "¿tienen fernet?", "¿hacen envíos?",
+])
+def test_mensajes_dudosos_van_a_la_ia(mensaje):
+    assert clasificador.clasificar(mensaje) is None
+
+
+def test_informa_la_fraccion_resuelta():
+    clasificador.clasificar("hola")
+    assert 0 < clasificador.fraccion_resuelta.valor <= 1
+
+
+def test_nada_mas_gracias_no_cierra_el_pedido(monkeypatch):
+    for nombre in ("modelo_input", "modelo_input_json", "modelo_output", "chain", "with_message_history"):
+        monkeypatch.setattr(crud, nombre, getattr(crud, nombre))
+    bench_pipeline.instalar_modelos_falsos(0, 0)
+    monkeypatch.setattr(pedidos, "finalizar_pedido", lambda *args: pytest.fail("no debería cerrar el pedido"))
+
+    respuesta = crud.get_response("nada más, gracias", "clasificador_nada_mas")
+    crud.cola_resumenes.esperar("clasificador_nada_mas")
+    assert "confirmado" not in respuesta
+    assert crud.get_datos_traidos_desde_bd("clasificador_nada_mas").get("ultima_intencion_detectada") != "FINALIZAR_PEDIDO"
@@ -0,0 +1,58 @@
+# test_conversaciones.py
+
+import os
+
+from app.conversaciones import Anotador, Conversacion, migrar_carpeta
+
+
+def mensaje(i, contenido=None):
+    return {"timestamp": f"2025-01-01 10:{i // 60:02d}:{i % 60:02d}", "role": "user" if i % 2 == 0 else "bot",
+            "content": contenido if contenido is not None else f"mensaje {i}"}
+
+
+def test_mensajes_de_varias_lineas_y_cola(tmp_path):
+    base = str(tmp_path / "s1")
+    anotador = Anotador(base)
+    anotador.agregar([mensaje(0, "hola"), mensaje(1, "Tenemos:\n• Leche\n• Yerba - De oferta")])
+    anotador.agregar([mensaje(i) for i in range(2, 200)])
+
+    conversacion = Conversacion(base)
+    assert conversacion.cantidad() == 200
+    assert conversacion.todos()[1]["content"] == "Tenemos:\n• Leche\n• Yerba - De oferta"
+    assert conversacion.ultimos(3) == [mensaje(i) for i in range(197, 200)]
+    assert conversacion.ultimos(0) == []
+    anotador.close()
+
+
+def test_escritura_cortada_se_repara_al_reabrir(tmp_path):
+    base = str(tmp_path / "s1")
+    anotador = Anotador(base)
+    anotador.agregar([mensaje(0), mensaje(1)])
+    anotador.close()
+
+    # Un registro a medio escribir y sin entrada en el índice
+    with open(base + ".conv", "ab") as f:
+        f.write(b"\x40\x00\x00\x00basura")
+    anotador = Anotador(base)
+    anotador.agregar([mensaje(2)])
+    anotador.close()
+
+    assert Conversacion(base).todos() == [mensaje(0), mensaje(1), mensaje(2)]
+
+    # Índice perdido: se reconstruye desde los datos
+    os.remove(base + ".idx")
+    Anotador(base).close()
+    assert Conversacion(base).ultimos(2) == [mensaje(1), mensaje(2)]
+
+
+def test_migrar_carpeta(tmp_path):
+    (tmp_path / "s1.txt").write_text(
+        "2025-01-01 10:00:00 - De whatsapp:+549: hola\n"
+        "2025-01-01 10:00:01 - Bot: Tenemos:\n• Leche\n",
+        encoding="utf-8",
+    )
+    resultado = migrar_carpeta(str(tmp_path), borrar_txt=True)
+
+    assert resultado["archivos"] == 1 and resultado["mensajes"] == 2
+    assert not (tmp_path / "s1.txt").exists()
+    assert [m["content"] for m in Conversacion(str(tmp_path / "s1")).todos()] == ["hola", "Tenemos:\n• Leche"]
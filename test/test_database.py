@@ -0,0 +1,53 @@
+# test_database.py
+
+import threading
+
+import pytest
+
+from app import database
+from app.catalogo import Catalogo
+
+
+@pytest.fixture(scope="module", autouse=True)
+def catalogo_sqlite():
+    database.crear_bd_sqlite(database.engine)
+
+
+def test_consultar_usa_el_pool_y_devuelve_diccionarios():
+    filas = database.consultar("SELECT id, nombre FROM categorias WHERE id = :id", {"id": 1})
+    assert filas == [{"id": 1, "nombre": "Lácteos"}]
+    assert database.conexiones_en_uso.valor == 0
+    assert database.espera_checkout.snapshot()["count"] >= 1
+
+
+def test_connect_to_db_devuelve_la_conexion_al_pool():
+    conexion = database.connect_to_db()
+    cursor = conexion.cursor()
+    cursor.execute("SELECT COUNT(*) FROM productos")
+    assert cursor.fetchone()[0] > 300
+    cursor.close()
+    assert database.conexiones_en_uso.valor == 1
+    conexion.close()
+    assert database.conexiones_en_uso.valor == 0
+
+
+def test_pool_agotado_se_cuenta():
+    capacidad = database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW
+    prestadas = [database.connect_to_db() for _ in range(capacidad)]
+    antes = database.pool_agotado.valor
+
+    liberar = threading.Timer(0.05, prestadas[0].close)
+    liberar.start()
+    database.consultar("SELECT 1")
+    liberar.join()
+
+    assert database.pool_agotado.valor == antes + 1
+    for conexion in prestadas[1:]:
+        conexion.close()
+
+
+def test_catalogo_se_carga_desde_la_bd():
+    indice = Catalogo().refrescar(forzar=True)
+    assert len(indice) > 300
+    assert all(p["categoria"] == "Infusiones" for p in indice.buscar("infusiones"))
+    assert indice.buscar("yerba")[0]["producto"].startswith("Yerba")
@@ -0,0 +1,56 @@
+# test_despacho.py
+
+import asyncio
+import threading
+import time
+
+from app.despacho import Despachador
+
+
+def test_orden_por_sesion_y_paralelismo_entre_sesiones():
+    despachador = Despachador(max_workers=4)
+    procesados = {"a": [], "b": []}
+    hilos_simultaneos = set()
+
+    def turno(session_id, n):
+        hilos_simultaneos.add(threading.get_ident())
+        # Los primeros mensajes tardan más: si no se respetara el orden, se mezclarían
+        time.sleep(0.05 if n == 0 else 0.01)
+        procesados[session_id].append(n)
+        return f"{session_id}-{n}"
+
+    async def correr():
+        tareas = []
+        for n in range(4):
+            tareas.append(despachador.ejecutar("a", turno, "a", n))
+            tareas.append(despachador.ejecutar("b", turno, "b", n))
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*tareas)
+        return resultados, time.perf_counter() - inicio
+
+    resultados, duracion = asyncio.run(correr())
+    despachador.cerrar()
+
+    assert procesados == {"a": [0, 1, 2, 3], "b": [0, 1, 2, 3]}
+    assert resultados[:2] == ["a-0", "b-0"]
+    assert len(hilos_simultaneos) >= 2
+    # Dos sesiones en paralelo: bastante menos que ejecutar los 8 turnos en serie
+    assert duracion < 0.2
+    assert despachador.profundidad_sesion("a") == 0
+
+
+def test_error_en_turno_no_bloquea_la_sesion():
+    despachador = Despachador(max_workers=1)
+
+    def falla():
+        raise RuntimeError("ollama caído")
+
+    async def correr():
+        try:
+            await despachador.ejecutar("x", falla)
+        except RuntimeError:
+            pass
+        return await despachador.ejecutar("x", lambda: "ok")
+
+    assert asyncio.run(correr()) == "ok"
+    despachador.cerrar()
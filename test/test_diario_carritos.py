@@ -0,0 +1,91 @@
+# test_diario_carritos.py
+
+import json
+import os
+from decimal import Decimal
+
+from app.carrito import Carrito
+from app.diario_carritos import DiarioCarritos
+from app.sesiones import sesiones
+
+
+def nuevo_diario(tmp_path, espacio, **kwargs):
+    return DiarioCarritos(str(tmp_path / "carritos.diario"), espacio=espacio, **kwargs)
+
+
+def contenido(carrito):
+    return [(l.producto_id, l.producto, l.cantidad, l.precio_centavos) for l in carrito]
+
+
+def test_recupera_carritos_despues_de_una_caida(tmp_path):
+    carritos = sesiones.espacio("diario_caida")
+    diario = nuevo_diario(tmp_path, "diario_caida", intervalo_fsync=60)
+    diario.abrir()
+
+    for sid in ("a", "b", "c"):
+        carritos[sid] = Carrito()
+    diario.agregar("a", carritos["a"], "Leche Entera", 2, Decimal("1200.00"), 7)
+    diario.agregar("a", carritos["a"], "Leche Entera", 1, Decimal("1200.00"), 7)
+    diario.agregar("a", carritos["a"], "Pan", 1, 899.9)
+    diario.agregar("b", carritos["b"], "Yerba", 1, 3500)
+    diario.vaciar("b", carritos["b"], finalizado=True)
+    diario.agregar("c", carritos["c"], "Azúcar", 2, 1100)
+    # Desalojo por TTL o SESIONES_MAX: el carrito no tiene que volver al reiniciar
+    sesiones.olvidar("c")
+
+    # Se cae el proceso sin cerrar el diario: lo que se anotó ya está en el archivo
+    for sid in ("a", "b"):
+        del carritos[sid]
+    otro = nuevo_diario(tmp_path, "diario_caida")
+    assert otro.abrir() == 1
+    assert contenido(carritos["a"]) == [(7, "Leche Entera", 3, 120000), (None, "Pan", 1, 89990)]
+    assert carritos["a"].total_centavos == 3 * 120000 + 89990
+    assert "b" not in carritos
+    assert "c" not in carritos
+
+    # Al abrir se compacta: el diario vuelve a empezar y queda la foto
+    assert os.path.getsize(otro.ruta) == 0
+    otro.cerrar()
+    diario.cerrar()
+
+
+def test_descarta_la_cola_cortada(tmp_path):
+    ruta = tmp_path / "carritos.diario"
+    ruta.write_bytes(
+        json.dumps(["a", "s1", 7, "Leche", 2, 120000]).encode() + b"\n"
+        + b'["a","s1",8,"Pa'
+    )
+    carritos = sesiones.espacio("diario_cortado")
+    diario = nuevo_diario(tmp_path, "diario_cortado")
+    diario.abrir()
+    assert contenido(carritos["s1"]) == [(7, "Leche", 2, 120000)]
+
+    diario.agregar("s1", carritos["s1"], "Leche", 1, 1200, 7)
+    diario.cerrar()
+    del carritos["s1"]
+
+    diario = nuevo_diario(tmp_path, "diario_cortado")
+    diario.abrir()
+    assert contenido(carritos["s1"]) == [(7, "Leche", 3, 120000)]
+    diario.cerrar()
+
+
+def test_compacta_al_superar_el_tamanio(tmp_path):
+    carritos = sesiones.espacio("diario_compacta")
+    diario = nuevo_diario(tmp_path, "diario_compacta", intervalo_fsync=0.01, compactar_bytes=200)
+    diario.abrir()
+    carritos["s1"] = Carrito()
+    for i in range(20):
+        diario.agregar("s1", carritos["s1"], f"Producto {i}", 1, 100 + i, i)
+
+    diario.cerrar()
+    assert os.path.exists(diario.ruta_foto)
+    assert os.path.getsize(diario.ruta) == 0
+    total = carritos["s1"].total_centavos
+    del carritos["s1"]
+
+    diario = nuevo_diario(tmp_path, "diario_compacta")
+    diario.abrir()
+    assert len(carritos["s1"]) == 20
+    assert carritos["s1"].total_centavos == total
+    diario.cerrar()
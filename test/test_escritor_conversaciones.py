@@ -0,0 +1,34 @@
+# test_escritor_conversaciones.py
+
+import threading
+
+from app.conversaciones import Conversacion
+from app.escritor_conversaciones import EscritorConversaciones
+
+
+def test_orden_por_sesion_con_varios_hilos(tmp_path):
+    escritor = EscritorConversaciones(intervalo=0.01, max_abiertos=2)
+
+    def sesion(i):
+        for n in range(200):
+            escritor.anotar(str(tmp_path / f"s{i}"), {"timestamp": "2025-01-01 10:00:00", "role": "user", "content": f"{i}-{n}"})
+
+    hilos = [threading.Thread(target=sesion, args=(i,)) for i in range(5)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert escritor.vaciar()
+    for i in range(5):
+        # Con solo 2 sesiones abiertas a la vez se cierran y reabren para agregar
+        assert [m["content"] for m in Conversacion(str(tmp_path / f"s{i}")).todos()] == [f"{i}-{n}" for n in range(200)]
+    escritor.cerrar()
+
+
+def test_cerrar_escribe_lo_pendiente(tmp_path):
+    # Intervalo largo: sin cerrar() las líneas seguirían en memoria
+    escritor = EscritorConversaciones(intervalo=60)
+    escritor.anotar(str(tmp_path / "nueva" / "s"), {"timestamp": "2025-01-01 10:00:00", "role": "bot", "content": "hola"})
+    escritor.cerrar()
+    assert Conversacion(str(tmp_path / "nueva" / "s")).ultimos(1)[0]["content"] == "hola"
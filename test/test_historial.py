@@ -0,0 +1,45 @@
+# test_historial.py
+
+import glob
+import os
+import shutil
+
+import pytest
+
+from app import conversaciones, historial
+
+CARPETA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conversaciones")
+
+
+@pytest.fixture
+def carpeta_temporal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("conversaciones")
+    return tmp_path
+
+
+@pytest.mark.parametrize("ruta", sorted(glob.glob(os.path.join(CARPETA, "*.txt"))))
+def test_migracion_perezosa_conserva_los_mensajes(carpeta_temporal, ruta):
+    session_id = os.path.basename(ruta)[:-4]
+    shutil.copy(ruta, os.path.join("conversaciones", f"{session_id}.txt"))
+
+    completo = conversaciones.leer_txt(ruta)
+    assert historial.ultimos_mensajes(session_id, 12) == completo[-12:]
+    assert historial.obtener_conversacion(session_id).todos() == completo
+    # El formato nuevo (datos + índice) ocupa menos que el .txt
+    base = os.path.join("conversaciones", session_id)
+    assert os.path.getsize(base + ".conv") + os.path.getsize(base + ".idx") < os.path.getsize(ruta)
+
+
+def test_mensajes_entre_fechas(carpeta_temporal):
+    anotador = conversaciones.Anotador(os.path.join("conversaciones", "s1"))
+    anotador.agregar([
+        {"timestamp": f"2025-01-01 10:00:0{i}", "role": "user" if i % 2 == 0 else "bot", "content": f"m{i}"}
+        for i in range(10)
+    ])
+    anotador.close()
+
+    entre = historial.mensajes_entre("s1", "2025-01-01 10:00:03", "2025-01-01 10:00:05")
+    assert [m["content"] for m in entre] == ["m3", "m4", "m5"]
+    assert historial.mensajes_entre("s1", "2025-01-02 00:00:00", "2025-01-03 00:00:00") == []
+    assert historial.ultimos_mensajes("nadie", 12) == []
@@ -0,0 +1,54 @@
+# test_info_super.py
+
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app import crud, info_super
+from app.info_super import ArchivoVigilado, armar_fragmento_info
+
+
+def test_lee_una_vez_y_recarga_si_cambia(tmp_path):
+    ruta = tmp_path / "info.txt"
+    ruta.write_text("Horario: 8 a 21\n", encoding="utf-8")
+    armados = []
+
+    def armar(texto):
+        armados.append(texto)
+        return armar_fragmento_info(texto)
+
+    info = ArchivoVigilado(str(ruta), armar, intervalo_verificacion=0)
+    assert info.texto() == "Horario: 8 a 21"
+    assert "\nHorario: 8 a 21\n" in info.valor()
+    assert info.valor() is info.valor()          # no se rearma en cada turno
+    assert armados == ["", "Horario: 8 a 21"]
+
+    ruta.write_text("Horario: 9 a 20\n", encoding="utf-8")
+    os.utime(ruta, ns=(1, os.stat(ruta).st_mtime_ns + 10**9))
+    assert info.texto() == "Horario: 9 a 20"
+
+
+def test_entre_verificaciones_no_toca_el_disco(tmp_path):
+    ruta = tmp_path / "info.txt"
+    ruta.write_text("A", encoding="utf-8")
+    info = ArchivoVigilado(str(ruta), intervalo_verificacion=3600)
+    assert info.texto() == "A"
+
+    ruta.unlink()
+    assert info.texto() == "A"
+
+
+def test_archivo_inexistente(tmp_path):
+    info = ArchivoVigilado(str(tmp_path / "no.txt"), armar_fragmento_info, intervalo_verificacion=0)
+    assert info.texto() == "" and info.valor() == ""
+
+
+def test_el_prompt_del_chat_no_tiene_mensaje_de_sistema(monkeypatch):
+    # Un mensaje de sistema reemplaza al SYSTEM del Modelfile de Ollama
+    monkeypatch.setattr(info_super.info_supermercado, "valor", lambda: armar_fragmento_info("Horario: 8 a 21"))
+    mensajes = crud.prompt.invoke({"history": [HumanMessage("hola"), AIMessage("¡Hola!")], "input": "¿a qué hora abren?"}).to_messages()
+
+    assert not any(isinstance(m, SystemMessage) for m in mensajes)
+    assert isinstance(mensajes[-1], HumanMessage)
+    assert "Horario: 8 a 21" in mensajes[-1].content
+    assert mensajes[-1].content.endswith("\n\n¿a qué hora abren?")
@@ -0,0 +1,41 @@
+# test_ingredientes.py
+
+from app import crud
+from app.catalogo import Catalogo
+
+FILAS = [
+    {"id": 1, "producto": "Harina 000 Blancaflor 1kg", "precio_venta": 1500, "marca": "Blancaflor", "categoria": "Almacén"},
+    {"id": 2, "producto": "Queso Cremoso La Paulina", "precio_venta": 6000, "marca": "La Paulina", "categoria": "Lácteos"},
+    {"id": 3, "producto": "Mayonesa Hellmann's 250g", "precio_venta": 1800, "marca": "Hellmann's", "categoria": "Almacén"},
+]
+
+
+class ModeloFalso:
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.llamadas = 0
+
+    def invoke(self, prompt):
+        self.llamadas += 1
+        return self.respuesta
+
+
+def test_ingredientes_en_una_pasada_y_expansion_cacheada(monkeypatch):
+    catalogo = Catalogo(lambda: (FILAS, []), lambda: ("v1",))
+    modelo = ModeloFalso("harina, queso, harina 000 y mayonesa, tomate")
+    monkeypatch.setattr(crud, "catalogo", catalogo)
+    monkeypatch.setattr(crud, "modelo_input", modelo)
+    monkeypatch.setattr(crud, "invocar", lambda m, prompt, sitio=None: m.invoke(prompt))
+    monkeypatch.setattr(crud, "expansiones_platos", type(crud.expansiones_platos)())
+
+    productos = crud.buscar_ingredientes_para_comida("Pizza ")
+    assert [p["id"] for p in productos] == [1, 2, 3]
+
+    # Segundo pedido del mismo plato: sale de la caché, sin IA
+    assert crud.buscar_ingredientes_para_comida("pizza") == productos
+    assert modelo.llamadas == 1
+
+    # Si el catálogo se recarga (por ejemplo, cambió un precio), se vuelve a calcular
+    catalogo.refrescar(forzar=True)
+    crud.buscar_ingredientes_para_comida("pizza")
+    assert modelo.llamadas == 2
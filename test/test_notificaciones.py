@@ -0,0 +1,103 @@
+# test_notificaciones.py
+
+import asyncio
+import time
+
+import httpx
+
+from app.notificaciones import Notificador
+
+
+def esperar_entrega(notificador, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while notificador.pendientes() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return notificador.pendientes() == 0
+
+
+def test_reintenta_con_backoff_hasta_entregar(tmp_path):
+    recibidos = []
+
+    def puente(request):
+        recibidos.append(request)
+        return httpx.Response(503 if len(recibidos) < 3 else 200, json={"status": "ok"})
+
+    notificador = Notificador(str(tmp_path / "salida.db"), reintentos=4, backoff=0.01,
+                              transporte=httpx.MockTransport(puente))
+    notificador.encolar("http://puente/enviar-mensaje", {"numero": "549", "mensaje": "🧾 pedido"})
+
+    assert esperar_entrega(notificador)
+    assert len(recibidos) == 3
+    assert recibidos[-1].read() == '{"numero":"549","mensaje":"🧾 pedido"}'.encode("utf-8")
+    notificador.cerrar()
+
+
+def test_pedido_sobrevive_a_un_puente_caido(tmp_path):
+    def caido(request):
+        raise httpx.ConnectError("puente apagado")
+
+    ruta = str(tmp_path / "salida.db")
+    notificador = Notificador(ruta, reintentos=2, backoff=0.01, barrido=60, transporte=httpx.MockTransport(caido))
+    notificador.encolar("http://puente/enviar-mensaje", {"numero": "549", "mensaje": "pedido"})
+    time.sleep(0.2)
+    notificador.cerrar()
+
+    # Al reiniciar, el barrido inicial manda lo que quedó en la bandeja
+    recibidos = []
+    notificador = Notificador(ruta, transporte=httpx.MockTransport(lambda r: recibidos.append(r) or httpx.Response(200)))
+    assert notificador.pendientes() == 1
+    notificador.iniciar()
+    assert esperar_entrega(notificador)
+    assert len(recibidos) == 1
+    notificador.cerrar()
+
+
+def test_rechazo_4xx_no_se_reintenta(tmp_path):
+    recibidos = []
+    notificador = Notificador(str(tmp_path / "salida.db"), backoff=0.01,
+                              transporte=httpx.MockTransport(lambda r: recibidos.append(r) or httpx.Response(400)))
+    notificador.encolar("http://puente/enviar-mensaje", {"numero": "549", "mensaje": "pedido"})
+    assert esperar_entrega(notificador)
+    assert len(recibidos) == 1
+    notificador.cerrar()
+
+
+def test_dos_workers_con_la_misma_bandeja_envian_una_sola_vez(tmp_path):
+    recibidos = []
+
+    async def puente_lento(request):
+        recibidos.append(request)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200)
+
+    ruta = str(tmp_path / "salida.db")
+    uno = Notificador(ruta, transporte=httpx.MockTransport(puente_lento))
+    otro = Notificador(ruta, transporte=httpx.MockTransport(puente_lento))
+    uno.encolar("http://puente/enviar-mensaje", {"numero": "549", "mensaje": "pedido"})
+    # El otro worker arranca mientras el primero está enviando: su barrido inicial no la toma
+    otro.iniciar()
+
+    assert esperar_entrega(uno)
+    assert len(recibidos) == 1
+    uno.cerrar()
+    otro.cerrar()
+
+
+def test_reclamo_vencido_de_un_worker_caido_se_reintenta(tmp_path):
+    ruta = str(tmp_path / "salida.db")
+    caido = Notificador(ruta)
+    caido.reclamo = 0.05
+    id_notificacion = caido._conexion().execute(
+        "INSERT INTO salida (url, payload, creado) VALUES ('http://puente/enviar-mensaje', '{}', 0)"
+    ).lastrowid
+    caido._db.commit()
+    assert caido._reclamar(id_notificacion) is not None    # y el proceso se cae sin enviar
+    caido.cerrar()
+
+    recibidos = []
+    notificador = Notificador(ruta, transporte=httpx.MockTransport(lambda r: recibidos.append(r) or httpx.Response(200)))
+    time.sleep(0.1)
+    notificador.iniciar()
+    assert esperar_entrega(notificador)
+    assert len(recibidos) == 1
+    notificador.cerrar()
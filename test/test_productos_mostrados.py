@@ -0,0 +1,37 @@
+# test_productos_mostrados.py
+
+from app.productos_mostrados import ProductosMostrados, lista_con_vinetas
+
+
+def producto(i, nombre=None):
+    return {"id": i, "producto": nombre or f"Producto {i}", "precio_venta": 100 * i}
+
+
+def test_sin_repetidos_y_texto_cacheado():
+    mostrados = ProductosMostrados()
+    mostrados.mostrar("Leche", [producto(1, "Leche Entera"), producto(2, "Leche Descremada")])
+    texto = mostrados.texto_prompt()
+    assert texto.count("- Leche Entera\n") == 1
+    assert mostrados.texto_prompt() is texto          # sin cambios no se rearma
+
+    # La misma leche aparece al consultar por la marca: no se duplica
+    mostrados.mostrar("serenisima", [producto(1, "Leche Entera")])
+    assert len(mostrados) == 2
+    assert mostrados.texto_prompt().count("Leche Entera") == 1
+    assert mostrados.por_consulta() == {"leche": [producto(2, "Leche Descremada")],
+                                        "serenisima": [producto(1, "Leche Entera")]}
+    assert mostrados.buscar("descremada") == producto(2, "Leche Descremada")
+    assert mostrados.buscar("yerba") is None
+
+
+def test_tope_descarta_los_mostrados_hace_mas_tiempo():
+    mostrados = ProductosMostrados(max_productos=3)
+    for i in range(1, 6):
+        mostrados.mostrar(f"consulta {i}", [producto(i)])
+    assert [p["id"] for p in mostrados] == [3, 4, 5]
+    assert "Producto 1" not in mostrados.texto_prompt()
+
+
+def test_lista_con_vinetas():
+    assert lista_con_vinetas([producto(1), producto(2)]) == "• Producto 1 — $100\n• Producto 2 — $200"
+    assert ProductosMostrados().texto_prompt() == ""
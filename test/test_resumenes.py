@@ -0,0 +1,76 @@
+# test_resumenes.py
+
+import threading
+import time
+
+from app import backend_sesiones
+from app.endpoints import endpoints
+from app.resumenes import ColaResumenes
+
+
+def test_rafaga_de_mensajes_genera_un_solo_resumen_extra():
+    liberar = threading.Event()
+    generados = []
+
+    def generar(session_id, respuesta):
+        liberar.wait(1)
+        generados.append(respuesta)
+
+    cola = ColaResumenes(generar)
+    cola.programar("s1", "r1")
+    # Mientras el primero corre, llegan tres respuestas más: se resumen una sola vez
+    while not cola._estados["s1"].iniciado:
+        pass
+    for respuesta in ("r2", "r3", "r4"):
+        cola.programar("s1", respuesta)
+    liberar.set()
+
+    assert cola.esperar("s1", timeout=2)
+    assert generados == ["r1", "r4"]
+    assert not cola.pendiente("s1")
+    cola.cerrar()
+
+
+def test_esperar_sin_resumen_pendiente_no_bloquea():
+    cola = ColaResumenes(lambda session_id, respuesta: None)
+    assert cola.esperar("nadie", timeout=0)
+    cola.cerrar()
+
+
+def test_resumenes_de_sesiones_distintas_corren_a_la_vez():
+    # Los tres resúmenes tienen que estar en curso al mismo tiempo para pasar la barrera
+    barrera = threading.Barrier(3, timeout=1)
+    cruzaron = []
+
+    def generar(session_id, respuesta):
+        barrera.wait()
+        time.sleep(0.1)
+        cruzaron.append(session_id)
+
+    cola = ColaResumenes(generar)
+    inicio = time.perf_counter()
+    for session_id in ("a", "b", "c"):
+        cola.programar(session_id, "r")
+    assert all(cola.esperar(session_id, timeout=2) for session_id in ("a", "b", "c"))
+
+    assert sorted(cruzaron) == ["a", "b", "c"]
+    assert time.perf_counter() - inicio < 0.25
+    cola.cerrar()
+
+
+class BackendCompartidoFalso(backend_sesiones.BackendMemoria):
+    compartido = True
+
+
+def test_el_turno_espera_el_resumen_antes_de_la_sesion_solo_con_backend_compartido(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(endpoints.cola_resumenes, "esperar", lambda session_id: esperas.append(session_id))
+    monkeypatch.setattr(endpoints, "get_response", lambda body, session_id: "ok")
+
+    # En memoria la espera queda para armar_prompt_deteccion (el worker no se ocupa esperando)
+    assert endpoints.responder_turno("hola", "s1") == "ok"
+    assert esperas == []
+
+    monkeypatch.setattr(backend_sesiones, "backend", BackendCompartidoFalso())
+    assert endpoints.responder_turno("hola", "s1") == "ok"
+    assert esperas == ["s1"]
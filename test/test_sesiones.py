@@ -0,0 +1,91 @@
+# test_sesiones.py
+
+import threading
+
+from langchain_core.messages import HumanMessage
+
+from app import metricas
+
+from app.sesiones import GestorSesiones, HistorialChatAcotado
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_desalojo_lru_en_todos_los_espacios():
+    gestor = GestorSesiones(max_sesiones=2, ttl_seg=1000, reloj=Reloj())
+    pedidos = gestor.espacio("pedidos")
+    datos = gestor.espacio("datos")
+
+    pedidos["a"] = [1]
+    datos["a"] = {"x": 1}
+    pedidos["b"] = [2]
+    pedidos["a"]            # "a" pasa a ser la más reciente
+    pedidos["c"] = [3]      # supera el máximo: se va "b"
+
+    assert "b" not in pedidos and "a" in pedidos and "a" in datos
+
+
+def test_desalojo_por_inactividad():
+    reloj = Reloj()
+    gestor = GestorSesiones(max_sesiones=100, ttl_seg=60, reloj=reloj)
+    pedidos = gestor.espacio("pedidos")
+    olvidadas = []
+    pedidos.al_olvidar = lambda session_id, valor: olvidadas.append((session_id, valor))
+    pedidos["vieja"] = [1]
+    reloj.ahora = 30
+    pedidos["nueva"] = [2]
+    reloj.ahora = 61
+    pedidos["nueva"]
+
+    assert "vieja" not in pedidos
+    assert olvidadas == [("vieja", [1])]
+    assert "nueva" in pedidos
+    assert gestor.memoria_sesion("nueva") > 0
+
+
+def test_historial_de_chat_acotado():
+    historial = HistorialChatAcotado(max_mensajes=3, max_tokens=1000)
+    for i in range(5):
+        historial.add_message(HumanMessage(content=f"mensaje {i}"))
+    assert [m.content for m in historial.messages] == ["mensaje 2", "mensaje 3", "mensaje 4"]
+
+    historial = HistorialChatAcotado(max_mensajes=10, max_tokens=30)
+    historial.add_user_message("a" * 80)
+    historial.add_ai_message("b" * 80)
+    assert [m.content[0] for m in historial.messages] == ["b"]
+
+
+def test_medir_memoria_mientras_los_turnos_escriben():
+    gestor = GestorSesiones(max_sesiones=100, ttl_seg=1000)
+    datos = gestor.espacio("datos")
+    for i in range(20):
+        datos[f"s{i}"] = {"productos": list(range(50))}
+    parar = threading.Event()
+
+    def turno():
+        # Modifica los dicts de las sesiones sin tomar el lock del gestor, como get_response
+        n = 0
+        while not parar.is_set():
+            d = datos._datos["s0"]
+            d[f"clave{n}"] = n
+            d.pop(f"clave{n - 50}", None)
+            n += 1
+
+    hilo = threading.Thread(target=turno)
+    hilo.start()
+    try:
+        for _ in range(50):
+            tamanios = gestor.medir_memoria()
+    finally:
+        parar.set()
+        hilo.join()
+
+    assert len(tamanios) == 20
+    assert metricas.medidor("sesiones_memoria_bytes").snapshot() == sum(tamanios.values())
+    assert list(gestor.memoria_por_sesion(1)) == ["s0"]
@@ -0,0 +1,85 @@
+# test_streaming.py
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.conversaciones import Conversacion
+from app.agrupador import AgrupadorMensajes
+from app.endpoints import endpoints
+from app.escritor_conversaciones import escritor
+from app.streaming import emitir_a, invocar_con_streaming
+
+
+class ModeloFalso:
+    def invoke(self, entrada):
+        return "Tenemos yerba. ¿Agrego una?"
+
+    def stream(self, entrada):
+        yield from ("Tenemos ", "yerba. ", "¿Agrego una?")
+
+
+def test_sin_streaming_activo_es_invoke():
+    assert invocar_con_streaming(ModeloFalso(), "hola") == "Tenemos yerba. ¿Agrego una?"
+
+
+def test_con_streaming_emite_trozos_y_devuelve_el_texto_completo():
+    recibidos = []
+    with emitir_a(recibidos.append):
+        resultado = invocar_con_streaming(ModeloFalso(), "hola")
+    assert recibidos == ["Tenemos ", "yerba. ", "¿Agrego una?"]
+    assert resultado.content == "".join(recibidos)
+
+
+def test_endpoint_stream_envia_parciales_y_fin(monkeypatch, tmp_path):
+    monkeypatch.setattr(endpoints, "CARPETA_CONVERSACIONES", str(tmp_path))
+    monkeypatch.setattr(endpoints, "get_response", lambda body, session_id: invocar_con_streaming(ModeloFalso(), body).content)
+    monkeypatch.setattr(endpoints, "agrupador", AgrupadorMensajes(ventana_seg=0))
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    respuesta = TestClient(app).post("/process-message/stream", json={"from": "+5491100", "body": "yerba"})
+
+    eventos = []
+    for bloque in respuesta.text.strip().split("\n\n"):
+        evento, datos = bloque.split("\n")
+        eventos.append((evento.removeprefix("event: "), json.loads(datos.removeprefix("data: "))))
+
+    assert [e for e, _ in eventos] == ["parcial", "parcial", "parcial", "fin"]
+    assert "".join(d["texto"] for e, d in eventos if e == "parcial") == eventos[-1][1]["response"]
+    assert escritor.vaciar()
+    assert [m["role"] for m in Conversacion(str(tmp_path / "5491100")).todos()] == ["user", "bot"]
+
+
+class ModeloQueSeCorta:
+    def stream(self, entrada):
+        yield "Tenemos "
+        raise RuntimeError("se cayó Ollama")
+
+
+def test_stream_cortado_avisa_reinicio_antes_del_texto_alternativo(monkeypatch, tmp_path):
+    def get_response(body, session_id):
+        try:
+            return invocar_con_streaming(ModeloQueSeCorta(), body).content
+        except RuntimeError:
+            return invocar_con_streaming(ModeloFalso(), body).content
+
+    monkeypatch.setattr(endpoints, "CARPETA_CONVERSACIONES", str(tmp_path))
+    monkeypatch.setattr(endpoints, "get_response", get_response)
+    monkeypatch.setattr(endpoints, "agrupador", AgrupadorMensajes(ventana_seg=0))
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    respuesta = TestClient(app).post("/process-message/stream", json={"from": "+5491101", "body": "yerba"})
+
+    eventos = []
+    for bloque in respuesta.text.strip().split("\n\n"):
+        evento, datos = bloque.split("\n")
+        eventos.append((evento.removeprefix("event: "), json.loads(datos.removeprefix("data: "))))
+
+    assert [e for e, _ in eventos] == ["parcial", "reinicio", "parcial", "parcial", "parcial", "fin"]
+    # Lo que sigue al reinicio es la respuesta completa, sin el trozo del stream cortado
+    despues = eventos[eventos.index(("reinicio", {})) + 1:]
+    assert "".join(d["texto"] for e, d in despues if e == "parcial") == eventos[-1][1]["response"]
+    escritor.vaciar()
@@ -0,0 +1,37 @@
+# test_trazas.py
+
+from app import metricas, trazas
+from app.trazas import etapa, traza_turno
+
+
+def test_etapas_se_registran_en_el_histograma_y_en_la_traza_del_turno():
+    with traza_turno("s1") as tramos:
+        with etapa("prueba_catalogo"):
+            pass
+        with etapa("prueba_ia"):
+            pass
+    assert [nombre for nombre, _ in tramos] == ["prueba_catalogo", "prueba_ia"]
+    assert metricas.snapshot()["etapa_prueba_ia_segundos"]["count"] >= 1
+
+    # Fuera de un turno solo se alimenta el histograma
+    with etapa("prueba_ia"):
+        pass
+    assert tramos[-1][0] == "prueba_ia" and len(tramos) == 2
+
+
+def test_exportar_prometheus():
+    metricas.contador("prueba_mensajes", "Mensajes de prueba").inc(3)
+    metricas.histograma("prueba_latencia_segundos", "Latencia", buckets=(0.1, 1)).observar(0.5)
+    texto = metricas.exportar_prometheus()
+
+    assert "# TYPE prueba_mensajes_total counter\nprueba_mensajes_total 3" in texto
+    assert 'prueba_latencia_segundos_bucket{le="0.1"} 0' in texto
+    assert 'prueba_latencia_segundos_bucket{le="1"} 1' in texto
+    assert 'prueba_latencia_segundos_bucket{le="+Inf"} 1' in texto
+    assert "prueba_latencia_segundos_count 1" in texto
+
+
+def test_debug_se_silencia(monkeypatch, capsys):
+    monkeypatch.setattr(trazas, "BOT_DEBUG", False)
+    trazas.debug("no se ve")
+    assert capsys.readouterr().out == ""